@@ -0,0 +1,52 @@
+"""
+Throughput of quiz generation under concurrent load for each executor mode.
+
+    python -m benchmarks.bench_executor [--jobs 64] [--workers 1 2 4]
+
+Thread mode is bounded by the GIL on this regex-heavy work; process mode should
+scale with the number of cores.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import extractors
+import services
+from benchmarks.corpus import synthetic_page
+from generation_pool import GenerationExecutor
+
+async def _run(mode: str, workers: int, text: str, jobs: int):
+    executor = GenerationExecutor(mode=mode, workers=workers, max_pending=jobs)
+    executor.start()
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*[executor.run(services.generate_quiz_content, text) for _ in range(jobs)])
+        return time.perf_counter() - start
+    finally:
+        executor.shutdown()
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, 2, max(1, cores // 2), cores})
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=64)
+    parser.add_argument("--paragraphs", type=int, default=300, help="article size")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    args = parser.parse_args(argv)
+
+    text = extractors.get_extractor().extract(synthetic_page("Load", args.paragraphs))["text"]
+    services.generate_quiz_content(text)  # Imports and regex compilation are not part of the measurement
+    print(f"{args.jobs} jobs on a {len(text) // 1024} KB article, {cores} cores")
+    print(f"{'mode':<8} {'workers':>7} {'seconds':>8} {'quizzes/s':>10}")
+    elapsed = asyncio.run(_run("inline", 1, text, args.jobs))
+    print(f"{'inline':<8} {'-':>7} {elapsed:>8.2f} {args.jobs / elapsed:>10.1f}")
+    for mode in ("thread", "process"):
+        for workers in args.workers:
+            elapsed = asyncio.run(_run(mode, workers, text, args.jobs))
+            print(f"{mode:<8} {workers:>7} {elapsed:>8.2f} {args.jobs / elapsed:>10.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
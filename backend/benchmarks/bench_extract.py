@@ -0,0 +1,44 @@
+"""
+Compare the HTML extraction engines on the benchmark corpus.
+
+    python -m benchmarks.bench_extract [--repeat 5]
+
+Save real pages as benchmarks/pages/<name>.html to measure them instead of the
+synthetic corpus.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import extractors
+from benchmarks.corpus import load_pages
+
+def _time(engine, html, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.extract(html)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    engines = [extractors.get_extractor(name) for name in extractors.available_extractors()]
+    pages = load_pages()
+
+    print(f"{'page':<12} {'size':>9} " + " ".join(f"{e.name + ' ms':>10}" for e in engines) + "  same output")
+    mismatches = 0
+    for name, html in pages.items():
+        results = [engine.extract(html) for engine in engines]
+        same = all(r == results[0] for r in results)
+        mismatches += not same
+        cells = [f"{_time(engine, html, args.repeat) * 1000:>10.1f}" for engine in engines]
+        print(f"{name:<12} {len(html) // 1024:>7}KB " + " ".join(cells) + f"  {'yes' if same else 'NO'}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Latency and throughput of the quiz generator backends, with a local fake LLM.
+
+    python -m benchmarks.bench_generators [--articles 40] [--concurrency 8] [--llm-latency 0.8]
+
+Each backend generates a quiz for every article (distinct texts, --concurrency
+at a time), then for the same articles again. The second pass is answered by
+the result cache. Tiered returns instant quizzes on the first pass and LLM
+quizzes once the background upgrades have finished. "llm-flaky" fails 20% of
+the LLM calls to show the instant fallback.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "ERROR").upper())
+
+import extractors
+import generators
+from benchmarks.corpus import synthetic_page
+from benchmarks.fake_llm import FakeLLM
+from generation_pool import GenerationExecutor
+
+def _backends(llm_latency: float):
+    return {
+        "instant": lambda: generators.InstantGenerator(),
+        "llm": lambda: generators.LLMGenerator(client=FakeLLM(latency=llm_latency)),
+        "llm-flaky": lambda: generators.LLMGenerator(client=FakeLLM(latency=llm_latency, fail_rate=0.2)),
+        "tiered": lambda: generators.TieredGenerator(llm=generators.LLMGenerator(client=FakeLLM(latency=llm_latency))),
+    }
+
+async def _pass(texts, executor, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(text):
+        async with slots:
+            started = time.perf_counter()
+            quiz = await generators.generate(text, executor)
+            latencies.append(time.perf_counter() - started)
+            return quiz["generator"]
+
+    started = time.perf_counter()
+    versions = await asyncio.gather(*[one(text) for text in texts])
+    return latencies, time.perf_counter() - started, versions
+
+def _ms(latencies, q: float) -> float:
+    return statistics.quantiles(latencies, n=100)[int(q) - 1] * 1000 if len(latencies) > 1 else latencies[0] * 1000
+
+async def _run(name: str, make, texts, concurrency: int):
+    generators.results.clear()
+    generator = make()
+    generators.set_generator(generator)
+    executor = GenerationExecutor(mode="thread", workers=min(4, os.cpu_count() or 1), max_pending=len(texts) * 2)
+    executor.start()
+    try:
+        first, elapsed, _ = await _pass(texts, executor, concurrency)
+        upgrade_wait = None
+        if isinstance(generator, generators.TieredGenerator):
+            started = time.perf_counter()
+            await generator.drain()
+            upgrade_wait = time.perf_counter() - started
+        repeat, _, versions = await _pass(texts, executor, concurrency)
+    finally:
+        executor.shutdown()
+        generators.set_generator(None)
+    llm_share = sum(v.startswith("llm") for v in versions) / len(versions)
+    print(f"{name:<10} {_ms(first, 50):>9.1f} {_ms(first, 95):>9.1f} {len(texts) / elapsed:>10.1f} "
+          f"{_ms(repeat, 50):>10.3f} {llm_share:>8.0%} "
+          f"{'-' if upgrade_wait is None else f'{upgrade_wait:.1f}s':>9}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--paragraphs", type=int, default=80, help="article size")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="fake LLM response time in seconds")
+    parser.add_argument("--backends", nargs="+", default=None, help="default: all")
+    args = parser.parse_args(argv)
+
+    extractor = extractors.get_extractor()
+    texts = [extractor.extract(synthetic_page(f"Article {i}", args.paragraphs, i))["text"] for i in range(args.articles)]
+    backends = _backends(args.llm_latency)
+    print(f"{args.articles} articles of ~{sum(map(len, texts)) // len(texts) // 1024} KB, concurrency {args.concurrency}, "
+          f"fake LLM {args.llm_latency:.1f}s; latencies in ms")
+    print(f"{'backend':<10} {'first p50':>9} {'first p95':>9} {'quizzes/s':>10} {'cached p50':>10} "
+          f"{'LLM quiz':>8} {'upgrades':>9}")
+    for name in args.backends or backends:
+        asyncio.run(_run(name, backends[name], texts, args.concurrency))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Outbound fetches under a burst against a stand-in server that throttles.
+
+    python -m benchmarks.bench_outbound [--requests 200] [--server-rate 20] [--deadline 6]
+
+The stand-in answers 429 with Retry-After beyond --server-rate requests/s.
+Compares a fixed per-host limit with no retries (the old behaviour) against
+the outbound scheduler: how many fetches succeed within the deadline, how
+many 429s the server had to send, and the latency of the successful ones.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "ERROR").upper())
+
+import outbound
+import services
+from benchmarks.corpus import synthetic_page
+from benchmarks.standin import StandinServer
+
+async def _fetch(url: str, deadline: float):
+    started = time.perf_counter()
+    try:
+        with outbound.deadline(deadline):
+            await asyncio.wait_for(services.fetch_wikipedia_async(url), timeout=deadline)
+        return "ok", time.perf_counter() - started
+    except asyncio.TimeoutError:
+        return "timeout", None
+    except outbound.Throttled:
+        return "throttled", None
+    except httpx.HTTPStatusError as e:
+        return str(e.response.status_code), None
+
+async def _burst(server: StandinServer, scheduler: outbound.Scheduler, requests: int, deadline: float):
+    services.set_http_client(httpx.AsyncClient(limits=httpx.Limits(max_connections=200)))
+    outbound.set_scheduler(server.url("/"), scheduler)
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*[_fetch(server.url(f"/wiki/Burst?{i}"), deadline) for i in range(requests)])
+        return results, time.perf_counter() - started
+    finally:
+        await services.close_http_client()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--server-rate", type=float, default=20, help="requests/s the stand-in accepts")
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in response time in seconds")
+    parser.add_argument("--deadline", type=float, default=6.0, help="per-request budget, like the scrape timeout")
+    args = parser.parse_args(argv)
+
+    page = synthetic_page("Burst", 40)
+    setups = {
+        "fixed": lambda: outbound.Scheduler(rate=1e9, burst=10 ** 9, min_concurrency=10, max_concurrency=10, max_retries=0),
+        "scheduled": outbound.Scheduler,
+    }
+    print(f"{args.requests} fetches at once; server accepts {args.server_rate:g}/s, deadline {args.deadline:g}s")
+    print(f"{'setup':<10} {'ok':>5} {'failed':>7} {'429s':>6} {'p50 ms':>8} {'p95 ms':>8} {'seconds':>8}  failures")
+    for name, make in setups.items():
+        with StandinServer({"/wiki/Burst": page}, latency=args.latency, rate_limit=args.server_rate) as server:
+            results, elapsed = asyncio.run(_burst(server, make(), args.requests, args.deadline))
+            throttled = server.throttled
+        latencies = sorted(t * 1000 for outcome, t in results if outcome == "ok")
+        failures = {}
+        for outcome, _ in results:
+            if outcome != "ok":
+                failures[outcome] = failures.get(outcome, 0) + 1
+        p50 = statistics.median(latencies) if latencies else 0.0
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+        print(f"{name:<10} {len(latencies):>5} {len(results) - len(latencies):>7} {throttled:>6} "
+              f"{p50:>8.0f} {p95:>8.0f} {elapsed:>8.2f}  {failures or '-'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+End-to-end benchmark suite for the generation pipeline, with regression checks.
+
+    python -m benchmarks.bench_pipeline [--requests 200] [--concurrency 16]
+    python -m benchmarks.bench_pipeline --save-baseline benchmarks/baseline.json
+
+Micro-benchmarks scrape_wikipedia (against the local stand-in server),
+_generate_smart_quiz and the DB persistence path for every page in the corpus.
+The load test drives /api/generate and /api/history through the ASGI app and
+reports p50/p95/p99 latency and throughput. Results are compared against the
+baseline file (default benchmarks/baseline.json); a metric more than
+--tolerance worse than its baseline is flagged and the exit status is 1.
+Baselines are machine-specific: record one on the machine you compare on.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# The app reads these at import time: a throwaway database and quiet logs
+_DB_DIR = tempfile.mkdtemp(prefix="quiz-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(_DB_DIR, 'bench.db')}")
+os.environ.setdefault("ENTITY_INDEX_PATH", os.path.join(_DB_DIR, "entity_index.bin"))
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+logging.basicConfig(level=os.environ["LOG_LEVEL"])
+
+import httpx
+
+import database
+import extractors
+import generators
+import metrics
+import models
+import outbound
+import persistence
+import services
+from benchmarks.corpus import load_pages
+from benchmarks.standin import StandinServer
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def _median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def _percentiles(latencies):
+    if len(latencies) < 2:
+        value = latencies[0] * 1000 if latencies else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+# Micro-benchmarks
+
+def bench_scrape(server, pages, repeat: int) -> dict:
+    return {
+        f"scrape.{name}.ms": _median_ms(lambda: services.scrape_wikipedia(server.url(f"/wiki/{name}")), repeat)
+        for name in pages
+    }
+
+def bench_generate(texts, repeat: int) -> dict:
+    return {
+        f"generate.{name}.ms": _median_ms(lambda: services._generate_smart_quiz(text), repeat)
+        for name, text in texts.items()
+    }
+
+async def bench_persist(texts, repeat: int, batch: int) -> dict:
+    results = {}
+    for name, text in texts.items():
+        quiz = services._generate_smart_quiz(text)
+        items = [(f"https://en.wikipedia.org/wiki/{name}", name, quiz)]
+        async with database.AsyncSessionLocal() as db:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                await persistence.save_quizzes(db, items)
+                timings.append(time.perf_counter() - start)
+            results[f"persist.{name}.ms"] = statistics.median(timings) * 1000
+
+            start = time.perf_counter()
+            await persistence.save_quizzes(db, items * batch)
+            results[f"persist.{name}.batch{batch}.ms"] = (time.perf_counter() - start) * 1000
+    return results
+
+# Load test
+
+async def _load(client, requests: int, concurrency: int, make_request):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests)])
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+def _report(name: str, latencies, errors: int, elapsed: float) -> dict:
+    p50, p95, p99 = _percentiles(latencies)
+    return {
+        f"{name}.p50.ms": p50,
+        f"{name}.p95.ms": p95,
+        f"{name}.p99.ms": p99,
+        f"{name}.throughput.rps": len(latencies) / elapsed if elapsed else 0.0,
+        f"{name}.errors": errors,
+    }
+
+async def bench_load(server, page: str, requests: int, concurrency: int) -> dict:
+    import main
+
+    await main.startup()
+    # The stand-in is not Wikipedia: measure the pipeline here, not the outbound rate limit (bench_outbound does that)
+    outbound.set_scheduler(server.url("/"), outbound.Scheduler(rate=1e9, burst=10 ** 9))
+    # Every request serves the same article text; with the result cache on, only the first would generate
+    cache_size, generators.results.max_entries = generators.results.max_entries, 0
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            # A distinct query string per request defeats the scrape cache and request
+            # coalescing, and the result cache is off, so every request runs scrape -> generate -> save
+            async def generate(client, i):
+                return await client.post("/api/generate", json={"url": server.url(f"/wiki/{page}?bench={i}")})
+
+            async def history(client, i):
+                return await client.get("/api/history", params={"limit": 20})
+
+            await generate(client, -1)  # Warm-up: connection pool, imports
+            results = _report("load.generate", *await _load(client, requests, concurrency, generate))
+            results.update(_report("load.history", *await _load(client, requests, concurrency, history)))
+    finally:
+        generators.results.max_entries = cache_size
+        await main.shutdown()
+    _print_stages()
+    return results
+
+def _print_stages():
+    # Where the load test spent its time, from the app's own stage histograms
+    print(f"{'stage':<12} {'count':>6} {'mean ms':>9}")
+    for (stage,), (count, total) in sorted(metrics.STAGE_SECONDS.totals().items()):
+        print(f"{stage:<12} {count:>6} {total / count * 1000:>9.2f}")
+    print()
+
+# Baseline comparison
+
+def _worse(metric: str, value: float, baseline: float, tolerance: float, min_delta_ms: float) -> bool:
+    if metric.endswith(".errors"):
+        return value > baseline
+    if metric.endswith(".rps"):
+        return value < baseline * (1 - tolerance)
+    # Sub-millisecond timings jitter by tens of percent; require a real slowdown too
+    return value > baseline * (1 + tolerance) and value - baseline > min_delta_ms
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float = 0.0) -> int:
+    regressions = 0
+    print(f"\n{'metric':<36} {'current':>10} {'baseline':>10} {'change':>8}")
+    for metric, value in results.items():
+        base = baseline.get(metric)
+        if base is None:
+            print(f"{metric:<36} {value:>10.2f} {'-':>10}")
+            continue
+        change = (value - base) / base * 100 if base else 0.0
+        flag = _worse(metric, value, base, tolerance, min_delta_ms)
+        regressions += flag
+        print(f"{metric:<36} {value:>10.2f} {base:>10.2f} {change:>+7.1f}%" + ("  REGRESSION" if flag else ""))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint in the load test")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--page", default="medium", help="corpus page used by the /api/generate load test")
+    parser.add_argument("--batch", type=int, default=50, help="quizzes per bulk persistence call")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore timing changes smaller than this")
+    parser.add_argument("--skip-load", action="store_true")
+    args = parser.parse_args(argv)
+
+    pages = load_pages()
+    if args.page not in pages:
+        parser.error(f"--page must be one of: {', '.join(pages)}")
+    engine = extractors.get_extractor()
+    texts = {name: engine.extract(html)["text"] for name, html in pages.items()}
+
+    async def setup():
+        async with database.engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+    asyncio.run(setup())
+
+    results = {}
+    with StandinServer({f"/wiki/{name}": html for name, html in pages.items()}) as server:
+        results.update(bench_scrape(server, pages, args.repeat))
+        results.update(bench_generate(texts, args.repeat))
+        results.update(asyncio.run(bench_persist(texts, args.repeat, args.batch)))
+        if not args.skip_load:
+            results.update(asyncio.run(bench_load(server, args.page, args.requests, args.concurrency)))
+
+    for name, html in pages.items():
+        print(f"{name:<10} {len(html) // 1024:>6} KB html {len(texts[name]) // 1024:>6} KB text")
+
+    regressions = 0
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({k: round(v, 3) for k, v in results.items()}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.save_baseline}")
+    if os.path.exists(args.baseline) and args.baseline != args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+    else:
+        compare(results, {}, args.tolerance)
+    if regressions:
+        print(f"\n{regressions} metric(s) regressed by more than {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Per-stage timings of the instant quiz generator on long articles.
+
+    python -m benchmarks.bench_quiz_generation [--repeat 5]
+
+Texts come from the benchmark corpus (saved pages or synthetic ones, up to the
+huge size class) run through the default extraction engine.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+import extractors
+import services
+from benchmarks.corpus import load_pages, synthetic_page
+from text_index import DocumentIndex
+
+def _median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def _stages(text: str):
+    doc = DocumentIndex(text)
+    summary = services._build_summary(doc, text)
+    people = services._extract_people(doc)
+    return [
+        ("index", lambda: DocumentIndex(text)),
+        ("summary", lambda: services._build_summary(doc, text)),
+        ("people", lambda: services._extract_people(doc)),
+        ("locations", lambda: services._extract_locations(doc)),
+        ("q_subject", lambda: services._question_main_subject(doc)),
+        ("q_year", lambda: services._question_year(doc)),
+        ("q_person", lambda: services._question_person(doc, people[0]) if people else None),
+        ("q_concept", lambda: services._question_key_concept(doc)),
+        ("q_later", lambda: services._question_later_info(doc)),
+        ("q_topic", lambda: services._question_main_topic(summary)),
+        ("total", lambda: services._generate_smart_quiz(text)),
+    ]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--huge-paragraphs", type=int, default=0,
+                        help="paragraphs in an extra synthetic article (the corpus already has a huge one)")
+    args = parser.parse_args(argv)
+
+    pages = load_pages()
+    if args.huge_paragraphs:
+        pages["extra"] = synthetic_page("Synthetic Extra Article", args.huge_paragraphs, seed=99).encode("utf-8")
+    engine = extractors.get_extractor()
+    texts = {name: engine.extract(html)["text"] for name, html in pages.items()}
+
+    rows = [(name, len(text), [(stage, _median_ms(fn, args.repeat)) for stage, fn in _stages(text)])
+            for name, text in texts.items()]
+
+    stages = [stage for stage, _ in rows[0][2]]
+    print(f"{'article':<10} {'chars':>9} " + " ".join(f"{stage:>10}" for stage in stages) + "   (ms)")
+    for name, size, timings in rows:
+        print(f"{name:<10} {size:>9} " + " ".join(f"{ms:>10.2f}" for _, ms in timings))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
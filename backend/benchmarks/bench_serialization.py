@@ -0,0 +1,165 @@
+"""
+CPU time and response size of GET /api/history for a large history.
+
+    python -m benchmarks.bench_serialization [--quizzes 10000] [--articles 40] [--repeat 3]
+
+Seeds a throwaway SQLite database with --quizzes quizzes, loads them once with
+their questions and times turning the rows into a response body (CPU seconds,
+best of --repeat):
+
+- dict + validate: what /api/history did before, untyped dict fields validated by
+  response_model and serialized by FastAPI, then json.dumps
+- typed + validate: the same with the typed response models
+- fast path: dicts built from the rows, encoded by responses.dumps (orjson)
+
+then the size and CPU cost of each Content-Encoding, and the whole request
+through the app with and without Accept-Encoding.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+# The engine is created on import, so the database is chosen first
+_DIRECTORY = tempfile.mkdtemp(prefix="bench_serialization_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_DIRECTORY, 'history.db')}"
+os.environ["ENTITY_INDEX_PATH"] = os.path.join(_DIRECTORY, "entity_index.bin")
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "ERROR").upper())
+
+import httpx
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.future import select
+
+import database
+import extractors
+import main as api
+import models
+import persistence
+import responses
+import services
+from benchmarks.corpus import synthetic_page
+
+class UntypedResponse(BaseModel):
+    """GenerateResponse as it was before the typed models."""
+    id: int
+    url: str
+    title: str
+    summary: str
+    key_entities: dict
+    sections: Optional[List[str]] = []
+    quiz: List[dict]
+    related_topics: List[str]
+
+async def _seed(count: int, articles: int, paragraphs: int):
+    extractor = extractors.get_extractor()
+    quizzes = []
+    for i in range(articles):
+        page = extractor.extract(synthetic_page(f"Article {i}", paragraphs, i))
+        quizzes.append((page["title"], services.generate_quiz_content(page["text"])))
+    async with database.AsyncSessionLocal() as db:
+        for start in range(0, count, 500):
+            await persistence.save_quizzes(db, [
+                (f"https://en.wikipedia.org/wiki/Bench_{i}", f"{quizzes[i % articles][0]} {i}", quizzes[i % articles][1])
+                for i in range(start, min(start + 500, count))
+            ])
+
+async def _load():
+    async with database.AsyncSessionLocal() as db:
+        query = select(models.Quiz).order_by(models.Quiz.created_at.desc(), models.Quiz.id.desc())
+        return (await db.execute(query.options(*api._WITH_QUESTIONS))).scalars().all()
+
+def _validated(adapter):
+    # What FastAPI does with a response_model: validate, serialize in json mode, then JSONResponse.render
+    def serialize(quizzes):
+        content = [api._format_quiz(quiz, with_questions=True) for quiz in quizzes]
+        value = adapter.validate_python(content)
+        data = adapter.dump_python(value, mode="json")
+        return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    return serialize
+
+def _fast(quizzes):
+    return responses.dumps([api._format_quiz(quiz, with_questions=True) for quiz in quizzes])
+
+def _cpu(fn, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.process_time()
+        result = fn()
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+async def _request(client, accept_encoding: str, repeat: int):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get("/api/history", headers={"Accept-Encoding": accept_encoding})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+    # httpx decodes the body; Content-Length is the size on the wire
+    size = int(response.headers["content-length"])
+    return statistics.median(latencies), size, response.headers.get("content-encoding", "identity")
+
+async def _run(args):
+    await api.startup()
+    try:
+        started = time.perf_counter()
+        await _seed(args.quizzes, args.articles, args.paragraphs)
+        print(f"Seeded {args.quizzes} quizzes in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        quizzes = await _load()
+        print(f"Loaded {len(quizzes)} quizzes with their questions in {(time.perf_counter() - started) * 1000:.0f} ms "
+              f"(orjson {'installed' if responses.orjson is not None else 'missing, json fallback'})")
+
+        paths = {
+            "dict + validate": _validated(TypeAdapter(List[UntypedResponse])),
+            "typed + validate": _validated(TypeAdapter(List[api.GenerateResponse])),
+            "fast path": _fast,
+        }
+        print(f"\n{'serialization':<18} {'CPU ms':>9} {'body KB':>9}")
+        bodies = {}
+        for name, serialize in paths.items():
+            seconds, bodies[name] = _cpu(lambda: serialize(quizzes), args.repeat)
+            print(f"{name:<18} {seconds * 1000:>9.0f} {len(bodies[name]) / 1024:>9.0f}")
+        assert json.loads(bodies["fast path"]) == json.loads(bodies["typed + validate"])
+
+        body = bodies["fast path"]
+        print(f"\n{'encoding':<18} {'CPU ms':>9} {'body KB':>9} {'ratio':>7}")
+        print(f"{'identity':<18} {0:>9.0f} {len(body) / 1024:>9.0f} {1:>7.1f}")
+        for encoding in responses.available_encodings():
+            seconds, encoded = _cpu(lambda: responses.encode(body, encoding), args.repeat)
+            print(f"{encoding:<18} {seconds * 1000:>9.0f} {len(encoded) / 1024:>9.0f} {len(body) / len(encoded):>7.1f}")
+        if "br" not in responses.available_encodings():
+            print("br                 (pip install brotli)")
+
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"\n{'GET /api/history':<18} {'median ms':>9} {'wire KB':>9}  encoding")
+            for accept in ("identity", "gzip", "br, gzip"):
+                seconds, size, encoding = await _request(client, accept, args.repeat)
+                print(f"{accept:<18} {seconds * 1000:>9.0f} {size / 1024:>9.0f}  {encoding}")
+    finally:
+        await api.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quizzes", type=int, default=10000)
+    parser.add_argument("--articles", type=int, default=40, help="distinct quizzes, repeated to fill the history")
+    parser.add_argument("--paragraphs", type=int, default=40, help="article size")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_run(args))
+    finally:
+        shutil.rmtree(_DIRECTORY, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
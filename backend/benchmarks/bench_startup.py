@@ -0,0 +1,108 @@
+"""
+Worker boot time: interpreter start, `import main` and the lifespan startup,
+each in a fresh process against a throwaway SQLite database.
+
+    python -m benchmarks.bench_startup [--runs 5] [--top 15]
+
+Startup is measured on a new database (schema created), on a database whose
+stored schema version matches (DDL skipped), and with the version row removed
+(DDL re-checked, as every boot did before schema versioning). The import-time
+breakdown groups `python -X importtime` by top-level package.
+"""
+import argparse
+import collections
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+async def boot():
+    await main.startup()
+    ready = time.perf_counter()
+    await main.shutdown()
+    return ready
+ready = asyncio.run(boot())
+print(json.dumps({"import": imported - started, "startup": ready - imported}))
+"""
+
+def _env(directory: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(directory, 'boot.db')}",
+        "ENTITY_INDEX_PATH": os.path.join(directory, "entity_index.bin"),
+        "LOG_LEVEL": "WARNING",
+        "PYTHONWARNINGS": "ignore",
+    })
+    return env
+
+def _boot(directory: str) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", _CHILD], cwd=BACKEND_DIR, env=_env(directory),
+                            capture_output=True, text=True, check=True).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["process"] = time.perf_counter() - started
+    return timings
+
+def _forget_schema_version(directory: str):
+    import sqlite3
+    with sqlite3.connect(os.path.join(directory, "boot.db")) as conn:
+        conn.execute("DELETE FROM schema_version")
+
+def import_breakdown(directory: str):
+    """Cumulative import time (seconds) of each module imported directly by the importer of main."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+                            env=_env(directory), capture_output=True, text=True, check=True).stderr
+    totals = collections.Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        indent = len(name) - len(name.lstrip())
+        if indent <= 3:  # main itself and what it (or site) imports at top level
+            totals[name.strip().split(".")[0]] += int(cumulative) / 1e6
+    return totals
+
+def _row(label: str, runs):
+    columns = [statistics.median(run[key] for run in runs) * 1000 for key in ("import", "startup", "process")]
+    print(f"{label:<26} {columns[0]:>9.0f} {columns[1]:>10.0f} {columns[2]:>10.0f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages to show in the import breakdown")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        fresh = [_boot(directory)]
+        current = [_boot(directory) for _ in range(args.runs)]
+        rechecked = []
+        for _ in range(args.runs):
+            _forget_schema_version(directory)
+            rechecked.append(_boot(directory))
+        breakdown = import_breakdown(directory)
+
+    print(f"Median of {args.runs} boots, milliseconds")
+    print(f"{'database':<26} {'import':>9} {'startup':>10} {'process':>10}")
+    _row("new (schema created)", fresh)
+    _row("current (DDL skipped)", current)
+    _row("version unknown (DDL)", rechecked)
+
+    print("\nImport time by top-level package (cumulative, one run), milliseconds")
+    for name, seconds in breakdown.most_common(args.top):
+        print(f"{name:<26} {seconds * 1000:>9.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
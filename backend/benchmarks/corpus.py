@@ -0,0 +1,112 @@
+"""
+Benchmark corpus of Wikipedia article pages.
+
+Real pages saved from wikipedia.org (``benchmarks/pages/*.html``, optionally
+gzipped) are used when present. Otherwise deterministic synthetic pages are
+generated with the same markup the scraper cares about: firstHeading,
+mw-content-text, mw-heading wrappers, infoboxes, navboxes, citation superscripts
+and reference lists.
+"""
+import gzip
+import os
+import random
+
+PAGES_DIR = os.path.join(os.path.dirname(__file__), "pages")
+
+# Paragraph counts for each synthetic size class
+SIZES = {"small": 8, "medium": 80, "large": 600, "huge": 3000}
+
+_WORDS = (
+    "the of and in to a was is for on as by with from that at his which an were "
+    "are it be this had its or first also new their after one two has but been "
+    "research system network theory model computer science history during century "
+    "government university war development language learning early later between "
+    "published national states first world public study field known including"
+).split()
+_NAMES = [
+    "Alan Turing", "Ada Lovelace", "John McCarthy", "Marvin Minsky", "Grace Hopper",
+    "Claude Shannon", "Geoffrey Hinton", "Yann LeCun", "Herbert Simon", "Allen Newell",
+    "Frank Rosenblatt", "Donald Hebb", "Walter Pitts", "Warren McCulloch", "Norbert Wiener",
+]
+_PLACES = [
+    "London", "Cambridge", "Boston", "Paris", "Berlin", "Tokyo", "Toronto", "Stanford",
+    "Princeton", "Manchester", "Edinburgh", "Zurich", "Montreal", "Pittsburgh",
+]
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(10, 24))]
+    words.insert(rng.randint(0, len(words)), rng.choice(_NAMES))
+    if rng.random() < 0.5:
+        words.insert(rng.randint(0, len(words)), "in " + rng.choice(_PLACES))
+    if rng.random() < 0.4:
+        words.insert(rng.randint(0, len(words)), str(rng.randint(1900, 2024)))
+    sentence = " ".join(words)
+    return sentence[0].upper() + sentence[1:] + "."
+
+def _paragraph(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(2, 6)):
+        parts.append(_sentence(rng))
+        if rng.random() < 0.5:
+            n = rng.randint(1, 200)
+            parts.append(f'<sup id="cite_ref-{n}" class="reference"><a href="#cite_note-{n}">[{n}]</a></sup>')
+    return "<p>" + " ".join(parts) + "</p>"
+
+def synthetic_page(title: str, paragraphs: int, seed: int = 0) -> str:
+    """Build a Wikipedia-shaped article page with the given number of body paragraphs."""
+    rng = random.Random(seed)
+    body = [
+        '<div class="mw-content-ltr mw-parser-output" lang="en" dir="ltr">',
+        '<table class="infobox vcard"><tbody><tr><th>Born</th><td>1912</td></tr></tbody></table>',
+        '<div class="infobox-wrapper"><p>Infobox caption text that is long enough to pass the length filter.</p></div>',
+        '<style>.mw-parser-output .hatnote{font-style:italic}</style>',
+    ]
+    section = 0
+    for i in range(paragraphs):
+        if i and i % 6 == 0:
+            section += 1
+            level = "h3" if section % 3 == 0 else "h2"
+            name = f"Section {section} {rng.choice(_WORDS).title()}"
+            body.append(
+                f'<div class="mw-heading mw-heading{level[1]}"><{level} id="s{section}">{name}</{level}>'
+                f'<span class="mw-editsection">[<a href="#">edit</a>]</span></div>'
+            )
+        body.append(_paragraph(rng))
+        if rng.random() < 0.05:
+            body.append('<p class="mw-empty-elt"></p>')
+    body.append('<div class="mw-heading mw-heading2"><h2 id="References">References</h2></div>')
+    body.append('<div class="reflist"><div class="mw-references-wrap mw-references-columns"><ol class="references">')
+    for n in range(1, min(200, paragraphs * 2) + 1):
+        body.append(f'<li id="cite_note-{n}"><p>Reference {n}: {_sentence(rng)}</p></li>')
+    body.append("</ol></div></div>")
+    body.append('<div class="navbox" role="navigation"><p>Navbox paragraph listing related articles for navigation purposes.</p></div>')
+    body.append("</div>")
+    return (
+        "<!DOCTYPE html>\n<html><head><meta charset=\"UTF-8\"><title>"
+        f"{title} - Wikipedia</title></head><body>"
+        f'<div id="content"><h1 id="firstHeading" class="firstHeading mw-first-heading">'
+        f'<span class="mw-page-title-main">{title}</span></h1>'
+        '<div id="bodyContent"><div id="mw-content-text" class="mw-body-content">'
+        + "\n".join(body)
+        + "</div></div></div></body></html>"
+    )
+
+def load_pages(sizes=None):
+    """
+    Return {name: html_bytes}. Saved real pages win over synthetic ones.
+    """
+    pages = {}
+    if os.path.isdir(PAGES_DIR):
+        for name in sorted(os.listdir(PAGES_DIR)):
+            path = os.path.join(PAGES_DIR, name)
+            if name.endswith(".html.gz"):
+                with gzip.open(path, "rb") as f:
+                    pages[name[:-8]] = f.read()
+            elif name.endswith(".html"):
+                with open(path, "rb") as f:
+                    pages[name[:-5]] = f.read()
+    if not pages:
+        for i, (size, paragraphs) in enumerate((sizes or SIZES).items()):
+            title = f"Synthetic {size.title()} Article"
+            pages[size] = synthetic_page(title, paragraphs, seed=i).encode("utf-8")
+    return pages
@@ -0,0 +1,76 @@
+"""
+Local stand-in for the Gemini client used by generators.LLMGenerator.
+
+Answers after a configurable latency with a quiz in the JSON shape the prompt
+asks for, built from the article text in the prompt, so the llm and tiered
+backends can be exercised and measured without an API key or network:
+
+    llm = generators.LLMGenerator(client=FakeLLM(latency=0.8))
+    generators.set_generator(generators.TieredGenerator(llm=llm))
+
+fail_rate of the calls raise and garbage_rate answer with text that is not
+JSON; which ones is decided by the prompt, so runs are reproducible.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+
+_SENTENCE = re.compile(r"[^.!?\n]{40,200}[.!?]")
+_NAME = re.compile(r"\b[A-Z][a-z]+ [A-Z][a-z]+\b")
+
+class FakeLLMError(Exception):
+    """What the fake raises for the share of calls that fail."""
+
+class FakeLLM:
+    def __init__(self, latency: float = 0.8, jitter: float = 0.2, fail_rate: float = 0.0, garbage_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.garbage_rate = garbage_rate
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, prompt: str) -> str:
+        rng = random.Random(hashlib.sha1(prompt.encode("utf-8")).digest())
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(max(self.latency + rng.uniform(-self.jitter, self.jitter), 0.0))
+        finally:
+            self.in_flight -= 1
+        roll = rng.random()
+        if roll < self.fail_rate:
+            raise FakeLLMError("503 The model is overloaded")
+        if roll < self.fail_rate + self.garbage_rate:
+            return "Sure! Here is a quiz about the article:"
+        return json.dumps(self.quiz(prompt.split("Article:\n", 1)[-1], rng))
+
+    @staticmethod
+    def quiz(text: str, rng: random.Random) -> dict:
+        sentences = [s.strip() for s in _SENTENCE.findall(text)] or ["The article has no complete sentences."]
+        names = list(dict.fromkeys(_NAME.findall(text)))
+        questions = []
+        for i in range(min(6, len(sentences))):
+            answer = sentences[rng.randrange(len(sentences))]
+            wrong = ["This is not stated in the article.", "The article says the opposite.",
+                     "It is mentioned only as a rumour."]
+            options = [answer[:120]] + wrong
+            rng.shuffle(options)
+            questions.append({
+                "question": f"Which statement does the article make ({i + 1})?",
+                "options": options,
+                "answer": answer[:120],
+                "difficulty": ("easy", "medium", "hard")[i % 3],
+                "explanation": "Quoted from the article.",
+            })
+        return {
+            "summary": " ".join(sentences[:2]),
+            "key_entities": {"people": names[:5], "organizations": [], "locations": []},
+            "sections": [],
+            "related_topics": names[5:8],
+            "quiz": questions,
+        }
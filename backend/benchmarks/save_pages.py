@@ -0,0 +1,37 @@
+"""
+Download real Wikipedia articles into benchmarks/pages/ for the benchmark corpus.
+
+    python -m benchmarks.save_pages [small=Tarte_Tatin medium=Alan_Turing ...]
+
+Pages are stored gzipped as <name>.html.gz and, once present, replace the
+synthetic corpus in every benchmark.
+"""
+import gzip
+import os
+import sys
+
+import services
+from benchmarks.corpus import PAGES_DIR
+
+# One article per size class, from a few KB of text to one of the longest articles
+DEFAULT_ARTICLES = {
+    "small": "Tarte_Tatin",
+    "medium": "Alan_Turing",
+    "large": "Artificial_intelligence",
+    "huge": "World_War_II",
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    articles = dict(arg.split("=", 1) for arg in argv) if argv else DEFAULT_ARTICLES
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    for name, title in articles.items():
+        fetched = services.fetch_wikipedia(f"https://en.wikipedia.org/wiki/{title}")
+        path = os.path.join(PAGES_DIR, f"{name}.html.gz")
+        with gzip.open(path, "wb") as f:
+            f.write(fetched["content"])
+        print(f"{name:<8} {title:<28} {len(fetched['content']) // 1024:>6} KB -> {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
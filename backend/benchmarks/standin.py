@@ -0,0 +1,126 @@
+"""
+Local stand-in for wikipedia.org.
+
+Serves a fixed set of article pages over plain HTTP on 127.0.0.1 so the scraping
+path can be exercised and measured without touching the network:
+
+    with StandinServer({"/wiki/Example": html}) as server:
+        url = server.url("/wiki/Example")
+
+With rate_limit set it throttles like the real site: requests beyond
+rate_limit per second (bursts of `burst`) get 429 with a Retry-After header.
+"""
+import hashlib
+import http.server
+import threading
+import time
+from email.utils import formatdate
+
+class StandinServer:
+    def __init__(self, pages: dict, latency: float = 0.0, rate_limit: float = None, burst: int = None,
+                 retry_after: int = 1):
+        self.pages = {}
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.burst = burst or max(int(rate_limit or 1), 1)
+        self.retry_after = retry_after
+        self.requests = 0
+        self.not_modified = 0
+        self.throttled = 0
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+        for path, html in pages.items():
+            self.add_page(path, html)
+        self._httpd = None
+        self._thread = None
+
+    def add_page(self, path: str, html):
+        body = html.encode("utf-8") if isinstance(html, str) else html
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.pages[path] = (body, etag, formatdate(time.time(), usegmt=True))
+
+    def _admit(self) -> bool:
+        if not self.rate_limit:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens < 1:
+                self.throttled += 1
+                return False
+            self._tokens -= 1
+            return True
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def start(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real site
+
+            def do_HEAD(self):
+                self.do_GET(head=True)
+
+            def do_GET(self, head: bool = False):
+                server.requests += 1
+                if not server._admit():
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(server.retry_after))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                page = server.pages.get(self.path.split("?")[0])
+                if page is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body, etag, last_modified = page
+                if self.headers.get("If-None-Match") == etag:
+                    server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=UTF-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.end_headers()
+                if not head:
+                    try:
+                        self.wfile.write(body)
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass  # The client gave up (e.g. its deadline passed)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
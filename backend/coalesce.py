@@ -0,0 +1,67 @@
+import asyncio
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight task.
+
+    Every caller awaits the same task through asyncio.shield, so a caller that is
+    cancelled (e.g. by its own asyncio.wait_for deadline) leaves without affecting
+    the others. The shared task is only cancelled once its last waiter has gone.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def waiters(self) -> int:
+        return sum(f.waiters for f in self._flights.values())
+
+    async def do(self, key, factory):
+        """Run factory() for key, or join the call that is already running."""
+        return await self.wait(key, self.join(key, factory))
+
+    def join(self, key, factory) -> _Flight:
+        """
+        The flight for key, started with factory() when there is none, with the
+        caller counted as a waiter. Runs without yielding, so a caller can attach
+        state to a new flight (see flight.task) before anyone else joins it.
+        Must be followed by wait(), or by leave() for a caller that awaits
+        flight.task itself, to release the caller's place.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        flight.waiters += 1
+        return flight
+
+    async def wait(self, key, flight: _Flight):
+        """The result of a flight from join()."""
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            self.leave(key, flight)
+
+    def leave(self, key, flight: _Flight):
+        """Release a place taken by join()."""
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            # Nobody is left to receive the result; stop the work and make sure
+            # the next caller starts a fresh flight instead of joining this one
+            self._forget(key, flight)
+            flight.task.cancel()
+
+    def _forget(self, key, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if flight.task.done() and not flight.task.cancelled():
+            # Mark the exception as retrieved even if every waiter already left
+            flight.task.exception()
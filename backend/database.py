@@ -1,17 +1,79 @@
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+def load_env():
+    """Read a .env file into os.environ when there is one; python-dotenv is imported only then."""
+    for directory in (os.getcwd(), os.path.dirname(os.path.abspath(__file__))):
+        path = os.path.join(directory, ".env")
+        if os.path.isfile(path):
+            from dotenv import load_dotenv
+            load_dotenv(path)
+            return
 
-DATABASE_URL = "sqlite+aiosqlite:///./quiz_app.db"
+load_env()
 
-engine = create_async_engine(
-    DATABASE_URL, 
-    echo=True,
-    connect_args={"check_same_thread": False}  # For SQLite compatibility
-)
+def _env_flag(name: str, default: str = "0") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+def _normalize_database_url(url: str) -> str:
+    # Hosting platforms hand out postgres:// URLs; run them on the asyncpg driver
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+DATABASE_URL = _normalize_database_url(os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./quiz_app.db"))
+DB_ECHO = _env_flag("DB_ECHO")  # Log every SQL statement (debugging only)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING")
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))  # Seconds; -1 keeps connections forever
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))  # asyncpg prepared statements per connection
+
+def _engine_options(url) -> dict:
+    options = {
+        "echo": DB_ECHO,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        options["connect_args"] = {
+            "check_same_thread": False,  # For SQLite compatibility
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+        if url.database and url.database != ":memory:":
+            options["pool_size"] = DB_POOL_SIZE
+            options["max_overflow"] = DB_MAX_OVERFLOW
+    else:
+        options["pool_size"] = DB_POOL_SIZE
+        options["max_overflow"] = DB_MAX_OVERFLOW
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    return options
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """
+    Per-connection SQLite settings: WAL lets readers run alongside the single
+    writer, NORMAL sync is durable in WAL mode without an fsync per commit, and the
+    busy timeout makes other workers wait for the write lock instead of failing
+    with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+_url = make_url(DATABASE_URL)
+engine = create_async_engine(DATABASE_URL, **_engine_options(_url))
+
+if _url.get_backend_name() == "sqlite" and _url.database and _url.database != ":memory:":
+    event.listen(engine.sync_engine, "connect", _configure_sqlite)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -23,4 +85,25 @@ Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+def upgrade_schema(conn):
+    """
+    Additive migrations for databases created by an older version of the app.
+    create_all only creates missing tables, so add any missing columns and
+    indexes to the tables that already exist. Runs on a sync connection.
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(conn)
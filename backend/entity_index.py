@@ -0,0 +1,279 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import zlib
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import database
+import models
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Entities across every stored quiz (people, organizations, locations from
+# Quiz.key_entities). The entity_mentions table is the source of truth and is
+# written in the same transaction as the quizzes; the in-memory index answers
+# the generator's lookups in O(1). The compressed snapshot file only caches the
+# table: it is always written from it (the previous snapshot plus the mentions
+# above its watermark), never from memory, so every process may write it.
+def _default_path() -> str:
+    # Next to a SQLite database (quiz_app.db -> quiz_app.entities.bin), else beside this module
+    url = make_url(database.DATABASE_URL)
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        return os.path.splitext(os.path.abspath(url.database))[0] + ".entities.bin"
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "entity_index.bin")
+
+ENTITY_INDEX_PATH = os.getenv("ENTITY_INDEX_PATH", _default_path())  # Empty: no snapshot file
+ENTITY_TYPES = ("people", "organizations", "locations")
+TOP_PER_TYPE = 64  # Distractors are drawn from the most frequent entities of each type
+_BATCH = 1000
+_generations = itertools.count(1)
+
+# Capitalized words the entity heuristics pick up at sentence starts ("Of Ada", "He")
+_NOT_NAMES = frozenset(
+    "a an and are as at but by for from he her his in is it its of on one or our see she so that the their "
+    "these they this those to was we were with".split()
+)
+
+def is_name(name: str) -> bool:
+    return not any(word.lower() in _NOT_NAMES for word in name.split())
+
+def mentions(key_entities):
+    """(type, name) pairs of a quiz's key_entities, each name once per type."""
+    if not isinstance(key_entities, dict):
+        return []
+    pairs = []
+    for entity_type in ENTITY_TYPES:
+        for name in dict.fromkeys(key_entities.get(entity_type) or ()):
+            if isinstance(name, str) and name.strip() and is_name(name):
+                pairs.append((entity_type, name.strip()))
+    return pairs
+
+class EntityIndex:
+    """
+    Per type, name -> frequency (the number of quizzes mentioning the entity)
+    and the TOP_PER_TYPE most frequent names. Frequencies only grow, so the
+    top lists are kept exact by checking each entity as it is counted. Lists
+    are replaced, never mutated, so generator threads can read them freely.
+    """
+
+    def __init__(self):
+        self.entities = {entity_type: {} for entity_type in ENTITY_TYPES}
+        self.watermark = 0  # Snapshots: highest quiz id read from the table
+        self.mentions = 0  # Snapshots: mention rows counted, to detect rows committed below the watermark later
+        self._top = {}
+        self.generation = next(_generations)  # Changes with every count, unique across indexes
+
+    def __len__(self):
+        return sum(len(names) for names in self.entities.values())
+
+    def add(self, name: str, entity_type: str, count: int = 1):
+        counts = self.entities.setdefault(entity_type, {})
+        counts[name] = counts.get(name, 0) + count
+        self.generation = next(_generations)
+        key = lambda n: (-counts[n], n)
+        top = self._top.get(entity_type, [])
+        if name in top or len(top) < TOP_PER_TYPE or key(name) < key(top[-1]):
+            candidates = top if name in top else top + [name]
+            self._top[entity_type] = sorted(candidates, key=key)[:TOP_PER_TYPE]
+
+    def add_quiz(self, key_entities):
+        for entity_type, name in mentions(key_entities):
+            self.add(name, entity_type)
+
+    def frequency(self, name: str, entity_type: str) -> int:
+        return self.entities.get(entity_type, {}).get(name, 0)
+
+    def type_of(self, name: str):
+        """The type name is most often recorded as, or None."""
+        best = max(ENTITY_TYPES, key=lambda t: self.frequency(name, t))
+        return best if self.frequency(name, best) else None
+
+    def rank(self, names, entity_type: str):
+        """names, most frequent in the corpus first; ties keep their order."""
+        counts = self.entities.get(entity_type, {})
+        return sorted(names, key=lambda name: -counts.get(name, 0))
+
+    def distractors(self, entity_type: str, exclude, count: int = 3, seed: str = ""):
+        """
+        count of the most frequent entities of entity_type with as many words
+        as seed that are not in exclude (any container, e.g. the article text
+        to skip names it mentions). seed picks which of the best 3 * count
+        candidates come first, so different answers get different (but
+        reproducible) distractors.
+        """
+        words = len(seed.split())
+        candidates = []
+        for name in self._top.get(entity_type, ()):
+            if name not in exclude and name != seed and len(name.split()) == words:
+                candidates.append(name)
+                if len(candidates) == 3 * count:
+                    break
+        if not candidates:
+            return []
+        start = zlib.crc32(seed.encode("utf-8")) % len(candidates)
+        return (candidates[start:] + candidates[:start])[:count]
+
+    def _rebuild_top(self):
+        self._top = {
+            entity_type: heapq.nsmallest(TOP_PER_TYPE, counts, key=lambda n: (-counts[n], n))
+            for entity_type, counts in self.entities.items()
+        }
+
+    # Snapshot file
+
+    def dumps(self) -> bytes:
+        payload = {"v": 2, "watermark": self.watermark, "mentions": self.mentions, "entities": self.entities}
+        return storage.compress(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+    @classmethod
+    def loads(cls, blob: bytes) -> "EntityIndex":
+        payload = json.loads(storage.decompress(blob))
+        index = cls()
+        index.watermark = payload["watermark"]
+        index.mentions = payload.get("mentions", -1)  # v1 snapshots are rebuilt
+        index.entities.update(payload["entities"])
+        index._rebuild_top()
+        return index
+
+current = EntityIndex()
+
+def _read_snapshot(path: str = None):
+    path = ENTITY_INDEX_PATH if path is None else path
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return EntityIndex.loads(f.read())
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("Ignoring unreadable entity index snapshot %s: %s", path, e)
+        return None
+
+def _write_snapshot(index: EntityIndex, path: str = None):
+    path = ENTITY_INDEX_PATH if path is None else path
+    if not path:
+        return
+    partial = f"{path}.{os.getpid()}.tmp"  # Several processes may write at once
+    with open(partial, "wb") as f:
+        f.write(index.dumps())
+    os.replace(partial, path)  # Readers never see a half-written file
+
+def load_snapshot(path: str = None) -> bool:
+    """Replace the in-memory index with the snapshot file, if there is one (generation workers)."""
+    global current
+    index = _read_snapshot(path)
+    if index is None:
+        return False
+    current = index
+    return True
+
+def _from_table(conn, base: EntityIndex = None) -> EntityIndex:
+    """
+    The index as the entity_mentions table has it: base (a snapshot) plus the
+    mentions above its watermark. When the table no longer has base's number of
+    rows up to the watermark (a transaction with lower quiz ids committed after
+    the snapshot was taken, or quizzes were deleted), it is counted from scratch.
+    """
+    Mention = models.EntityMention
+    index = base or EntityIndex()
+    if index.watermark:
+        below = conn.execute(
+            select(func.count()).select_from(Mention).where(Mention.quiz_id <= index.watermark)
+        ).scalar()
+        if below != index.mentions:
+            logger.info("Entity index snapshot differs from the table up to quiz %d, recounting", index.watermark)
+            index = EntityIndex()
+    watermark = index.watermark
+    for name, entity_type, count, last_quiz in conn.execute(
+        select(Mention.entity, Mention.type, func.count(), func.max(Mention.quiz_id))
+        .where(Mention.quiz_id > index.watermark)
+        .group_by(Mention.entity, Mention.type)
+    ):
+        index.add(name, entity_type, count)
+        index.mentions += count
+        watermark = max(watermark, last_quiz)
+    index.watermark = watermark
+    return index
+
+def save_snapshot(conn, path: str = None) -> EntityIndex:
+    """Bring the snapshot file up to date with the entity_mentions table (sync; any process may call it)."""
+    base = _read_snapshot(path)
+    written = (base.watermark, base.mentions) if base is not None else None
+    index = _from_table(conn, base)
+    if (index.watermark, index.mentions) != written:
+        _write_snapshot(index, path)
+    return index
+
+async def index_quizzes(db: AsyncSession, rows):
+    """
+    Record (quiz_id, key_entities) rows in the caller's transaction. They are
+    counted in memory once it commits; a rollback leaves the index untouched.
+    """
+    mention_rows = [
+        {"entity": name, "type": entity_type, "quiz_id": quiz_id}
+        for quiz_id, key_entities in rows
+        for entity_type, name in mentions(key_entities)
+    ]
+    if mention_rows:
+        await db.execute(insert(models.EntityMention), mention_rows)
+    db.sync_session.info.setdefault(_PENDING, []).extend(rows)
+
+_PENDING = "entity_index_pending"  # Session.info key: rows written in the open transaction
+
+@event.listens_for(Session, "after_commit")
+def _count_committed(session):
+    for _, key_entities in session.info.pop(_PENDING, ()):
+        current.add_quiz(key_entities)
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_uncommitted(session, transaction):
+    # Rolled back, or closed without a commit (after a commit the list is already gone)
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+async def quizzes_with(db: AsyncSession, name: str, limit: int = 20):
+    """Ids of the latest quizzes mentioning an entity."""
+    result = await db.execute(
+        select(models.EntityMention.quiz_id)
+        .where(models.EntityMention.entity == name)
+        .order_by(models.EntityMention.quiz_id.desc())
+        .limit(limit)
+    )
+    return list(result.scalars())
+
+# Startup (sync; runs inside engine.begin())
+
+def ensure_index(conn):
+    """Backfill quizzes that have no mentions, then load the index from the snapshot and the table."""
+    global current
+    Mention, Quiz = models.EntityMention, models.Quiz
+
+    # Quizzes saved before the index existed
+    last_indexed = conn.execute(select(func.max(Mention.quiz_id))).scalar() or 0
+    backfilled = 0
+    while True:
+        quizzes = conn.execute(
+            select(Quiz.id, Quiz.key_entities).where(Quiz.id > last_indexed).order_by(Quiz.id).limit(_BATCH)
+        ).all()
+        if not quizzes:
+            break
+        rows = [
+            {"entity": name, "type": entity_type, "quiz_id": quiz_id}
+            for quiz_id, key_entities in quizzes
+            for entity_type, name in mentions(key_entities)
+        ]
+        if rows:
+            conn.execute(insert(Mention), rows)
+        last_indexed = quizzes[-1][0]
+        backfilled += len(quizzes)
+    if backfilled:
+        logger.info("Entity index backfilled with %d quizzes", backfilled)
+
+    current = save_snapshot(conn)
+    logger.info("Entity index: %d entities up to quiz %d", len(current), current.watermark)
@@ -0,0 +1,226 @@
+import html as html_lib
+import io
+import os
+import re
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the BeautifulSoup engine always works
+    etree = None
+
+# Paragraphs under a <div> whose class mentions one of these are not article prose
+SKIP_CLASS_MARKERS = ("reference", "navbox", "infobox")
+MIN_PARAGRAPH_LENGTH = 30
+_CLEARABLE_TAGS = frozenset(("p", "h1", "h2", "h3", "div", "table", "ul", "ol"))
+_FIRST_HEADING = re.compile(rb'<h1\b[^>]*\bid=["\']firstHeading["\'][^>]*>(.*?)</h1>', re.S | re.I)
+_TAG = re.compile(r"<[^>]+>")
+
+def _is_skipped_class(value: str) -> bool:
+    value = value.lower()
+    return any(marker in value for marker in SKIP_CLASS_MARKERS)
+
+def _join(headings, paragraphs) -> str:
+    # Headings first, then the prose - the layout the quiz generator was tuned on
+    text_content = "\n".join(paragraphs)
+    if headings:
+        text_content = "\n".join(headings) + "\n\n" + text_content
+    return text_content
+
+class SoupExtractor:
+    """
+    Reference engine: full BeautifulSoup tree with the stdlib html.parser.
+    """
+    name = "bs4"
+
+    def extract(self, html):
+        from bs4 import BeautifulSoup  # Only this engine needs it; keeps it off the startup path
+
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Extract title
+        title_elem = soup.find('h1', {'id': 'firstHeading'})
+        if not title_elem:
+            raise ValueError("Could not find article title")
+        title = title_elem.text.strip()
+
+        # Extract content (paragraphs)
+        content_div = soup.find('div', {'id': 'mw-content-text'})
+        if not content_div:
+            raise ValueError("Could not find article content")
+
+        # Extract ALL paragraphs, filtering out reference/navbox/infobox sections
+        paragraphs = []
+        for p in content_div.find_all('p'):
+            text = p.text.strip()
+            if len(text) > MIN_PARAGRAPH_LENGTH and not p.find_parent('div', class_=lambda x: x and _is_skipped_class(x)):
+                paragraphs.append(text)
+
+        # Also extract section headings for better context
+        headings = [h.text.strip() for h in content_div.find_all(['h2', 'h3'])]
+        headings = [h for h in headings if h]
+
+        return {"title": title, "text": _join(headings, paragraphs)}
+
+class LxmlExtractor:
+    """
+    Streaming engine: a single lxml iterparse pass over the document.
+
+    Skipped subtrees are tracked on the way down, so paragraph ancestry never has
+    to be searched, and block-level elements are cleared once handled to keep
+    memory flat on very long articles.
+    """
+    name = "lxml"
+
+    def extract(self, html):
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+
+        title = None
+        in_content = False
+        content_found = False
+        div_stack = []  # (is_content_div, is_skipped) for every open <div>
+        skipped = 0
+        headings = []
+        paragraphs = []
+
+        for event, el in etree.iterparse(io.BytesIO(html), events=("start", "end"), html=True, recover=True):
+            tag = el.tag
+            if event == "start":
+                if tag == "div":
+                    is_content = el.get("id") == "mw-content-text" and not content_found
+                    is_skipped = in_content and _is_skipped_class(el.get("class") or "")
+                    if is_content:
+                        in_content = content_found = True
+                    if is_skipped:
+                        skipped += 1
+                    div_stack.append((is_content, is_skipped))
+                continue
+
+            if tag == "div":
+                if div_stack:
+                    is_content, is_skipped = div_stack.pop()
+                    if is_content:
+                        in_content = False
+                    if is_skipped:
+                        skipped -= 1
+            elif tag == "h1" and title is None and el.get("id") == "firstHeading":
+                title = "".join(el.itertext()).strip()
+            elif in_content and not skipped:
+                if tag == "p":
+                    text = "".join(el.itertext()).strip()
+                    if len(text) > MIN_PARAGRAPH_LENGTH:
+                        paragraphs.append(text)
+                elif tag == "h2" or tag == "h3":
+                    text = "".join(el.itertext()).strip()
+                    if text:
+                        headings.append(text)
+            # Block-level elements are never looked at again once they end;
+            # inline ones are kept until the enclosing paragraph/heading is read
+            if tag in _CLEARABLE_TAGS:
+                el.clear(keep_tail=True)
+
+        if not title:
+            raise ValueError("Could not find article title")
+        if not content_found:
+            raise ValueError("Could not find article content")
+        return {"title": title, "text": _join(headings, paragraphs)}
+
+EXTRACTORS = {
+    SoupExtractor.name: SoupExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+# Wikitext (XML dumps): the same rules applied to markup instead of rendered HTML.
+# Templates stand in for infoboxes/navboxes and <ref> for references, so both are dropped.
+_WIKI_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_WIKI_REF = re.compile(r"<ref[^>/]*/>|<ref[^>]*>.*?</ref>", re.S | re.I)
+_WIKI_TEMPLATE = re.compile(r"\{\{[^{}]*\}\}")
+_WIKI_TABLE = re.compile(r"\{\|(?:(?!\{\|).)*?\|\}", re.S)
+_WIKI_LINK = re.compile(r"\[\[([^\[\]]*)\]\]")
+_WIKI_EXTERNAL_LINK = re.compile(r"\[(?:https?:)?//[^\s\]]+\s*([^\]]*)\]")
+_WIKI_QUOTES = re.compile(r"'{2,}")
+_WIKI_HEADING = re.compile(r"^(={2,6})\s*(.*?)\s*\1\s*$")
+_WIKI_NON_PROSE = ("*", "#", ":", ";", "|", "!", "{", "}", "[[", "__")
+_WIKI_DROPPED_LINKS = ("file:", "image:", "category:", "media:")
+
+def _strip_nested(pattern, text: str) -> str:
+    # Innermost first, until nothing is left to remove
+    while True:
+        text, count = pattern.subn("", text)
+        if not count:
+            return text
+
+def _link_text(match) -> str:
+    target = match.group(1)
+    if target.lower().lstrip(":").startswith(_WIKI_DROPPED_LINKS):
+        return ""  # Files and categories are not prose
+    return target.rsplit("|", 1)[-1]
+
+def extract_wikitext(title: str, wikitext: str) -> dict:
+    """
+    {"title", "text"} from an article's wikitext, as the HTML extractors would
+    produce it from the rendered page: ==/=== headings and prose paragraphs
+    longer than MIN_PARAGRAPH_LENGTH, without infoboxes, navboxes or references.
+    """
+    text = _WIKI_COMMENT.sub("", wikitext)
+    text = _WIKI_REF.sub("", text)
+    text = _strip_nested(_WIKI_TEMPLATE, text)
+    text = _strip_nested(_WIKI_TABLE, text)
+    while True:
+        text, count = _WIKI_LINK.subn(_link_text, text)
+        if not count:
+            break
+    text = _WIKI_EXTERNAL_LINK.sub(r"\1", text)
+    text = _WIKI_QUOTES.sub("", text)
+    text = html_lib.unescape(_TAG.sub("", text))
+
+    headings = []
+    paragraphs = []
+    lines = []
+
+    def end_paragraph():
+        paragraph = " ".join(lines).strip()
+        lines.clear()
+        if len(paragraph) > MIN_PARAGRAPH_LENGTH:
+            paragraphs.append(paragraph)
+
+    for line in text.split("\n"):
+        line = line.strip()
+        heading = _WIKI_HEADING.match(line)
+        if heading:
+            end_paragraph()
+            if len(heading.group(1)) <= 3 and heading.group(2):
+                headings.append(heading.group(2))
+        elif not line or line.startswith(_WIKI_NON_PROSE):
+            end_paragraph()
+        else:
+            lines.append(line)
+    end_paragraph()
+
+    return {"title": title.strip(), "text": _join(headings, paragraphs)}
+
+def available_extractors():
+    return [name for name in EXTRACTORS if name != LxmlExtractor.name or etree is not None]
+
+def get_extractor(name: str = None):
+    """
+    Return an extraction engine by name (SCRAPE_EXTRACTOR env var by default).
+    Falls back to BeautifulSoup when lxml is not installed.
+    """
+    name = name or os.getenv("SCRAPE_EXTRACTOR") or (LxmlExtractor.name if etree is not None else SoupExtractor.name)
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}'. Choose one of: {', '.join(EXTRACTORS)}")
+    if name == LxmlExtractor.name and etree is None:
+        raise ValueError("The lxml extractor requires the 'lxml' package")
+    return EXTRACTORS[name]()
+
+def peek_title(head: bytes):
+    """
+    The firstHeading title from the first bytes of a page, so it can be shown
+    before the whole article has downloaded. None until the full <h1> is there.
+    """
+    match = _FIRST_HEADING.search(head)
+    if not match:
+        return None
+    title = html_lib.unescape(_TAG.sub("", match.group(1).decode("utf-8", "replace"))).strip()
+    return title or None
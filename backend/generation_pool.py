@@ -0,0 +1,174 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+
+# thread: dedicated thread pool (default)
+# process: process pool - regex-heavy generation runs outside the GIL
+# inline: run on the event loop (lowest overhead for tiny articles, blocks the loop)
+QUIZ_EXECUTOR = os.getenv("QUIZ_EXECUTOR", "thread").lower()
+QUIZ_WORKERS = int(os.getenv("QUIZ_WORKERS", str(os.cpu_count() or 2)))
+QUIZ_MAX_TASKS_PER_CHILD = int(os.getenv("QUIZ_MAX_TASKS_PER_CHILD", "500"))
+QUIZ_MAX_PENDING = int(os.getenv("QUIZ_MAX_PENDING", str(QUIZ_WORKERS * 8)))
+
+MODES = ("thread", "process", "inline")
+
+class ExecutorOverloaded(Exception):
+    """Raised when the generation queue is full; callers should answer 503."""
+
+def _warm_up():
+    # Pay for imports and regex compilation before the first real request
+    import services
+    if multiprocessing.parent_process() is not None:
+        # Process workers don't share the server's entity index; start from its last snapshot
+        import entity_index
+        entity_index.load_snapshot()
+    services._generate_smart_quiz("Warm Up. " + "Alan Turing was born in London in 1912 and studied at Cambridge. " * 4)
+
+def _ping():
+    return os.getpid()
+
+def _timed_call(fn, submitted_at, *args):
+    # Wall-clock time so queue wait can be measured across processes too
+    started_at = time.time()
+    result = fn(*args)
+    return started_at - submitted_at, time.time() - started_at, result
+
+def _collect(fn, *args):
+    # Process mode: generator objects can't cross the process boundary
+    return list(fn(*args))
+
+_DONE = object()
+
+class GenerationExecutor:
+    """
+    Runs CPU-bound quiz generation in a thread pool, a process pool or inline.
+
+    At most max_pending jobs may be queued or running; beyond that run() raises
+    ExecutorOverloaded instead of letting the backlog grow without bound. A job
+    counts until it really finishes, even if the request awaiting it gave up.
+    """
+
+    def __init__(self, mode: str = QUIZ_EXECUTOR, workers: int = QUIZ_WORKERS,
+                 max_pending: int = QUIZ_MAX_PENDING, max_tasks_per_child: int = QUIZ_MAX_TASKS_PER_CHILD):
+        if mode not in MODES:
+            raise ValueError(f"Unknown QUIZ_EXECUTOR '{mode}'. Choose one of: {', '.join(MODES)}")
+        self.mode = mode
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_tasks_per_child = max_tasks_per_child
+        self.pending = 0
+        self.rejected = 0
+        self._pool = None
+        self._lock = threading.Lock()  # pending is released from pool threads
+
+    def start(self):
+        """Create the pool and bring every worker up, warmed, before traffic arrives."""
+        if self.mode == "inline" or self._pool is not None:
+            return
+        if self.mode == "process":
+            options = {"max_workers": self.workers, "initializer": _warm_up}
+            if sys.version_info >= (3, 11) and self.max_tasks_per_child:
+                # Recycle workers periodically so fragmentation/leaks can't accumulate
+                options["max_tasks_per_child"] = self.max_tasks_per_child
+            self._pool = ProcessPoolExecutor(**options)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="quiz-gen", initializer=_warm_up)
+        for future in [self._pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(self, fn, *args):
+        if self.mode == "inline":
+            with metrics.stage("generate"):
+                return fn(*args)
+
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorOverloaded(f"{self.pending} generation jobs already queued")
+            self.pending += 1
+
+        if self._pool is None:
+            self.start()
+        try:
+            future = self._pool.submit(_timed_call, fn, time.time(), *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); replace the pool and retry once
+            self._release(None)
+            self.shutdown()
+            self.start()
+            return await self.run(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        # Cancelling the awaiting coroutine cancels the job if it has not started yet
+        queue_wait, duration, result = await asyncio.wrap_future(future)
+        metrics.observe_stage("queue_wait", max(queue_wait, 0.0))
+        metrics.observe_stage("generate", duration)
+        return result
+
+    async def stream(self, fn, *args):
+        """
+        Like run() for a generator function: yields its items as the worker
+        produces them. In process mode the items arrive together at the end.
+        """
+        if self.mode == "inline":
+            for item in fn(*args):
+                yield item
+            return
+        if self.mode == "process":
+            for item in await self.run(_collect, fn, *args):
+                yield item
+            return
+
+        loop = asyncio.get_running_loop()
+        items = asyncio.Queue()
+
+        def produce():
+            for item in fn(*args):
+                loop.call_soon_threadsafe(items.put_nowait, item)
+            loop.call_soon_threadsafe(items.put_nowait, _DONE)
+
+        def finished(task):
+            if not task.cancelled() and task.exception() is not None:
+                items.put_nowait(_DONE)
+
+        task = asyncio.ensure_future(self.run(produce))
+        task.add_done_callback(finished)
+        try:
+            while True:
+                item = await items.get()
+                if item is _DONE:
+                    break
+                yield item
+            await task  # Raises ExecutorOverloaded or the generator's exception
+        finally:
+            if not task.done():
+                task.cancel()
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+        }
+
+generation_executor = GenerationExecutor()
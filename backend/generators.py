@@ -0,0 +1,329 @@
+"""
+Quiz generator backends, chosen with QUIZ_GENERATOR:
+
+- instant: the pattern engine in services (default; CPU only, runs in the generation executor)
+- llm: Gemini (GEMINI_MODEL); falls back to the instant quiz when the model fails or is too slow
+- tiered: answers with the instant quiz and asks the LLM in the background; once
+  its quiz is ready, the next request for the article saves and returns it
+
+Every result is memoized in a bounded LRU keyed by (hash of the article text,
+generator version), so identical text is never generated twice by the same
+backend. Instant quizzes also depend on the entity index (entity ranking and
+distractors), so their key adds the index generation they were built against.
+Quizzes record the version that produced them in Quiz.generator.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+
+import entity_index
+import revisions
+import services
+from caching import LRUCache
+
+logger = logging.getLogger(__name__)
+
+QUIZ_GENERATOR = os.getenv("QUIZ_GENERATOR", "instant").lower()
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "5"))
+LLM_MAX_CHARS = int(os.getenv("LLM_MAX_CHARS", "12000"))  # Article text sent in the prompt
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # Background upgrades in flight (tiered)
+LLM_MAX_PENDING = int(os.getenv("LLM_MAX_PENDING", "256"))  # Upgrades waiting for a slot; more are dropped
+QUIZ_RESULT_CACHE_SIZE = int(os.getenv("QUIZ_RESULT_CACHE_SIZE", "512"))
+
+PROMPT_VERSION = 1
+DIFFICULTIES = ("easy", "medium", "hard")
+ENTITY_TYPES = ("people", "organizations", "locations")
+
+results = LRUCache(QUIZ_RESULT_CACHE_SIZE)
+
+def quiz_parts(quiz: dict):
+    """A complete quiz as the (part, value) pairs services.iter_smart_quiz yields."""
+    yield "summary", quiz.get("summary", "")
+    yield "key_entities", quiz.get("key_entities", {})
+    for question in quiz.get("quiz", []):
+        yield "question", question
+    yield "quiz", quiz
+
+class InstantGenerator:
+    """The pattern engine; bump version whenever its output changes."""
+    name = "instant"
+    version = "instant:1"
+    timeout = 2.0
+    upgrades = False
+
+    def key(self, text_hash: str):
+        return text_hash, self.version, entity_index.current.generation
+
+    async def generate(self, text: str, text_hash: str, executor):
+        key = self.key(text_hash)
+        quiz = results.get(key)
+        if quiz is None:
+            quiz = dict(await executor.run(services.generate_quiz_content, text), generator=self.version)
+            results.set(key, quiz)
+        return quiz
+
+    async def stream(self, text: str, text_hash: str, executor):
+        key = self.key(text_hash)
+        quiz = results.get(key)
+        if quiz is not None:
+            for part in quiz_parts(quiz):
+                yield part
+            return
+        async for part, value in executor.stream(services.iter_quiz_content, text):
+            if part == "quiz":
+                value = dict(value, generator=self.version)
+                results.set(key, value)
+            yield part, value
+
+# LLM
+
+_PROMPT = """Write a multiple-choice quiz about the Wikipedia article below.
+Answer with JSON only, in exactly this shape:
+{"summary": "2-3 sentences", "key_entities": {"people": [], "organizations": [], "locations": []},
+ "sections": ["main section titles"], "related_topics": ["3-5 Wikipedia topics to read next"],
+ "quiz": [{"question": "...", "options": ["four", "distinct", "short", "options"], "answer": "the correct option, copied exactly",
+           "difficulty": "easy|medium|hard", "explanation": "one sentence citing the article"}]}
+Write 5 to 7 questions, each answerable from the article alone, with plausible wrong options.
+
+Article:
+"""
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+def build_prompt(text: str) -> str:
+    return _PROMPT + text[:LLM_MAX_CHARS]
+
+def _strings(value, limit: int):
+    if not isinstance(value, list):
+        return []
+    return [item.strip() for item in value if isinstance(item, str) and item.strip()][:limit]
+
+def parse_quiz(raw: str) -> dict:
+    """
+    The model's answer -> a quiz in the generator's shape. Malformed questions
+    are dropped; raises ValueError when nothing usable is left.
+    """
+    try:
+        data = json.loads(_FENCE.sub("", raw.strip()))
+    except (AttributeError, ValueError) as e:
+        raise ValueError(f"LLM answer is not JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("LLM answer is not a JSON object")
+
+    questions = []
+    for item in data.get("quiz") or []:
+        if not isinstance(item, dict) or not isinstance(item.get("question"), str):
+            continue
+        options = _strings(item.get("options"), 6)
+        answer = item.get("answer")
+        if len(options) < 2 or answer not in options:
+            continue
+        difficulty = item.get("difficulty")
+        questions.append({
+            "question": item["question"].strip(),
+            "options": options,
+            "answer": answer,
+            "difficulty": difficulty if difficulty in DIFFICULTIES else "medium",
+            "explanation": item.get("explanation") if isinstance(item.get("explanation"), str) else "",
+        })
+    if not questions:
+        raise ValueError("LLM answer has no usable questions")
+
+    entities = data.get("key_entities") if isinstance(data.get("key_entities"), dict) else {}
+    summary = data.get("summary")
+    return {
+        "summary": summary.strip() if isinstance(summary, str) else "",
+        "key_entities": {entity_type: _strings(entities.get(entity_type), 8) for entity_type in ENTITY_TYPES},
+        "sections": _strings(data.get("sections"), 20),
+        "quiz": questions[:10],
+        "related_topics": _strings(data.get("related_topics"), 8),
+    }
+
+class GeminiClient:
+    """prompt -> response text through google.generativeai (imported on first use)."""
+
+    def __init__(self, model: str = GEMINI_MODEL):
+        self.model = model
+        self._model = None
+
+    async def generate(self, prompt: str) -> str:
+        if self._model is None:
+            self._model = services.gemini().GenerativeModel(self.model)
+        response = await self._model.generate_content_async(
+            prompt, generation_config={"response_mime_type": "application/json"}
+        )
+        return response.text
+
+class LLMGenerator:
+    name = "llm"
+    upgrades = True
+
+    def __init__(self, client=None, model: str = None, timeout: float = LLM_TIMEOUT, fallback=None):
+        if client is None and not os.getenv("GEMINI_API_KEY"):
+            raise ValueError("The llm and tiered generators need GEMINI_API_KEY (or use QUIZ_GENERATOR=instant)")
+        self.model = model or GEMINI_MODEL
+        self.client = client or GeminiClient(self.model)
+        self.version = f"llm:{self.model}:{PROMPT_VERSION}"
+        self.llm_timeout = timeout
+        self.fallback = fallback or InstantGenerator()
+        self.timeout = timeout + self.fallback.timeout  # Worst case: the model times out, then the fallback runs
+        self.calls = 0
+        self.failures = 0
+
+    async def ask(self, text: str) -> dict:
+        """One model call, parsed; raises on errors, timeouts and unusable answers."""
+        self.calls += 1
+        try:
+            raw = await asyncio.wait_for(self.client.generate(build_prompt(text)), self.llm_timeout)
+            return dict(parse_quiz(raw), generator=self.version)
+        except Exception:
+            self.failures += 1
+            raise
+
+    async def generate(self, text: str, text_hash: str, executor):
+        key = (text_hash, self.version)
+        quiz = results.get(key)
+        if quiz is not None:
+            return quiz
+        try:
+            quiz = await self.ask(text)
+        except Exception as e:
+            # An instant quiz beats an error page; it is cached under the instant key only
+            logger.warning("LLM generation failed (%s: %s), using the instant quiz", type(e).__name__, e)
+            return await self.fallback.generate(text, text_hash, executor)
+        results.set(key, quiz)
+        return quiz
+
+    async def stream(self, text: str, text_hash: str, executor):
+        # The model's answer arrives whole
+        for part in quiz_parts(await self.generate(text, text_hash, executor)):
+            yield part
+
+    def stats(self):
+        return {"calls": self.calls, "failures": self.failures}
+
+class TieredGenerator:
+    name = "tiered"
+    upgrades = True
+
+    def __init__(self, llm: LLMGenerator = None, instant: InstantGenerator = None,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_pending: int = LLM_MAX_PENDING):
+        self.instant = instant or InstantGenerator()
+        self.llm = llm or LLMGenerator(fallback=self.instant)
+        self.version = self.llm.version
+        self.timeout = self.instant.timeout
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._upgrades = {}  # text hash -> background task
+        self._slots = None
+        self.upgraded = 0
+        self.dropped = 0
+
+    async def generate(self, text: str, text_hash: str, executor):
+        quiz = results.get((text_hash, self.version))
+        if quiz is not None:
+            return quiz
+        self.upgrade(text, text_hash)
+        return await self.instant.generate(text, text_hash, executor)
+
+    async def stream(self, text: str, text_hash: str, executor):
+        quiz = results.get((text_hash, self.version))
+        if quiz is not None:
+            for part in quiz_parts(quiz):
+                yield part
+            return
+        self.upgrade(text, text_hash)
+        async for part in self.instant.stream(text, text_hash, executor):
+            yield part
+
+    def upgrade(self, text: str, text_hash: str):
+        """Ask the LLM for text in the background, unless it is cached, in flight or the queue is full."""
+        if text_hash in self._upgrades or results.peek((text_hash, self.version)) is not None:
+            return
+        if len(self._upgrades) >= self.max_pending:
+            self.dropped += 1
+            return
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._upgrades[text_hash] = asyncio.ensure_future(self._upgrade(text, text_hash))
+
+    async def _upgrade(self, text: str, text_hash: str):
+        try:
+            async with self._slots:
+                quiz = await self.llm.ask(text)
+            results.set((text_hash, self.version), quiz)
+            self.upgraded += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Background LLM upgrade failed (%s: %s)", type(e).__name__, e)
+        finally:
+            self._upgrades.pop(text_hash, None)
+
+    async def drain(self):
+        """Wait for the background upgrades in flight (benchmarks)."""
+        while self._upgrades:
+            await asyncio.gather(*list(self._upgrades.values()), return_exceptions=True)
+
+    def shutdown(self):
+        for task in list(self._upgrades.values()):
+            task.cancel()
+
+    def stats(self):
+        return dict(self.llm.stats(), pending=len(self._upgrades), upgraded=self.upgraded, dropped=self.dropped)
+
+GENERATORS = {
+    InstantGenerator.name: InstantGenerator,
+    LLMGenerator.name: LLMGenerator,
+    TieredGenerator.name: TieredGenerator,
+}
+
+def get_generator(name: str = None):
+    """Return a generator backend by name (QUIZ_GENERATOR env var by default)."""
+    name = name or QUIZ_GENERATOR
+    if name not in GENERATORS:
+        raise ValueError(f"Unknown QUIZ_GENERATOR '{name}'. Choose one of: {', '.join(GENERATORS)}")
+    return GENERATORS[name]()
+
+_current = None
+
+def current():
+    global _current
+    if _current is None:
+        _current = get_generator()
+    return _current
+
+def set_generator(generator):
+    """Use a specific backend, e.g. one with a stand-in LLM client."""
+    global _current
+    _current = generator
+
+async def generate(text: str, executor, text_hash: str = None) -> dict:
+    return await current().generate(text, text_hash or revisions.content_hash(text), executor)
+
+def stream(text: str, executor, text_hash: str = None):
+    return current().stream(text, text_hash or revisions.content_hash(text), executor)
+
+def upgrade_for(text_hash: str, stored_version: str, text: str = None):
+    """
+    A quiz from the current backend for text that was stored by another one,
+    when it is in the result cache; None otherwise. With text (tiered), a
+    missing upgrade is requested in the background for a later call.
+    """
+    generator = current()
+    if not generator.upgrades or not text_hash or stored_version == generator.version:
+        return None
+    quiz = results.peek((text_hash, generator.version))
+    if quiz is None and text is not None and isinstance(generator, TieredGenerator):
+        generator.upgrade(text, text_hash)
+    return quiz
+
+def shutdown():
+    if isinstance(_current, TieredGenerator):
+        _current.shutdown()
+
+def stats():
+    generator = current()
+    return dict(generator.stats() if hasattr(generator, "stats") else {}, name=generator.name, version=generator.version)
@@ -0,0 +1,219 @@
+"""
+Pre-seed the quiz bank from a local Wikipedia dump.
+
+    python ingest_dump.py enwiki-latest-pages-articles.xml.bz2 [--workers 8] [--batch 200]
+    python ingest_dump.py enwiki-NS0-html.ndjson.bz2 --format ndjson
+
+Reads the dump as a stream (bz2 or uncompressed) with constant memory:
+- xml: a MediaWiki pages-articles export; article wikitext is reduced to
+  headings and paragraphs with the same rules as scrape_wikipedia
+- ndjson: one rendered article per line (Wikimedia Enterprise HTML dumps:
+  name, url, article_body.html), run through the scraper's HTML extractor
+
+Extraction and quiz generation run in a process pool. Quizzes are bulk-inserted
+a batch at a time, and the batch's checkpoint is committed in the same
+transaction, so an interrupted run picks up where it stopped (--restart starts
+over). Only main-namespace articles are read; redirects are skipped. Uses
+DATABASE_URL like the app.
+"""
+import argparse
+import asyncio
+import bz2
+import collections
+import html
+import itertools
+import json
+import os
+import re
+import signal
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import database
+import entity_index
+import extractors
+import models
+import persistence
+import schema
+
+_BODY = re.compile(r"<body[^>]*>(.*)</body>", re.S | re.I)
+
+def _open(path: str):
+    return bz2.open(path, "rb") if path.endswith(".bz2") else open(path, "rb")
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]  # Export files namespace their tags by schema version
+
+def read_xml(fileobj, base_url: str):
+    """(url, title, kind, body, revision) for each article page of a MediaWiki export."""
+    events = ET.iterparse(fileobj, events=("start", "end"))
+    _, root = next(events)
+    for event, element in events:
+        if event != "end" or _local_name(element.tag) != "page":
+            continue
+        title = element.findtext("{*}title") or ""
+        namespace = element.findtext("{*}ns") or "0"
+        redirect = element.find("{*}redirect") is not None
+        revision = element.find("{*}revision")
+        revision_id = revision.findtext("{*}id") if revision is not None else None
+        wikitext = revision.findtext("{*}text") if revision is not None else None
+        root.clear()  # Drop the finished page so memory stays flat
+        if namespace != "0" or redirect or not wikitext:
+            continue
+        yield (base_url + title.replace(" ", "_"), title, "wikitext", wikitext,
+               f"rev:{revision_id}" if revision_id else None)
+
+def read_ndjson(fileobj, base_url: str):
+    """(url, title, kind, body, revision) for each article of a rendered-HTML dump."""
+    for line in fileobj:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record.get("namespace", {}).get("identifier", 0) != 0:
+            continue
+        title = record.get("name", "")
+        body = record.get("article_body", {}).get("html") or ""
+        match = _BODY.search(body)
+        # The dump has the rendered article only; give it the page frame the extractors look for
+        page = (
+            f'<html><body><h1 id="firstHeading">{html.escape(title)}</h1>'
+            f'<div id="mw-content-text">{match.group(1) if match else body}</div></body></html>'
+        )
+        version = record.get("version", {}).get("identifier")
+        yield (record.get("url") or base_url + title.replace(" ", "_"), title, "html", page,
+               f"rev:{version}" if version else None)
+
+READERS = {"xml": read_xml, "ndjson": read_ndjson}
+
+def _detect_format(path: str) -> str:
+    name = os.path.basename(path).lower()
+    return "ndjson" if ".ndjson" in name or ".json" in name else "xml"
+
+def _init_worker():
+    # Ctrl-C is handled by the parent, which stops handing out batches
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    entity_index.load_snapshot()  # Distractors come from the quiz bank as of the start of the run
+
+def generate_batch(articles):
+    """
+    Worker process: extract and generate quizzes for a batch of articles.
+    Returns ([(url, title, quiz_data)], failed); articles without usable text fail.
+    """
+    import revisions
+    import services
+
+    extractor = extractors.get_extractor()
+    quizzes = []
+    failed = 0
+    for url, title, kind, body, revision in articles:
+        try:
+            page = extractors.extract_wikitext(title, body) if kind == "wikitext" else extractor.extract(body)
+        except ValueError:
+            failed += 1
+            continue
+        if not page["text"]:
+            failed += 1
+            continue
+        quiz = services._generate_smart_quiz(page["text"])
+        quizzes.append((url, page["title"], dict(quiz, revision=revision, **revisions.fingerprint(page["text"]))))
+    return quizzes, failed
+
+def _batches(articles, size: int):
+    while True:
+        batch = list(itertools.islice(articles, size))
+        if not batch:
+            return
+        yield batch
+
+async def _checkpoint(source: str):
+    async with database.AsyncSessionLocal() as db:
+        return await db.get(models.IngestCheckpoint, source)
+
+async def _save(source: str, quizzes, position: int, total_quizzes: int):
+    """Insert a batch and move the checkpoint past it, in one transaction."""
+    async with database.AsyncSessionLocal() as db:
+        try:
+            await persistence.insert_quizzes(db, quizzes)
+            await db.merge(models.IngestCheckpoint(source=source, position=position, quizzes=total_quizzes))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+async def ingest(path: str, format: str, base_url: str, workers: int, batch: int, limit: int,
+                 restart: bool, report_every: float):
+    async with database.engine.begin() as conn:
+        await conn.run_sync(schema.prepare)
+        await conn.run_sync(entity_index.ensure_index)
+
+    source = os.path.basename(path)
+    checkpoint = None if restart else await _checkpoint(source)
+    position = checkpoint.position if checkpoint else 0
+    total_quizzes = checkpoint.quizzes if checkpoint else 0
+    if position:
+        print(f"Resuming {source} after {position} articles ({total_quizzes} quizzes already saved)")
+
+    loop = asyncio.get_running_loop()
+    started = last_report = time.perf_counter()
+    done = failed = saved = 0
+    with _open(path) as fileobj, ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        articles = READERS[format](fileobj, base_url)
+        articles = itertools.islice(articles, position, None if limit is None else position + limit)
+        pending = collections.deque()  # In dump order, so the checkpoint only ever moves past saved batches
+
+        async def save_oldest():
+            nonlocal position, total_quizzes, done, failed, saved, last_report
+            future, size = pending.popleft()
+            quizzes, batch_failed = await future
+            await _save(source, quizzes, position + size, total_quizzes + len(quizzes))
+            position += size
+            total_quizzes += len(quizzes)
+            done += size
+            failed += batch_failed
+            saved += len(quizzes)
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                last_report = now
+                print(f"{done} articles, {saved} quizzes saved, {failed} failed: {done / (now - started):.1f} articles/s")
+
+        try:
+            for articles_batch in _batches(articles, batch):
+                pending.append((loop.run_in_executor(pool, generate_batch, articles_batch), len(articles_batch)))
+                while len(pending) >= workers * 2:  # Bounded read-ahead keeps memory constant
+                    await save_oldest()
+            while pending:
+                await save_oldest()
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            print(f"Interrupted; the next run resumes after article {position}")
+            raise
+        finally:
+            async with database.engine.begin() as conn:
+                await conn.run_sync(entity_index.save_snapshot)
+
+    elapsed = time.perf_counter() - started
+    print(f"Ingested {done} articles from {source} in {elapsed:.1f}s: {saved} quizzes saved, {failed} failed")
+    print(f"{done / elapsed if elapsed else 0.0:.1f} articles/s with {workers} workers; "
+          f"checkpoint at article {position}, {total_quizzes} quizzes in total")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dump", help="pages-articles XML or HTML NDJSON, optionally .bz2")
+    parser.add_argument("--format", choices=sorted(READERS), help="default: from the file name")
+    parser.add_argument("--base-url", default="https://en.wikipedia.org/wiki/", help="article URL prefix for XML dumps")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch", type=int, default=200, help="articles per worker task and per insert")
+    parser.add_argument("--limit", type=int, help="stop after this many articles")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the beginning")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(ingest(args.dump, args.format or _detect_format(args.dump), args.base_url, args.workers,
+                           args.batch, args.limit, args.restart, args.report_every))
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import random
+import time
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+import models
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "2"))  # Seconds, doubled per attempt
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# A running job's lease is renewed every third of JOB_LEASE seconds; once it
+# expires (the process died), any process with workers queues the job again
+JOB_LEASE = float(os.getenv("JOB_LEASE", "30"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+def job_status(job: models.Job) -> dict:
+    return {
+        "id": job.id,
+        "url": job.url,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "quiz_id": job.quiz_id,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+class JobQueue:
+    """
+    Quiz generation jobs persisted in the jobs table and run by local workers.
+
+    handler(url) does the work and returns the new quiz id; any exception is
+    retried with exponential backoff until max_attempts is reached. A claimed
+    job holds a lease (locked_until) that its worker renews while it runs, so
+    several processes can share the table: only jobs whose lease has expired,
+    left behind by a process that died, are queued again.
+    """
+
+    def __init__(self, handler, workers: int = JOB_WORKERS, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 retry_delay: float = JOB_RETRY_DELAY, poll_interval: float = JOB_POLL_INTERVAL,
+                 lease: float = JOB_LEASE):
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.running = 0
+        self._recovered_at = 0.0
+        self._tasks = []
+        self._wake = None
+        self._changes = {}  # job id -> Event set on the next status change
+        self._waiting = {}  # job id -> number of wait_for_change calls on its Event
+
+    async def start(self):
+        if self._tasks or self.workers < 1:
+            return  # A process without workers leaves recovery to the ones that have them
+        await self._recover()
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the workers; interrupted jobs are picked up again once their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, db: AsyncSession, url: str, priority: int = 0) -> models.Job:
+        job = models.Job(url=url, status=QUEUED, priority=priority, attempts=0,
+                         max_attempts=self.max_attempts, run_after=0.0)
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        if self._wake is not None:
+            self._wake.set()
+        return job
+
+    async def get(self, db: AsyncSession, job_id: int):
+        return await db.get(models.Job, job_id, populate_existing=True)
+
+    async def wait_for_change(self, job_id: int, timeout: float):
+        """Wait until job_id changes status in this process, or timeout passes."""
+        event = self._changes.setdefault(job_id, asyncio.Event())
+        self._waiting[job_id] = self._waiting.get(job_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiting[job_id] -= 1
+            if not self._waiting[job_id]:
+                # The last waiter forgets the Event, or jobs nobody watches anymore pile up
+                del self._waiting[job_id]
+                if self._changes.get(job_id) is event:
+                    del self._changes[job_id]
+
+    def _notify(self, job_id: int):
+        event = self._changes.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _recover(self) -> int:
+        """Queue running jobs whose lease has expired (or that predate leases) again."""
+        Job = models.Job
+        self._recovered_at = time.time()
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Job)
+                .where(Job.status == RUNNING, or_(Job.locked_until.is_(None), Job.locked_until < time.time()))
+                .values(status=QUEUED, locked_until=None)
+            )
+            await db.commit()
+        if result.rowcount:
+            logger.warning("Requeued %d jobs whose worker stopped renewing the lease", result.rowcount)
+        return result.rowcount
+
+    async def _worker(self):
+        while True:
+            try:
+                if time.time() - self._recovered_at >= self.lease:
+                    await self._recover()
+                claimed = await self._claim()
+            except Exception as e:
+                logger.warning("Claiming a job failed: %s", e)
+                claimed = None
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                continue
+            self.running += 1
+            try:
+                await self._run(*claimed)
+            finally:
+                self.running -= 1
+
+    async def _claim(self):
+        """Mark the next runnable job as running; returns (id, url, attempts, max_attempts)."""
+        Job = models.Job
+        async with database.AsyncSessionLocal() as db:
+            while True:
+                row = (await db.execute(
+                    select(Job.id, Job.url, Job.attempts, Job.max_attempts)
+                    .where(Job.status == QUEUED, Job.run_after <= time.time())
+                    .order_by(Job.priority.desc(), Job.id)
+                    .limit(1)
+                )).first()
+                if row is None:
+                    return None
+                # Conditional update: another worker may have claimed it first
+                result = await db.execute(
+                    update(Job)
+                    .where(Job.id == row.id, Job.status == QUEUED)
+                    .values(status=RUNNING, attempts=Job.attempts + 1, locked_until=time.time() + self.lease)
+                )
+                await db.commit()
+                if result.rowcount == 1:
+                    self._notify(row.id)
+                    return row.id, row.url, row.attempts + 1, row.max_attempts
+
+    def _owned(self, job_id: int, attempts: int):
+        # This worker's claim: a job requeued after its lease expired and claimed again has more attempts
+        Job = models.Job
+        return update(Job).where(Job.id == job_id, Job.status == RUNNING, Job.attempts == attempts)
+
+    async def _renew(self, job_id: int, attempts: int):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                async with database.AsyncSessionLocal() as db:
+                    await db.execute(
+                        self._owned(job_id, attempts)
+                        .values(locked_until=time.time() + self.lease)
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.warning("Renewing the lease of job %d failed: %s", job_id, e)
+
+    async def _run(self, job_id: int, url: str, attempts: int, max_attempts: int):
+        renew = asyncio.ensure_future(self._renew(job_id, attempts))
+        try:
+            quiz_id = await self.handler(url)
+            values = {"status": SUCCEEDED, "quiz_id": quiz_id, "error": None}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e) or type(e).__name__
+            if attempts < max_attempts:
+                delay = self.retry_delay * 2 ** (attempts - 1) * random.uniform(0.8, 1.2)
+                values = {"status": QUEUED, "error": error, "run_after": time.time() + delay}
+            else:
+                values = {"status": FAILED, "error": error}
+        finally:
+            renew.cancel()
+        values["locked_until"] = None
+        try:
+            async with database.AsyncSessionLocal() as db:
+                result = await db.execute(self._owned(job_id, attempts).values(**values))
+                await db.commit()
+        except Exception as e:
+            # The lease runs out and the job is queued again
+            logger.error("Recording the outcome of job %d failed: %s", job_id, e)
+            return
+        if result.rowcount != 1:
+            logger.warning("Job %d was reclaimed after its lease expired; dropping this outcome", job_id)
+        self._notify(job_id)
+
+    def stats(self):
+        return {"workers": len(self._tasks), "running": self.running}
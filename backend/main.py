@@ -1,15 +1,97 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload, joinedload, undefer
 from typing import List, Optional
+from contextlib import asynccontextmanager
+from datetime import datetime
 import asyncio
+import base64
+import hashlib
+import logging
+import os
 import database
+import entity_index
+import generators
+import jobs
+import metrics
 import models
+import outbound
+import persistence
+import responses
+import revisions
+import schema
+import search
 import services
+import storage
+from caching import LRUCache
+from coalesce import SingleFlight
+from generation_pool import generation_executor, ExecutorOverloaded
+from scrape_cache import scrape_cache, normalize_url
 
-app = FastAPI()
+# LOG_LEVEL=DEBUG shows every pipeline step; below the level, log calls are skipped cheaply
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup()
+    try:
+        yield
+    finally:
+        await shutdown()
+
+app = FastAPI(lifespan=lifespan, default_response_class=responses.ORJSONResponse)
+
+# Concurrent /api/generate and /api/generate/stream calls for the same article share one generation
+generation_flights = SingleFlight()
+
+class GenerationProgress:
+    """
+    The (part, value) pairs a generation flight has produced so far: title,
+    summary, key_entities, each question, and "reused" when an existing quiz is
+    returned. Stream requests that join the flight replay them, then follow.
+    """
+
+    def __init__(self, streamed: bool):
+        self.streamed = streamed  # Generate part by part (a stream started the flight)
+        self.parts = []
+        self.changed = asyncio.Event()
+
+    def emit(self, part: str, value):
+        self.parts.append((part, value))
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+generation_progress = {}  # flight task -> GenerationProgress
+
+def _join_generation(url: str, streamed: bool):
+    """Start or join the shared generation for url; returns (key, flight, progress). Follow with generation_flights.leave."""
+    key = normalize_url(url)
+    progress = GenerationProgress(streamed)
+    flight = generation_flights.join(key, lambda: _generate_shared(url, progress))
+    if flight.task not in generation_progress:
+        generation_progress[flight.task] = progress
+        flight.task.add_done_callback(lambda task: generation_progress.pop(task, None))
+    return key, flight, generation_progress[flight.task]
+
+# Serialized GET /api/history/{id} bodies; quizzes don't change once created
+QUIZ_DETAIL_CACHE_SIZE = int(os.getenv("QUIZ_DETAIL_CACHE_SIZE", "1024"))
+QUIZ_DETAIL_MAX_AGE = int(os.getenv("QUIZ_DETAIL_MAX_AGE", "300"))
+quiz_detail_cache = LRUCache(QUIZ_DETAIL_CACHE_SIZE)
+
+# POST /api/generate/batch limits
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+
+# Background jobs have no request waiting on them, so stages get more time
+JOB_SCRAPE_TIMEOUT = float(os.getenv("JOB_SCRAPE_TIMEOUT", "30"))
+JOB_GENERATE_TIMEOUT = float(os.getenv("JOB_GENERATE_TIMEOUT", "30"))
 
 # CORS
 app.add_middleware(
@@ -18,89 +100,325 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "ETag"],
 )
 
-# Startup: Create tables
-@app.on_event("startup")
+# Startup: schema DDL only when the stored schema version is out of date (see schema.py)
 async def startup():
     async with database.engine.begin() as conn:
-        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.run_sync(schema.prepare)
+        await conn.run_sync(entity_index.ensure_index)
+    generators.current()  # A misconfigured QUIZ_GENERATOR fails here, not on the first request
+    if persistence.write_behind is not None:
+        persistence.write_behind.start()
+    generation_executor.start()
+    await job_queue.start()
+
+async def shutdown():
+    await job_queue.stop()
+    generators.shutdown()
+    generation_executor.shutdown()
+    if persistence.write_behind is not None:
+        await persistence.write_behind.stop()
+    try:
+        async with database.engine.begin() as conn:
+            await conn.run_sync(entity_index.save_snapshot)
+    except Exception as e:
+        logger.warning("Could not save the entity index snapshot: %s", e)
+    await services.close_http_client()
 
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok", "message": "Server is running"}
 
+# Metrics: per-stage histograms live in metrics.py; gauges read live state on scrape
+requests_in_flight = 0
+
+@app.middleware("http")
+async def count_in_flight(request: Request, call_next):
+    global requests_in_flight
+    requests_in_flight += 1
+    try:
+        return await call_next(request)
+    finally:
+        requests_in_flight -= 1
+
+def _hit_ratio(hits: int, misses: int) -> float:
+    return hits / (hits + misses) if hits + misses else 0.0
+
+metrics.registry.gauge("quiz_http_requests_in_flight", "HTTP requests being handled.", lambda: requests_in_flight)
+metrics.registry.gauge("quiz_generations_in_flight", "Distinct articles being generated.", generation_flights.in_flight)
+metrics.registry.gauge("quiz_generation_waiters", "Requests waiting on an in-flight generation.", generation_flights.waiters)
+metrics.registry.gauge("quiz_executor_pending", "Generation jobs queued or running in the executor.", lambda: generation_executor.pending)
+metrics.registry.gauge("quiz_executor_rejected_total", "Generation jobs rejected with 503.", lambda: generation_executor.rejected, kind="counter")
+metrics.registry.gauge("quiz_entity_index_entities", "Distinct entities in the entity index.", lambda: len(entity_index.current))
+metrics.registry.gauge(
+    "quiz_result_cache_lookups_total", "Generated-quiz cache lookups (by text hash and generator version) by outcome.",
+    lambda: {"hit": generators.results.hits, "miss": generators.results.misses},
+    labelnames=("result",), kind="counter",
+)
+def _llm_calls():
+    stats = generators.stats()
+    return {"ok": stats.get("calls", 0) - stats.get("failures", 0), "failed": stats.get("failures", 0)}
+
+metrics.registry.gauge("quiz_llm_calls_total", "LLM generator calls by outcome.", _llm_calls, labelnames=("result",), kind="counter")
+metrics.registry.gauge("quiz_jobs_running", "Background jobs being processed.", lambda: job_queue.running)
+metrics.registry.gauge(
+    "quiz_scrape_cache_lookups_total", "Scrape cache lookups by outcome.",
+    lambda: {"memory_hit": scrape_cache.memory_hits, "db_hit": scrape_cache.db_hits,
+             "revalidated": scrape_cache.revalidated, "miss": scrape_cache.misses},
+    labelnames=("result",), kind="counter",
+)
+metrics.registry.gauge("quiz_scrape_cache_hit_ratio", "Share of scrapes answered without a download.", lambda: scrape_cache.stats()["hit_rate"])
+metrics.registry.gauge(
+    "quiz_detail_cache_lookups_total", "Quiz detail cache lookups by outcome.",
+    lambda: {"hit": quiz_detail_cache.hits, "miss": quiz_detail_cache.misses},
+    labelnames=("result",), kind="counter",
+)
+metrics.registry.gauge("quiz_detail_cache_hit_ratio", "Share of quiz detail requests served from cache.",
+                       lambda: _hit_ratio(quiz_detail_cache.hits, quiz_detail_cache.misses))
+metrics.registry.gauge("quiz_detail_cache_entries", "Quizzes in the detail cache.", lambda: len(quiz_detail_cache))
+metrics.registry.gauge(
+    "quiz_outbound_concurrency_limit", "Adaptive limit on concurrent fetches per host.",
+    lambda: {host: s["limit"] for host, s in outbound.stats().items()}, labelnames=("host",),
+)
+metrics.registry.gauge(
+    "quiz_outbound_requests_total", "Outbound fetches by outcome: sent, throttled (429/503), retried, shed before sending.",
+    lambda: {(host, result): s[result] for host, s in outbound.stats().items() for result in ("sent", "throttled", "retried", "shed")},
+    labelnames=("host", "result"), kind="counter",
+)
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Prometheus text exposition format."""
+    return Response(content=metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 # Pydantic Models for Request/Response
 class QuizRequest(BaseModel):
     url: str
 
+class QuizQuestion(BaseModel):
+    question: str
+    options: List[str]
+    answer: str
+    difficulty: Optional[str] = "medium"
+    explanation: Optional[str] = ""
+
+class KeyEntities(BaseModel):
+    people: List[str] = []
+    organizations: List[str] = []
+    locations: List[str] = []
+
 class GenerateResponse(BaseModel):
     id: int
     url: str
     title: str
     summary: str
-    key_entities: dict
+    key_entities: KeyEntities
     sections: Optional[List[str]] = []
-    quiz: List[dict]
+    quiz: List[QuizQuestion]
     related_topics: List[str]
 
 # Endpoints
 @app.post("/api/generate", response_model=GenerateResponse)
-async def generate_quiz(request: QuizRequest, db: AsyncSession = Depends(database.get_db)):
+async def generate_quiz(request: QuizRequest):
     # Set overall timeout of 8 seconds for the entire operation (fail fast!)
+    # The deadline applies per caller: a waiter that times out leaves the shared flight running for the others
+    key, flight, _ = _join_generation(request.url, streamed=False)
     try:
-        return await asyncio.wait_for(_generate_quiz_internal(request, db), timeout=8.0)
+        # wait_for may cancel its task before it starts, so the caller leaves the flight here, not inside it
+        quiz_id, payload = await asyncio.wait_for(asyncio.shield(flight.task), timeout=8.0)
+        return payload
     except asyncio.TimeoutError:
         raise HTTPException(status_code=504, detail="Request timed out after 8 seconds. Please try again.")
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in generate_quiz: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in generate_quiz: %s", e)
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    finally:
+        generation_flights.leave(key, flight)
+
+async def _generate_shared(url: str, progress: GenerationProgress):
+    # A shared flight outlives the request that started it, so it owns its own session
+    logger.debug("Starting quiz generation for URL: %s", url)
+    async with database.AsyncSessionLocal() as db:
+        return await _generate_or_reuse(url, db, progress=progress)
 
-async def _generate_quiz_internal(request: QuizRequest, db: AsyncSession):
-    print(f"\n{'='*60}")
-    print(f"Starting quiz generation for URL: {request.url}")
-    print(f"{'='*60}")
-    # 1. Scrape (run in thread pool with timeout)
+def _emit_quiz(emit, quiz: dict):
+    for part, value in generators.quiz_parts(quiz):
+        if part != "quiz":
+            emit(part, value)
+
+def _ignore(part: str, value):
+    pass
+
+async def _generate_or_reuse(url: str, db: AsyncSession, scrape_timeout: float = 6.0, generate_timeout: float = 2.0,
+                             progress: GenerationProgress = None):
+    """
+    Return (quiz_id, payload) for url, reusing the latest quiz for the same
+    article when it has not changed: first by revision (no download at all),
+    then by the hash of the scraped text (no generation). Steps are reported
+    to progress as they happen.
+    """
+    emit = progress.emit if progress is not None else _ignore
+    previous = await _latest_quiz(db, url) if revisions.QUIZ_REVISION_CHECK else None
+    # Hand the connection back to the pool for the scrape; expire_on_commit=False keeps previous loaded
+    await db.commit()
+    # The revision is stored with new quizzes too, so look it up alongside the scrape
+    revision_task = asyncio.ensure_future(_check_revision(url)) if revisions.QUIZ_REVISION_CHECK else None
     try:
-        print("Step 1: Scraping Wikipedia article...")
-        loop = asyncio.get_event_loop()
-        # Add timeout to scraping too
-        scraped_data = await asyncio.wait_for(
-            loop.run_in_executor(None, services.scrape_wikipedia, request.url),
-            timeout=6.0
-        )
-        print(f"✓ Scraping completed!")
-        print(f"  - Title: {scraped_data['title']}")
-        print(f"  - Content length: {len(scraped_data['text'])} characters (FULL article content)")
-        print(f"  - Content preview: {scraped_data['text'][:200]}...")
+        revision = None
+        if previous is not None and previous.revision:
+            revision = await revision_task
+            if revision == previous.revision:
+                emit("title", previous.title)
+                upgrade = generators.upgrade_for(previous.content_hash, previous.generator)
+                if upgrade is not None:
+                    _emit_quiz(emit, upgrade)
+                    return await _save_upgrade(db, url, previous, upgrade, revision)
+                logger.info("Article unchanged (%s), reusing quiz %d for %s", revision, previous.id, url)
+                return _reuse(emit, previous)
+
+        # A new revision means any cached copy of the article is out of date
+        titles = []
+
+        def on_title(title: str):
+            titles.append(title)
+            emit("title", title)
+
+        scraped_data = await _scrape(url, scrape_timeout, revalidate=revision is not None, on_title=on_title)
+        if not titles:
+            emit("title", scraped_data["title"])  # Served from the scrape cache
+        fingerprint = revisions.fingerprint(scraped_data["text"])
+        if revision_task is not None and revision is None:
+            revision = await revision_task
+
+        if previous is not None and previous.content_hash == fingerprint["content_hash"]:
+            upgrade = generators.upgrade_for(previous.content_hash, previous.generator, scraped_data["text"])
+            if upgrade is not None:
+                _emit_quiz(emit, upgrade)
+                return await _save_upgrade(db, url, previous, upgrade, revision or previous.revision)
+            logger.info("Article text unchanged, reusing quiz %d for %s", previous.id, url)
+            if revision and revision != previous.revision:
+                previous.revision = revision
+                await db.commit()
+            return _reuse(emit, previous)
+        if previous is not None and previous.section_hashes:
+            logger.info("Article changed: %d of %d blocks differ for %s",
+                        revisions.changed_blocks(previous.section_hashes, fingerprint["section_hashes"]),
+                        len(fingerprint["section_hashes"]), url)
+    finally:
+        if revision_task is not None:
+            revision_task.cancel()
+
+    streamed = progress is not None and progress.streamed
+    llm_data = await _generate(scraped_data, generate_timeout, fingerprint["content_hash"], emit if streamed else None)
+    record = dict(llm_data, revision=revision, **fingerprint)
+
+    # Save to DB (quiz and questions in one transaction)
+    quiz_id = await persistence.persist_quiz(db, url, scraped_data["title"], record)
+    logger.info("Quiz %d saved for %s", quiz_id, url)
+    return quiz_id, _generated_payload(quiz_id, url, scraped_data, llm_data)
+
+def _reuse(emit, previous: models.Quiz):
+    payload = _format_quiz(previous, with_questions=True)
+    _emit_quiz(emit, payload)
+    emit("reused", previous.id)
+    return previous.id, payload
+
+async def _save_upgrade(db: AsyncSession, url: str, previous: models.Quiz, quiz: dict, revision: str):
+    """Save the current generator's quiz for an unchanged article as a new quiz (llm/tiered upgrades)."""
+    record = dict(quiz, revision=revision, content_hash=previous.content_hash, section_hashes=previous.section_hashes)
+    quiz_id = await persistence.persist_quiz(db, url, previous.title, record)
+    logger.info("Quiz %d saved for %s, upgrading quiz %d (%s)", quiz_id, url, previous.id, previous.generator)
+    return quiz_id, _generated_payload(quiz_id, url, {"title": previous.title}, quiz)
+
+async def _latest_quiz(db: AsyncSession, url: str):
+    result = await db.execute(
+        select(models.Quiz)
+        .options(*_WITH_QUESTIONS)
+        .where(models.Quiz.url_key == normalize_url(url))
+        .order_by(models.Quiz.id.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+async def _check_revision(url: str):
+    try:
+        with outbound.deadline(2.0):
+            return await asyncio.wait_for(revisions.fetch_revision(url), timeout=2.0)
     except asyncio.TimeoutError:
-        print("⚠ Scraping timed out, using fallback...")
+        return None
+
+def _generated_payload(quiz_id: int, url: str, scraped_data: dict, llm_data: dict):
+    return {
+        "id": quiz_id,
+        "url": url,
+        "title": scraped_data["title"],
+        "summary": llm_data.get("summary", ""),
+        "key_entities": llm_data.get("key_entities", {}),
+        "sections": llm_data.get("sections", []),
+        "quiz": llm_data.get("quiz", []),
+        "related_topics": llm_data.get("related_topics", [])
+    }
+
+async def _scrape_and_generate(url: str, scrape_timeout: float = 6.0, generate_timeout: float = 2.0):
+    """Scrape and generate without saving; raises HTTPException on failure."""
+    scraped_data = await _scrape(url, scrape_timeout)
+    llm_data = await _generate(scraped_data, generate_timeout)
+    return scraped_data, dict(llm_data, **revisions.fingerprint(scraped_data["text"]))
+
+async def _scrape(url: str, timeout: float = 6.0, revalidate: bool = False, on_title=None):
+    try:
+        # Served from the scrape cache when the article was fetched recently;
+        # outbound retries only happen while they fit in the same timeout
+        with outbound.deadline(timeout):
+            scraped_data = await asyncio.wait_for(
+                scrape_cache.get(url, revalidate=revalidate, on_title=on_title),
+                timeout=timeout
+            )
+        logger.debug("Scraped '%s': %d characters", scraped_data["title"], len(scraped_data["text"]))
+    except asyncio.TimeoutError:
+        logger.warning("Scraping timed out: %s", url)
         raise HTTPException(status_code=408, detail="Scraping timed out. Please check your internet connection.")
+    except outbound.Throttled as e:
+        logger.warning("Scraping throttled for %s: %s", url, e)
+        retry_after = str(max(1, round(e.retry_after or 1)))
+        raise HTTPException(status_code=503, detail="Wikipedia is rate limiting requests. Please try again shortly.",
+                            headers={"Retry-After": retry_after})
     except Exception as e:
-        print(f"Scraping failed: {e}")
+        logger.warning("Scraping failed for %s: %s", url, e)
         raise HTTPException(status_code=400, detail=f"Failed to scrape URL: {str(e)}")
-    
-    # 2. Check if text is sufficient
+
+    # Check if text is sufficient
     if not scraped_data["text"]:
          raise HTTPException(status_code=400, detail="Could not extract text from Wikipedia page.")
+    return scraped_data
 
-    # 3. Generate quiz (instant - no LLM)
+async def _stream_quiz(parts, emit):
+    """Pass a generator's streamed parts to emit; returns the complete quiz."""
     try:
-        print("\nStep 2: Generating quiz (instant mode)...")
-        loop = asyncio.get_event_loop()
-        # Add timeout even for instant generation (should be < 1 second)
-        llm_data = await asyncio.wait_for(
-            loop.run_in_executor(None, services.generate_quiz_content, scraped_data["text"]),
-            timeout=2.0  # Should be instant, but max 2 seconds
-        )
-        print(f"✓ Quiz generation completed!")
-        print(f"  - Questions generated: {len(llm_data.get('quiz', []))}")
-        print(f"  - Related topics: {len(llm_data.get('related_topics', []))}")
+        async for part, value in parts:
+            if part == "quiz":
+                return value
+            emit(part, value)
+    finally:
+        await parts.aclose()
+
+async def _generate(scraped_data: dict, timeout: float = 2.0, text_hash: str = None, emit=None):
+    """Generate a quiz with the configured backend (instant by default - no LLM); with emit, part by part."""
+    try:
+        if emit is None:
+            work = generators.generate(scraped_data["text"], generation_executor, text_hash)
+        else:
+            work = _stream_quiz(generators.stream(scraped_data["text"], generation_executor, text_hash), emit)
+        # Instant generation should be < 1 second; an LLM backend brings its own (longer) budget
+        llm_data = await asyncio.wait_for(work, timeout=max(timeout, generators.current().timeout))
+        logger.debug("Generated %d questions, %d related topics", len(llm_data.get("quiz", [])), len(llm_data.get("related_topics", [])))
     except asyncio.TimeoutError:
-        print("⚠ Quiz generation timed out, using emergency fallback...")
+        logger.warning("Quiz generation timed out, using emergency fallback for '%s'", scraped_data["title"])
         # Emergency fallback
         llm_data = {
             "summary": scraped_data["text"][:200] + "...",
@@ -115,117 +433,387 @@ async def _generate_quiz_internal(request: QuizRequest, db: AsyncSession):
             }],
             "related_topics": []
         }
+    except ExecutorOverloaded:
+        raise HTTPException(status_code=503, detail="Server is busy generating other quizzes. Please try again.", headers={"Retry-After": "1"})
     except Exception as e:
-        print(f"Quiz generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Quiz generation failed: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate quiz content: {str(e)}")
-    # 4. Save to DB
-    print("\nStep 3: Saving to database...")
-    new_quiz = models.Quiz(
-        url=request.url,
-        title=scraped_data["title"],
-        summary=llm_data.get("summary", ""),
-        key_entities=llm_data.get("key_entities", {}),
-        related_topics=llm_data.get("related_topics", [])
-    )
-    
-    db.add(new_quiz)
-    await db.commit()
-    await db.refresh(new_quiz)
-    
-    # Save questions
-    questions_data = llm_data.get("quiz", [])
-    for q in questions_data:
-        new_question = models.Question(
-            quiz_id=new_quiz.id,
-            question_text=q["question"],
-            options=q["options"],
-            answer=q["answer"],
-            difficulty=q.get("difficulty", "medium"),
-            explanation=q.get("explanation", "")
+
+    return llm_data
+
+@app.post("/api/generate/stream")
+async def generate_quiz_stream(request: QuizRequest, format: str = Query("ndjson", pattern="^(ndjson|sse)$")):
+    """
+    /api/generate, streamed for a fast first paint: the title as soon as the
+    page heading has downloaded, then the summary and key entities, each
+    question as it is generated, and finally the saved quiz id. One NDJSON
+    line (or SSE event) per step; failures end the stream with an error event.
+    """
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(_quiz_events(request.url, format), media_type=media_type)
+
+async def _quiz_events(url: str, format: str):
+    """
+    Events for one stream request. The work runs in the same shared flight as
+    /api/generate (coalescing, revision checks, timeouts and fallback); this
+    replays what the flight has produced so far and follows it until it ends.
+    """
+    def event(name: str, **fields):
+        return _encode_event(dict(event=name, **fields), format, name)
+
+    key, flight, progress = _join_generation(url, streamed=True)
+    # As in generate_quiz, the stream leaves the flight itself (below)
+    result = asyncio.ensure_future(asyncio.wait_for(asyncio.shield(flight.task), timeout=8.0))
+    try:
+        seen = 0
+        questions = []
+        reused = False
+        while True:
+            changed = progress.changed
+            while seen < len(progress.parts):
+                part, value = progress.parts[seen]
+                seen += 1
+                if part == "title":
+                    yield event("title", url=url, title=value)
+                elif part == "question":
+                    yield event("question", index=len(questions), question=value)
+                    questions.append(value)
+                elif part == "reused":
+                    reused = True
+                else:
+                    yield event(part, **{part: value})
+            if result.done():
+                break
+            wake = asyncio.ensure_future(changed.wait())
+            try:
+                await asyncio.wait({result, wake}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                wake.cancel()
+
+        quiz_id, payload = result.result()
+        done = {"id": quiz_id, "reused": reused, "related_topics": payload["related_topics"]}
+        if questions != payload["quiz"]:
+            # The flight was not generating part by part (an /api/generate call started it)
+            # or fell back after a timeout: send the quiz as it was saved
+            done.update(summary=payload["summary"], key_entities=payload["key_entities"], quiz=payload["quiz"])
+        yield event("done", **done)
+    except asyncio.TimeoutError:
+        yield event("error", status_code=504, detail="Request timed out after 8 seconds. Please try again.")
+    except HTTPException as e:
+        yield event("error", status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        logger.exception("Error in generate_quiz_stream: %s", e)
+        yield event("error", status_code=500, detail=f"Error: {str(e)}")
+    finally:
+        # The client may disconnect mid-stream; the flight stops once nobody waits for it
+        result.cancel()
+        generation_flights.leave(key, flight)
+
+class BatchRequest(BaseModel):
+    urls: List[str]
+    concurrency: Optional[int] = None
+
+@app.post("/api/generate/batch")
+async def generate_batch(batch: BatchRequest, format: str = Query("ndjson", pattern="^(ndjson|sse)$")):
+    """
+    Generate quizzes for many URLs at once. Results stream back as each quiz
+    completes, one NDJSON line (or SSE event) per URL, followed by a summary.
+    """
+    if not batch.urls:
+        raise HTTPException(status_code=400, detail="No URLs given.")
+    if len(batch.urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_URLS} URLs per batch.")
+    concurrency = min(BATCH_CONCURRENCY if batch.concurrency is None else batch.concurrency, BATCH_MAX_CONCURRENCY)
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="Concurrency must be at least 1.")
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(_batch_events(batch.urls, concurrency, format), media_type=media_type)
+
+def _encode_event(event: dict, format: str, name: str = "result") -> str:
+    data = responses.dumps(event).decode("utf-8")
+    if format == "sse":
+        return f"event: {name}\ndata: {data}\n\n"
+    return data + "\n"
+
+async def _batch_events(urls: List[str], concurrency: int, format: str):
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = asyncio.Queue()
+
+    async def work(index: int, url: str):
+        async with semaphore:
+            try:
+                scraped_data, llm_data = await asyncio.wait_for(_scrape_and_generate(url), timeout=8.0)
+                await finished.put((index, url, scraped_data, llm_data, None))
+            except HTTPException as e:
+                await finished.put((index, url, None, None, (e.status_code, e.detail)))
+            except asyncio.TimeoutError:
+                await finished.put((index, url, None, None, (504, "Timed out after 8 seconds.")))
+            except Exception as e:
+                await finished.put((index, url, None, None, (500, str(e))))
+
+    tasks = [asyncio.ensure_future(work(i, url)) for i, url in enumerate(urls)]
+    succeeded = failed = 0
+    try:
+        async with database.AsyncSessionLocal() as db:
+            remaining = len(urls)
+            while remaining:
+                # Take everything that is ready so it is written with one bulk insert
+                results = [await finished.get()]
+                while not finished.empty():
+                    results.append(finished.get_nowait())
+                remaining -= len(results)
+
+                ok = [r for r in results if r[4] is None]
+                quiz_ids = []
+                if ok:
+                    try:
+                        quiz_ids = await persistence.save_quizzes(db, [(url, scraped["title"], data) for _, url, scraped, data, _ in ok])
+                    except Exception as e:
+                        # Only the items being saved failed; the others keep their own errors
+                        results = [
+                            (i, url, None, None, (500, f"Failed to save quiz: {e}")) if error is None
+                            else (i, url, scraped, data, error)
+                            for i, url, scraped, data, error in results
+                        ]
+                        ok = []
+                ids = dict(zip((r[0] for r in ok), quiz_ids))
+
+                for index, url, scraped_data, llm_data, error in results:
+                    if error is None:
+                        succeeded += 1
+                        event = {"index": index, "url": url, "status": "ok",
+                                 "quiz": _generated_payload(ids[index], url, scraped_data, llm_data)}
+                    else:
+                        failed += 1
+                        event = {"index": index, "url": url, "status": "error",
+                                 "status_code": error[0], "error": error[1]}
+                    yield _encode_event(event, format)
+        yield _encode_event({"done": True, "succeeded": succeeded, "failed": failed}, format, name="done")
+    finally:
+        # The client may disconnect mid-stream; don't leave work running for nobody
+        for task in tasks:
+            task.cancel()
+
+# Job mode: POST returns a job id at once; workers run scrape -> generate -> save
+async def _process_job(url: str) -> int:
+    async with database.AsyncSessionLocal() as db:
+        quiz_id, _ = await _generate_or_reuse(
+            url, db, scrape_timeout=JOB_SCRAPE_TIMEOUT, generate_timeout=JOB_GENERATE_TIMEOUT
         )
-        db.add(new_question)
-    
-    await db.commit()
-    print(f"✓ Quiz saved with ID: {new_quiz.id}")
-    print(f"{'='*60}\n")
+    return quiz_id
 
-    return {
-        "id": new_quiz.id,
-        "url": new_quiz.url,
-        "title": new_quiz.title,
-        "summary": new_quiz.summary,
-        "key_entities": new_quiz.key_entities,
-        "sections": llm_data.get("sections", []),
-        "quiz": questions_data,
-        "related_topics": new_quiz.related_topics
-    }
+job_queue = jobs.JobQueue(_process_job)
 
-@app.get("/api/history", response_model=List[GenerateResponse])
-async def get_history(db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Quiz).order_by(models.Quiz.created_at.desc()))
-    quizzes = result.scalars().all()
-    
-    history_list = []
-    for quiz in quizzes:
-         # Lazy loading questions might be tricky with async, better to eager load or query
-         # For list, we might not need all questions? Spec says "Details" opens full quiz, so maybe just metadata here.
-         # But the response model requires everything. Let's fetch questions too for simplicity or adjust model.
-         # For simplicity, let's fetch questions.
-         q_result = await db.execute(select(models.Question).where(models.Question.quiz_id == quiz.id))
-         questions = q_result.scalars().all()
-         
-         formatted_questions = [
-             {
-                 "question": q.question_text,
-                 "options": q.options,
-                 "answer": q.answer,
-                 "difficulty": q.difficulty,
-                 "explanation": q.explanation
-             } for q in questions
-         ]
-         
-         history_list.append({
-            "id": quiz.id,
-            "url": quiz.url,
-            "title": quiz.title,
-            "summary": quiz.summary,
-            "key_entities": quiz.key_entities,
-            "sections": [], # Not stored in main table currently, omitting or adding column if needed.
-            "quiz": formatted_questions,
-            "related_topics": quiz.related_topics
-         })
-         
-    return history_list
+class JobRequest(BaseModel):
+    url: str
+    priority: int = 0
 
-@app.get("/api/history/{id}", response_model=GenerateResponse)
-async def get_quiz_detail(id: int, db: AsyncSession = Depends(database.get_db)):
-    result = await db.execute(select(models.Quiz).where(models.Quiz.id == id))
-    quiz = result.scalar_one_or_none()
-    if not quiz:
-        raise HTTPException(status_code=404, detail="Quiz not found")
-        
-    q_result = await db.execute(select(models.Question).where(models.Question.quiz_id == quiz.id))
-    questions = q_result.scalars().all()
-    
-    formatted_questions = [
-             {
-                 "question": q.question_text,
-                 "options": q.options,
-                 "answer": q.answer,
-                 "difficulty": q.difficulty,
-                 "explanation": q.explanation
-             } for q in questions
+@app.post("/api/jobs", status_code=202)
+async def create_job(request: JobRequest, db: AsyncSession = Depends(database.get_db)):
+    try:
+        services._validate_url(request.url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job = await job_queue.enqueue(db, request.url, request.priority)
+    return jobs.job_status(job)
+
+@app.get("/api/jobs/{id}")
+async def get_job(id: int, db: AsyncSession = Depends(database.get_db)):
+    job = await job_queue.get(db, id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.job_status(job)
+
+@app.get("/api/jobs/{id}/events")
+async def job_events(id: int, db: AsyncSession = Depends(database.get_db)):
+    """Server-Sent Events: the job status on every change, until it succeeds or fails."""
+    job = await job_queue.get(db, id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async with database.AsyncSessionLocal() as session:
+            last = None
+            while True:
+                current = await job_queue.get(session, id)
+                status = jobs.job_status(current)
+                if status != last:
+                    yield _encode_event(status, "sse", name="status")
+                    last = status
+                if current.status in jobs.FINISHED:
+                    return
+                # Re-read on a timer too, in case another process updated the job
+                await job_queue.wait_for_change(id, timeout=jobs.JOB_POLL_INTERVAL * 5)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+def _format_questions(questions):
+    return [
+        {
+            "question": q.question_text,
+            "options": q.options,
+            "answer": q.answer,
+            "difficulty": q.difficulty,
+            "explanation": q.explanation
+        } for q in questions
     ]
-    
+
+# Questions live in the compressed blob, or in Question rows for quizzes stored before it
+_WITH_QUESTIONS = (undefer(models.Quiz.questions_blob), selectinload(models.Quiz.questions))
+
+def _quiz_questions(quiz):
+    """Formatted questions; the blob is decompressed only here, when a response needs it."""
+    if quiz.questions_blob is not None:
+        return storage.decode_questions(quiz.questions_blob)
+    return _format_questions(quiz.questions)
+
+def _format_quiz(quiz, with_questions: bool = False):
+    """A Quiz row as a GenerateResponse-shaped dict, ready to encode without validation."""
+    key_entities = quiz.key_entities or {}
     return {
         "id": quiz.id,
         "url": quiz.url,
         "title": quiz.title,
         "summary": quiz.summary,
-        "key_entities": quiz.key_entities,
-        "sections": [],
-        "quiz": formatted_questions,
-        "related_topics": quiz.related_topics
-    }
\ No newline at end of file
+        "key_entities": {
+            "people": key_entities.get("people", []),
+            "organizations": key_entities.get("organizations", []),
+            "locations": key_entities.get("locations", []),
+        },
+        "sections": quiz.sections or [],
+        "quiz": _quiz_questions(quiz) if with_questions else [],
+        "related_topics": quiz.related_topics or []
+    }
+
+def _encode_cursor(quiz) -> str:
+    raw = f"{quiz.created_at.isoformat()}|{quiz.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, quiz_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(quiz_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# The list endpoints return await responses.json_response(...): the dicts built here already have
+# the response models' shape, so FastAPI's validation pass over every quiz and question is skipped
+@app.get("/api/history", response_model=List[GenerateResponse])
+async def get_history(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    summary_only: bool = False,
+    db: AsyncSession = Depends(database.get_db),
+):
+    """
+    Newest quizzes first. Pass `limit` to page through results; the cursor for the
+    next page comes back in the X-Next-Cursor header. `summary_only` skips questions.
+    """
+    query = select(models.Quiz).order_by(models.Quiz.created_at.desc(), models.Quiz.id.desc())
+    if not summary_only:
+        # Blobs come with the page; legacy rows with one extra SELECT ... WHERE quiz_id IN (...)
+        query = query.options(*_WITH_QUESTIONS)
+    if cursor:
+        created_at, quiz_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            models.Quiz.created_at < created_at,
+            and_(models.Quiz.created_at == created_at, models.Quiz.id < quiz_id),
+        ))
+    if limit:
+        query = query.limit(limit)
+
+    result = await db.execute(query)
+    quizzes = result.scalars().all()
+
+    headers = {}
+    if limit and len(quizzes) == limit:
+        headers["X-Next-Cursor"] = _encode_cursor(quizzes[-1])
+
+    return await responses.json_response(
+        [_format_quiz(quiz, with_questions=not summary_only) for quiz in quizzes], request, headers
+    )
+
+class SearchResult(GenerateResponse):
+    rank: float
+    snippet: Optional[str] = None
+
+@app.get("/api/search", response_model=List[SearchResult])
+async def search_quizzes(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    summary_only: bool = False,
+    db: AsyncSession = Depends(database.get_db),
+):
+    """
+    Full-text search over titles, summaries, key entities and question text, best
+    match first. The offset of the next page comes back in the X-Next-Offset header.
+    """
+    hits = await search.search(db, q, limit, offset)
+    if not hits:
+        return await responses.json_response([])
+    query = select(models.Quiz).where(models.Quiz.id.in_([hit["id"] for hit in hits]))
+    if not summary_only:
+        query = query.options(*_WITH_QUESTIONS)
+    quizzes = {quiz.id: quiz for quiz in (await db.execute(query)).scalars()}
+
+    headers = {}
+    if len(hits) == limit:
+        headers["X-Next-Offset"] = str(offset + limit)
+
+    return await responses.json_response([
+        dict(_format_quiz(quiz, with_questions=not summary_only), rank=hit["rank"], snippet=hit["snippet"])
+        for hit in hits
+        if (quiz := quizzes.get(hit["id"])) is not None
+    ], request, headers)
+
+class EntityResponse(BaseModel):
+    name: str
+    type: str
+    frequency: int
+    quiz_ids: List[int]
+
+@app.get("/api/entities/{name}", response_model=EntityResponse)
+async def get_entity(
+    name: str,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(database.get_db),
+):
+    """An entity's type and the number of quizzes mentioning it, with the ids of the latest of them."""
+    index = entity_index.current
+    entity_type = index.type_of(name)
+    if entity_type is None:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    return {
+        "name": name,
+        "type": entity_type,
+        "frequency": index.frequency(name, entity_type),
+        "quiz_ids": await entity_index.quizzes_with(db, name, limit),
+    }
+
+@app.get("/api/history/{id}", response_model=GenerateResponse)
+async def get_quiz_detail(id: int, request: Request, db: AsyncSession = Depends(database.get_db)):
+    cached = quiz_detail_cache.get(id)
+    if cached is None:
+        # One query: the quiz row with its question blob (legacy quizzes: joined question rows)
+        result = await db.execute(
+            select(models.Quiz)
+            .options(undefer(models.Quiz.questions_blob), joinedload(models.Quiz.questions))
+            .where(models.Quiz.id == id)
+        )
+        quiz = result.unique().scalar_one_or_none()
+        if not quiz:
+            raise HTTPException(status_code=404, detail="Quiz not found")
+
+        body = responses.dumps(_format_quiz(quiz, with_questions=True))
+        cached = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        quiz_detail_cache.set(id, cached)
+
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={QUIZ_DETAIL_MAX_AGE}"}
+    if responses.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
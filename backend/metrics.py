@@ -0,0 +1,132 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans cache hits (sub-millisecond) to slow scrapes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Prometheus-style histogram; observe() is safe to call from any thread."""
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labelvalues):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def totals(self) -> dict:
+        """{label values: (count, sum)} for every series."""
+        with self._lock:
+            return {labels: (sum(counts), total) for labels, (counts, total) in self._series.items()}
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in sorted(self._series.items())]
+        for labelvalues, counts, total in series:
+            cumulative = 0
+            names = self.labelnames + ("le",)
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labelvalues + (bound,))} {cumulative}")
+            labels = _labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Gauge:
+    """
+    A value read when metrics are scraped. read() returns a number, or a dict
+    of label values -> number for a labelled gauge. kind may be "counter" for
+    monotonically increasing totals kept elsewhere (e.g. cache hit counts).
+    """
+
+    def __init__(self, name: str, help: str, read, labelnames=(), kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        value = self.read()
+        if isinstance(value, dict):
+            for labelvalues, v in value.items():
+                if not isinstance(labelvalues, tuple):
+                    labelvalues = (labelvalues,)
+                lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(v)}")
+        else:
+            lines.append(f"{self.name} {_number(value)}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, read, labelnames=(), kind: str = "gauge") -> Gauge:
+        return self.register(Gauge(name, help, read, labelnames, kind))
+
+    def render(self) -> str:
+        """Everything in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.collect())
+            except Exception:
+                continue  # One broken reader must not take down the endpoint
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Per-stage latency of the generation pipeline:
+# queue_wait, generate (executor), fetch, parse (HTML parse + text extraction), db_insert, db_commit
+STAGE_SECONDS = registry.histogram(
+    "quiz_stage_duration_seconds", "Time spent in each quiz generation stage.", ("stage",)
+)
+
+def stage(name: str):
+    """Context manager timing one pipeline stage: `with metrics.stage("fetch"): ...`."""
+    return STAGE_SECONDS.time(name)
+
+def observe_stage(name: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, name)
@@ -0,0 +1,143 @@
+"""
+Move an existing database to compact storage.
+
+    python migrate_storage.py [--codec zlib] [--samples 200]
+
+Packs every quiz's question rows into its compressed questions_blob, compresses
+scraped_pages.text into scraped_pages.body, then (SQLite) VACUUMs. Reports the
+database size and the median time to read a quiz with its questions, before
+and after. Uses DATABASE_URL like the app. Safe to re-run: migrated rows are
+skipped.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.orm import selectinload, undefer
+
+import database
+import models
+import search
+import storage
+
+async def _database_size(conn) -> int:
+    if conn.dialect.name == "sqlite":
+        page_count = (await conn.execute(text("PRAGMA page_count"))).scalar()
+        page_size = (await conn.execute(text("PRAGMA page_size"))).scalar()
+        return page_count * page_size
+    if conn.dialect.name == "postgresql":
+        return (await conn.execute(text("SELECT pg_database_size(current_database())"))).scalar()
+    return 0
+
+async def _read_latency(quiz_ids) -> float:
+    """Median ms to load one quiz and decode its questions, like GET /api/history/{id}."""
+    timings = []
+    async with database.AsyncSessionLocal() as db:
+        for quiz_id in quiz_ids:
+            start = time.perf_counter()
+            quiz = (await db.execute(
+                select(models.Quiz)
+                .options(undefer(models.Quiz.questions_blob), selectinload(models.Quiz.questions))
+                .where(models.Quiz.id == quiz_id)
+            )).scalar_one()
+            if quiz.questions_blob is not None:
+                storage.decode_questions(quiz.questions_blob)
+            else:
+                [(q.question_text, q.options, q.answer) for q in quiz.questions]
+            timings.append(time.perf_counter() - start)
+            db.expunge_all()
+    return statistics.median(timings) * 1000 if timings else 0.0
+
+async def _migrate_quizzes(codec: str, batch: int) -> int:
+    Quiz, Question = models.Quiz, models.Question
+    migrated = 0
+    while True:
+        async with database.AsyncSessionLocal() as db:
+            quiz_ids = (await db.execute(
+                select(Quiz.id).where(Quiz.questions_blob.is_(None)).order_by(Quiz.id).limit(batch)
+            )).scalars().all()
+            if not quiz_ids:
+                return migrated
+            questions = {quiz_id: [] for quiz_id in quiz_ids}
+            for row in await db.execute(
+                select(Question).where(Question.quiz_id.in_(quiz_ids)).order_by(Question.id)
+            ):
+                q = row[0]
+                questions[q.quiz_id].append({
+                    "question": q.question_text,
+                    "options": q.options or [],
+                    "answer": q.answer,
+                    "difficulty": q.difficulty,
+                    "explanation": q.explanation,
+                })
+            for quiz_id, items in questions.items():
+                await db.execute(
+                    update(Quiz).where(Quiz.id == quiz_id).values(questions_blob=storage.encode_questions(items, codec))
+                )
+            await db.execute(delete(Question).where(Question.quiz_id.in_(quiz_ids)))
+            await db.commit()
+            migrated += len(quiz_ids)
+
+async def _migrate_pages(codec: str, batch: int) -> int:
+    Page = models.ScrapedPage
+    migrated = 0
+    while True:
+        async with database.AsyncSessionLocal() as db:
+            pages = (await db.execute(
+                select(Page.url_key, Page.text).where(Page.text.is_not(None)).limit(batch)
+            )).all()
+            if not pages:
+                return migrated
+            for url_key, page_text in pages:
+                await db.execute(
+                    update(Page).where(Page.url_key == url_key)
+                    .values(body=storage.compress_text(page_text, codec), text=None)
+                )
+            await db.commit()
+            migrated += len(pages)
+
+async def migrate(codec: str, batch: int, samples: int, vacuum: bool):
+    async with database.engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+        await conn.run_sync(database.upgrade_schema)
+        await conn.run_sync(search.ensure_index)  # Index from question rows before they go
+        size_before = await _database_size(conn)
+        quiz_ids = (await conn.execute(select(models.Quiz.id))).scalars().all()
+    sample = random.Random(0).sample(quiz_ids, min(samples, len(quiz_ids)))
+    latency_before = await _read_latency(sample)
+
+    quizzes = await _migrate_quizzes(codec, batch)
+    pages = await _migrate_pages(codec, batch)
+
+    if vacuum and database.engine.dialect.name == "sqlite":
+        async with database.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM"))
+    async with database.engine.connect() as conn:
+        size_after = await _database_size(conn)
+        remaining = (await conn.execute(select(func.count()).select_from(models.Question))).scalar()
+    latency_after = await _read_latency(sample)
+
+    print(f"Migrated {quizzes} quizzes and {pages} scraped pages with codec '{codec}' ({remaining} question rows left)")
+    print(f"{'':<22} {'before':>12} {'after':>12}")
+    print(f"{'database size':<22} {size_before / 1024:>10.0f}KB {size_after / 1024:>10.0f}KB")
+    print(f"{'read quiz (median)':<22} {latency_before:>10.3f}ms {latency_after:>10.3f}ms   ({len(sample)} quizzes)")
+    if database.engine.dialect.name == "postgresql":
+        print("Postgres returns the freed space to the OS only after VACUUM FULL.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codec", default=storage.STORAGE_CODEC, choices=storage.available_codecs())
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--samples", type=int, default=200, help="quizzes timed for read latency")
+    parser.add_argument("--no-vacuum", action="store_true")
+    args = parser.parse_args(argv)
+    asyncio.run(migrate(args.codec, args.batch, args.samples, not args.no_vacuum))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
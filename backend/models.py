@@ -1,10 +1,22 @@
-from sqlalchemy import Column, Integer, String, JSON, Text, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, JSON, Text, ForeignKey, DateTime, Float, Index, LargeBinary
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from database import Base
 
+# SQLite's CURRENT_TIMESTAMP has second precision and is stored as text; bind datetimes
+# in the same format so keyset comparisons on created_at line up with stored values
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
 class Quiz(Base):
     __tablename__ = "quizzes"
+    __table_args__ = (
+        # Serves ORDER BY created_at DESC, id DESC and keyset pagination on /api/history
+        Index("ix_quizzes_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String, unique=False, index=True)
@@ -12,19 +24,88 @@ class Quiz(Base):
     summary = Column(Text)
     key_entities = Column(JSON)  # Stores people, organizations, locations
     related_topics = Column(JSON) # List of strings
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sections = Column(JSON) # List of section titles
+    created_at = Column(Timestamp, server_default=func.now())
+    # Recognise the article again: normalized URL, revision marker and text hashes
+    url_key = Column(String, index=True, nullable=True)
+    revision = Column(String, nullable=True)  # "rev:<lastrevid>" or a HEAD ETag/Last-Modified
+    content_hash = Column(String, nullable=True)  # SHA-1 of the extracted article text
+    section_hashes = Column(JSON, nullable=True)  # Short hashes of each heading/paragraph
+    generator = Column(String, nullable=True)  # Backend version that wrote the quiz, e.g. "instant:1" (see generators.py)
+    # All questions as one storage.encode_questions blob; loaded only when asked for
+    # (undefer). Quizzes stored before compact storage keep their Question rows.
+    questions_blob = deferred(Column(LargeBinary, nullable=True))
 
-    questions = relationship("Question", back_populates="quiz", cascade="all, delete-orphan")
+    questions = relationship("Question", back_populates="quiz", cascade="all, delete-orphan", order_by="Question.id")
 
 class Question(Base):
     __tablename__ = "questions"
 
     id = Column(Integer, primary_key=True, index=True)
-    quiz_id = Column(Integer, ForeignKey("quizzes.id"))
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), index=True)
     question_text = Column(Text)
     options = Column(JSON) # List of strings [A, B, C, D]
     answer = Column(String)
     difficulty = Column(String)
     explanation = Column(Text)
 
-    quiz = relationship("Quiz", back_populates="questions")
\ No newline at end of file
+    quiz = relationship("Quiz", back_populates="questions")
+
+class ScrapedPage(Base):
+    __tablename__ = "scraped_pages"
+
+    url_key = Column(String, primary_key=True)  # Normalized article URL
+    url = Column(String)
+    title = Column(String)
+    text = Column(Text, nullable=True)  # Legacy uncompressed body
+    body = Column(LargeBinary, nullable=True)  # storage.compress_text(text)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    fetched_at = Column(Float)  # Unix timestamp, compared against the cache TTL
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim the highest-priority, oldest queued job
+        Index("ix_jobs_status_priority_id", "status", "priority", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String)
+    status = Column(String, default="queued")  # queued, running, succeeded, failed
+    priority = Column(Integer, default=0)  # Higher runs first
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(Float, default=0.0)  # Unix timestamp; delays retries
+    locked_until = Column(Float, nullable=True)  # Unix timestamp; lease of the worker running the job
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
+
+class EntityMention(Base):
+    __tablename__ = "entity_mentions"
+    __table_args__ = (
+        # Serves "latest quizzes mentioning X"
+        Index("ix_entity_mentions_entity_quiz", "entity", "quiz_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    type = Column(String, nullable=False)  # people, organizations or locations, as in Quiz.key_entities
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), index=True)
+
+class IngestCheckpoint(Base):
+    __tablename__ = "ingest_checkpoints"
+
+    source = Column(String, primary_key=True)  # Dump file name
+    position = Column(Integer, default=0)  # Articles read from the start of the dump
+    quizzes = Column(Integer, default=0)  # Quizzes saved from it so far
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
+
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)  # Single row, id 1
+    version = Column(String, nullable=False)  # schema.version() of the code that last ran the DDL
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
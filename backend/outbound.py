@@ -0,0 +1,225 @@
+"""
+Scheduling for outbound requests to article hosts, one Scheduler per host:
+
+- token bucket: at most OUTBOUND_RATE requests/s, bursts of OUTBOUND_BURST
+- adaptive concurrency (AIMD): the in-flight limit grows by one per window of
+  fast successes and is cut back on 429/503, transport errors or responses
+  slower than OUTBOUND_TARGET_LATENCY
+- Retry-After: a throttled host is paused for every caller until then
+- retries with full jitter, attempted only while they fit within the caller's
+  deadline (set with `with outbound.deadline(seconds):`)
+
+A request that cannot be sent before its deadline fails at once with Throttled
+instead of queueing until the caller's timeout fires.
+"""
+import asyncio
+import contextvars
+import os
+import random
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+OUTBOUND_RATE = float(os.getenv("OUTBOUND_RATE", "20"))
+OUTBOUND_BURST = int(os.getenv("OUTBOUND_BURST", "40"))
+OUTBOUND_MIN_CONCURRENCY = int(os.getenv("OUTBOUND_MIN_CONCURRENCY", "1"))
+OUTBOUND_MAX_CONCURRENCY = int(os.getenv("OUTBOUND_MAX_CONCURRENCY", os.getenv("HTTP_MAX_PER_HOST", "10")))
+OUTBOUND_TARGET_LATENCY = float(os.getenv("OUTBOUND_TARGET_LATENCY", "1.0"))
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))
+OUTBOUND_RETRY_BASE = float(os.getenv("OUTBOUND_RETRY_BASE", "0.2"))
+
+THROTTLE_STATUSES = frozenset((429, 503))
+RETRY_STATUSES = THROTTLE_STATUSES | {502, 504}
+
+_deadline = contextvars.ContextVar("outbound_deadline", default=None)
+
+class Throttled(Exception):
+    """The host is rate limiting us and no attempt fits before the deadline."""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+@contextmanager
+def deadline(seconds: float):
+    """Outbound requests made inside the block must finish within `seconds`."""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> float:
+    """Seconds left before the current deadline (inf when there is none)."""
+    at = _deadline.get()
+    return float("inf") if at is None else at - time.monotonic()
+
+def parse_retry_after(value: str):
+    """Retry-After as seconds from now; it may be delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token, possibly ahead of time; returns how long to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self.tokens -= 1
+        return max(-self.tokens / self.rate, 0.0)
+
+    def refund(self):
+        self.tokens += 1
+
+class AdaptiveLimit:
+    """AIMD limit on requests in flight."""
+
+    def __init__(self, minimum: int, maximum: int, target_latency: float):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency: float, congested: bool):
+        async with self._condition:
+            self.in_flight -= 1
+            if congested:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif latency > self.target_latency:
+                self.limit = max(self.minimum, self.limit * 0.9)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify(max(int(self.limit) - self.in_flight, 0))
+
+class Scheduler:
+    """Paces, limits and retries the requests sent to one host."""
+
+    def __init__(self, rate: float = OUTBOUND_RATE, burst: int = OUTBOUND_BURST,
+                 min_concurrency: int = OUTBOUND_MIN_CONCURRENCY, max_concurrency: int = OUTBOUND_MAX_CONCURRENCY,
+                 target_latency: float = OUTBOUND_TARGET_LATENCY, max_retries: int = OUTBOUND_MAX_RETRIES,
+                 retry_base: float = OUTBOUND_RETRY_BASE):
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = AdaptiveLimit(min_concurrency, max_concurrency, target_latency)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.paused_until = 0.0
+        self.latency = 0.0  # Moving average of successful requests
+        self.sent = 0
+        self.throttled = 0
+        self.retried = 0
+        self.shed = 0
+
+    async def call(self, send, retries: int = None):
+        """
+        await send() -> httpx.Response under this host's limits. Responses with
+        a retryable status (and transport errors) are retried while time allows;
+        after the last attempt a throttling status raises Throttled, other
+        responses are returned as they are.
+        """
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        while True:
+            await self._wait_turn()
+            await self.limit.acquire()
+            started = time.monotonic()
+            response = error = None
+            # Anything but a response counts against the host: a send cancelled by the
+            # deadline is a slow request, not a fast success
+            congested = True
+            try:
+                response = await send()
+                congested = response.status_code in THROTTLE_STATUSES
+            except httpx.TransportError as e:
+                error = e
+            finally:
+                elapsed = time.monotonic() - started
+                await self.limit.release(elapsed, congested)
+            self.sent += 1
+
+            if error is None and response.status_code not in RETRY_STATUSES:
+                self.latency = elapsed if not self.latency else 0.8 * self.latency + 0.2 * elapsed
+                return response
+
+            retry_after = None
+            if response is not None:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code in THROTTLE_STATUSES:
+                    self.throttled += 1
+                    if retry_after is not None:
+                        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+            # Full jitter, but never earlier than the host asked for
+            delay = random.uniform(0, self.retry_base * 2 ** attempt)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if attempt >= retries or delay + self.latency >= remaining():
+                if error is not None:
+                    raise error
+                if response.status_code in THROTTLE_STATUSES:
+                    raise Throttled(f"{response.request.url.host} answered {response.status_code}", retry_after)
+                return response
+            attempt += 1
+            self.retried += 1
+            await asyncio.sleep(delay)
+
+    async def _wait_turn(self):
+        wait = max(self.paused_until - time.monotonic(), 0.0)
+        wait = max(wait, self.bucket.reserve())
+        if wait and wait + self.latency >= remaining():
+            self.bucket.refund()
+            self.shed += 1
+            raise Throttled(f"No request slot within the deadline (next in {wait:.2f}s)", wait)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        return {
+            "limit": round(self.limit.limit, 2),
+            "in_flight": self.limit.in_flight,
+            "sent": self.sent,
+            "throttled": self.throttled,
+            "retried": self.retried,
+            "shed": self.shed,
+        }
+
+_schedulers = {}
+
+def scheduler_for(url: str) -> Scheduler:
+    host = httpx.URL(url).host
+    scheduler = _schedulers.get(host)
+    if scheduler is None:
+        scheduler = _schedulers[host] = Scheduler()
+    return scheduler
+
+def set_scheduler(url: str, scheduler: Scheduler):
+    """Use a specific scheduler for url's host, e.g. one tuned for a stand-in server."""
+    _schedulers[httpx.URL(url).host] = scheduler
+
+def stats():
+    return {host: scheduler.stats() for host, scheduler in _schedulers.items()}
+
+def reset():
+    """Forget every host's state, e.g. when the HTTP client (and event loop) changes."""
+    _schedulers.clear()
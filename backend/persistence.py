@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import database
+import entity_index
+import metrics
+import models
+import search
+import storage
+from scrape_cache import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# Write-behind: batch inserts from concurrent requests into periodic group commits
+QUIZ_WRITE_BEHIND = os.getenv("QUIZ_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+QUIZ_WRITE_BATCH = int(os.getenv("QUIZ_WRITE_BATCH", "64"))
+QUIZ_WRITE_DELAY = float(os.getenv("QUIZ_WRITE_DELAY_MS", "20")) / 1000
+
+def _quiz_row(url: str, title: str, quiz_data: dict) -> dict:
+    row = {
+        "url": url,
+        "title": title,
+        "summary": quiz_data.get("summary", ""),
+        "key_entities": quiz_data.get("key_entities", {}),
+        "related_topics": quiz_data.get("related_topics", []),
+        "sections": quiz_data.get("sections", []),
+        "url_key": normalize_url(url),
+        "revision": quiz_data.get("revision"),
+        "content_hash": quiz_data.get("content_hash"),
+        "section_hashes": quiz_data.get("section_hashes"),
+        "generator": quiz_data.get("generator"),
+    }
+    if storage.QUIZ_QUESTION_STORAGE == "blob":
+        row["questions_blob"] = storage.encode_questions(quiz_data.get("quiz", []))
+    return row
+
+def _question_rows(quiz_id: int, quiz_data: dict) -> list:
+    if storage.QUIZ_QUESTION_STORAGE == "blob":
+        return []
+    return [
+        {
+            "quiz_id": quiz_id,
+            "question_text": q["question"],
+            "options": q["options"],
+            "answer": q["answer"],
+            "difficulty": q.get("difficulty", "medium"),
+            "explanation": q.get("explanation", ""),
+        }
+        for q in quiz_data.get("quiz", [])
+    ]
+
+async def insert_quizzes(db: AsyncSession, items) -> list:
+    """
+    Insert (url, title, quiz_data) items without committing.
+    Quiz ids come back from INSERT ... RETURNING in input order. Questions go into
+    each quiz's compressed blob, or with QUIZ_QUESTION_STORAGE=rows into question
+    rows written with one executemany, like the search and entity index rows.
+    Returns the new quiz ids.
+    """
+    if not items:
+        return []
+    with metrics.stage("db_insert"):
+        result = await db.execute(
+            insert(models.Quiz).returning(models.Quiz.id, sort_by_parameter_order=True),
+            [_quiz_row(url, title, data) for url, title, data in items],
+        )
+        quiz_ids = list(result.scalars())
+        question_rows = []
+        for quiz_id, (_, _, data) in zip(quiz_ids, items):
+            question_rows.extend(_question_rows(quiz_id, data))
+        if question_rows:
+            await db.execute(insert(models.Question), question_rows)
+        await search.index_quizzes(db, [
+            search.document(quiz_id, title, data) for quiz_id, (_, title, data) in zip(quiz_ids, items)
+        ])
+        await entity_index.index_quizzes(db, [
+            (quiz_id, data.get("key_entities")) for quiz_id, (_, _, data) in zip(quiz_ids, items)
+        ])
+    return quiz_ids
+
+async def save_quizzes(db: AsyncSession, items) -> list:
+    """Insert quizzes and their questions in a single transaction."""
+    try:
+        quiz_ids = await insert_quizzes(db, items)
+        with metrics.stage("db_commit"):
+            await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return quiz_ids
+
+async def save_quiz(db: AsyncSession, url: str, title: str, quiz_data: dict) -> int:
+    return (await save_quizzes(db, [(url, title, quiz_data)]))[0]
+
+class WriteBehindQueue:
+    """
+    Collects quiz writes from concurrent requests and flushes them in batches.
+
+    A batch is inserted and committed in one transaction (a group commit);
+    callers get their ids once the commit succeeds, so every id they return is
+    already readable by other sessions, and a failed commit fails them all.
+    """
+
+    def __init__(self, max_batch: int = QUIZ_WRITE_BATCH, max_delay: float = QUIZ_WRITE_DELAY):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = None
+        self._task = None
+        self.batches = 0
+        self.written = 0
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Flush everything still queued, then stop the writer task."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, url: str, title: str, quiz_data: dict) -> int:
+        if self._task is None:
+            raise RuntimeError("WriteBehindQueue.submit() called before start()")
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put(((url, title, quiz_data), future))
+        return await future
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            loop = asyncio.get_event_loop()
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        async with database.AsyncSessionLocal() as db:
+            try:
+                quiz_ids = await insert_quizzes(db, [item for item, _ in batch])
+                with metrics.stage("db_commit"):
+                    await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.error("Write-behind batch of %d quizzes failed: %s", len(batch), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        self.batches += 1
+        self.written += len(batch)
+        for quiz_id, (_, future) in zip(quiz_ids, batch):
+            if not future.done():
+                future.set_result(quiz_id)
+
+write_behind = WriteBehindQueue() if QUIZ_WRITE_BEHIND else None
+
+async def persist_quiz(db: AsyncSession, url: str, title: str, quiz_data: dict) -> int:
+    """Save a generated quiz through the write-behind queue when enabled, directly otherwise."""
+    if write_behind is not None:
+        return await write_behind.submit(url, title, quiz_data)
+    return await save_quiz(db, url, title, quiz_data)
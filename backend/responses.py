@@ -0,0 +1,99 @@
+"""
+JSON response bodies without a second validation pass.
+
+Endpoints that list quizzes build plain dicts straight from the ORM rows in the
+shape of the typed response models in main, encode them with orjson and return
+the bytes as a Response, which FastAPI sends as is; the response models then
+only document the schema. Everything else uses ORJSONResponse as the default
+response class. Without orjson the stdlib json module produces the same JSON.
+
+Large bodies are compressed when the client accepts it (RESPONSE_COMPRESSION):
+
+- auto: brotli when the brotli package is installed and accepted, else gzip (default)
+- gzip, br: only that encoding
+- off: never
+"""
+import asyncio
+import gzip
+import json
+import os
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Optional, falls back to json
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional encoding
+    brotli = None
+
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "auto").lower()
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "32768"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "4"))  # 6 takes twice the CPU for ~10% less
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))  # 0-11; above ~6 costs more CPU than it saves bytes
+
+_ENCODERS = {"gzip": lambda body: gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)}
+if brotli is not None:
+    _ENCODERS["br"] = lambda body: brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+def available_encodings():
+    return list(_ENCODERS)
+
+def choose_encoding(accept_encoding: str, size: int):
+    """The Content-Encoding for a body of size bytes, or None to send it as is."""
+    if RESPONSE_COMPRESSION == "off" or size < RESPONSE_COMPRESS_MIN_BYTES or not accept_encoding:
+        return None
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        try:
+            weight = float(params.strip()[2:]) if params.strip().startswith("q=") else 1.0
+        except ValueError:
+            weight = 1.0
+        if weight > 0:
+            accepted.add(coding.strip())
+    preference = ("br", "gzip") if RESPONSE_COMPRESSION == "auto" else (RESPONSE_COMPRESSION,)
+    for encoding in preference:
+        if encoding in _ENCODERS and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match (a list of tags, possibly weak, or *) against etag, with the weak comparison it calls for."""
+    if not if_none_match:
+        return False
+    strip = lambda tag: tag[2:] if tag.startswith("W/") else tag
+    return any(tag == "*" or strip(tag) == strip(etag) for tag in (t.strip() for t in if_none_match.split(",")))
+
+def encode(body: bytes, encoding: str) -> bytes:
+    return _ENCODERS[encoding](body)
+
+async def json_response(content, request=None, headers: dict = None, status_code: int = 200) -> Response:
+    """
+    content, already in the response model's shape, encoded and compressed for
+    request. zlib and brotli release the GIL, so compression runs in a thread
+    instead of holding up the event loop.
+    """
+    body = dumps(content)
+    headers = dict(headers or {})
+    if request is not None and RESPONSE_COMPRESSION != "off":
+        headers["Vary"] = "Accept-Encoding"
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""), len(body))
+        if encoding is not None:
+            body = await asyncio.to_thread(encode, body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
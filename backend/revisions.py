@@ -0,0 +1,72 @@
+import hashlib
+import logging
+import os
+from urllib.parse import urlsplit, unquote
+
+import outbound
+import services
+
+logger = logging.getLogger(__name__)
+
+# Check whether an article changed before re-downloading it for a URL we already have
+QUIZ_REVISION_CHECK = os.getenv("QUIZ_REVISION_CHECK", "1").lower() in ("1", "true", "yes")
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def block_hashes(text: str) -> list:
+    """
+    Short hashes of the text blocks (section headings and paragraphs, one per
+    line as the extractors emit them), in document order.
+    """
+    return [hashlib.sha1(block.encode("utf-8")).hexdigest()[:12] for block in text.split("\n") if block]
+
+def fingerprint(text: str) -> dict:
+    """Columns stored next to a quiz to recognise its article text again."""
+    return {"content_hash": content_hash(text), "section_hashes": block_hashes(text)}
+
+def changed_blocks(old_hashes, new_hashes) -> int:
+    """How many blocks of the new text are not in the old one."""
+    old = set(old_hashes or ())
+    return sum(1 for h in new_hashes if h not in old)
+
+def _wikipedia_title(url: str):
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if not host.endswith("wikipedia.org") or not parts.path.startswith("/wiki/"):
+        return None, None
+    return host.replace(".m.wikipedia.org", ".wikipedia.org"), unquote(parts.path[len("/wiki/"):])
+
+async def fetch_revision(url: str):
+    """
+    A cheap marker of the article's current revision, without downloading it.
+
+    Wikipedia articles: "rev:<lastrevid>" from the MediaWiki query API.
+    Other hosts: the ETag or Last-Modified of a HEAD request.
+    Returns None when neither is available; callers fall back to a full scrape.
+    """
+    client = services.get_http_client()
+    host, title = _wikipedia_title(url)
+    # Paced with the article fetches to the same host, but never retried: a miss just means a full scrape
+    try:
+        if title:
+            api_url = f"https://{host}/w/api.php"
+            response = await outbound.scheduler_for(api_url).call(lambda: client.get(
+                api_url,
+                params={"action": "query", "prop": "info", "titles": title, "format": "json", "formatversion": "2"},
+            ), retries=0)
+            response.raise_for_status()
+            pages = response.json().get("query", {}).get("pages", [])
+            if pages and pages[0].get("lastrevid"):
+                return f"rev:{pages[0]['lastrevid']}"
+            return None
+        response = await outbound.scheduler_for(url).call(lambda: client.head(url), retries=0)
+        if response.status_code >= 400:
+            return None
+        if response.headers.get("ETag"):
+            return "etag:" + response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            return "modified:" + response.headers["Last-Modified"]
+    except Exception as e:
+        logger.debug("Revision check failed for %s: %s", url, e)
+    return None
@@ -0,0 +1,50 @@
+import hashlib
+import logging
+
+from sqlalchemy import inspect, select
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+import database
+import models
+import search
+
+logger = logging.getLogger(__name__)
+
+# Startup DDL (create_all, column/index upgrades, the search index) only has to
+# run when the code's schema differs from the database's. The fingerprint of the
+# expected DDL is stored in schema_version; when it matches, startup is a single
+# SELECT instead of a catalog inspection of every table.
+
+def version(dialect) -> str:
+    """Short hash of every CREATE TABLE/INDEX this code expects, plus the search index DDL."""
+    tables = models.Base.metadata.sorted_tables
+    ddl = [str(CreateTable(table).compile(dialect=dialect)) for table in tables]
+    ddl += [
+        str(CreateIndex(index).compile(dialect=dialect))
+        for table in tables
+        for index in sorted(table.indexes, key=lambda index: index.name)
+    ]
+    ddl += search.DDL.get(dialect.name, [])
+    return hashlib.sha1("\n".join(ddl).encode("utf-8")).hexdigest()[:16]
+
+def stored_version(conn):
+    if not inspect(conn).has_table(models.SchemaVersion.__tablename__):
+        return None
+    return conn.execute(select(models.SchemaVersion.version).where(models.SchemaVersion.id == 1)).scalar()
+
+def prepare(conn) -> bool:
+    """
+    Bring the schema up to date (sync; runs inside engine.begin()). Returns
+    False when the database was already current and no DDL ran.
+    """
+    expected = version(conn.dialect)
+    if stored_version(conn) == expected:
+        search.use_index(conn)
+        return False
+    models.Base.metadata.create_all(conn)
+    database.upgrade_schema(conn)
+    search.ensure_index(conn)
+    conn.execute(models.SchemaVersion.__table__.delete())
+    conn.execute(models.SchemaVersion.__table__.insert().values(id=1, version=expected))
+    logger.info("Database schema updated to version %s", expected)
+    return True
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlsplit, urlunsplit, quote, unquote, parse_qsl, urlencode
+
+import database
+import metrics
+import models
+import services
+import storage
+from caching import LRUCache
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", "3600"))  # seconds before revalidation
+SCRAPE_CACHE_SIZE = int(os.getenv("SCRAPE_CACHE_SIZE", "256"))
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical cache key for an article URL.
+    Lowercases scheme/host, drops fragments and default ports, maps the mobile
+    site onto the desktop one and spells titles with underscores.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    if host.endswith("wikipedia.org"):
+        scheme = "https"
+        host = host.replace(".m.wikipedia.org", ".wikipedia.org")
+    path = quote(unquote(parts.path).replace(" ", "_"), safe="/:()_,'!-.~")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+class ScrapeCache:
+    """
+    Two-tier cache in front of services.scrape_wikipedia.
+    Memory (LRU) first, then the scraped_pages table. Entries older than the TTL
+    are revalidated with If-None-Match / If-Modified-Since before being reused.
+    """
+
+    def __init__(self, max_entries: int = SCRAPE_CACHE_SIZE, ttl: float = SCRAPE_CACHE_TTL):
+        self.ttl = ttl
+        self.memory = LRUCache(max_entries)
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _is_fresh(self, entry) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    async def get(self, url: str, revalidate: bool = False, on_title=None):
+        """
+        Return {"title", "text"} for url, fetching only when the cache can't answer.
+        revalidate=True treats cached entries as stale (e.g. the article's revision
+        is known to have changed); they are still used for a conditional request.
+        on_title is passed to the fetch, for callers that show the title early.
+        """
+        key = normalize_url(url)
+
+        entry = self.memory.get(key)
+        if entry and not revalidate and self._is_fresh(entry):
+            self.memory_hits += 1
+            return {"title": entry["title"], "text": entry["text"]}
+
+        if entry is None:
+            entry = await self._load(key)
+            if entry:
+                self.memory.set(key, entry)
+                if not revalidate and self._is_fresh(entry):
+                    self.db_hits += 1
+                    return {"title": entry["title"], "text": entry["text"]}
+
+        with metrics.stage("fetch"):
+            if entry and (entry["etag"] or entry["last_modified"]):
+                fetched = await services.fetch_wikipedia_async(url, entry["etag"], entry["last_modified"], on_title)
+            else:
+                fetched = await services.fetch_wikipedia_async(url, on_title=on_title)
+
+        if fetched["status"] == 304:
+            self.revalidated += 1
+            entry = dict(entry, fetched_at=time.time())
+        else:
+            self.misses += 1
+            loop = asyncio.get_event_loop()
+            with metrics.stage("parse"):
+                parsed = await loop.run_in_executor(None, services.parse_wikipedia, fetched["content"])
+            entry = {
+                "url": url,
+                "title": parsed["title"],
+                "text": parsed["text"],
+                "etag": fetched["etag"],
+                "last_modified": fetched["last_modified"],
+                "fetched_at": time.time(),
+            }
+
+        self.memory.set(key, entry)
+        await self._store(key, entry)
+        return {"title": entry["title"], "text": entry["text"]}
+
+    async def _load(self, key: str):
+        try:
+            async with database.AsyncSessionLocal() as session:
+                page = await session.get(models.ScrapedPage, key)
+        except Exception as e:
+            # The persistent tier is best-effort; a broken table must not break scraping
+            logger.warning("Scrape cache lookup failed: %s", e)
+            return None
+        if page is None:
+            return None
+        return {
+            "url": page.url,
+            "title": page.title,
+            "text": storage.decompress_text(page.body) if page.body is not None else page.text,
+            "etag": page.etag,
+            "last_modified": page.last_modified,
+            "fetched_at": page.fetched_at or 0.0,
+        }
+
+    async def _store(self, key: str, entry: dict):
+        try:
+            # Article bodies are stored compressed; compressing a long one takes a few ms
+            loop = asyncio.get_event_loop()
+            body = await loop.run_in_executor(None, storage.compress_text, entry["text"])
+            columns = {name: value for name, value in entry.items() if name != "text"}
+            async with database.AsyncSessionLocal() as session:
+                await session.merge(models.ScrapedPage(url_key=key, text=None, body=body, **columns))
+                await session.commit()
+        except Exception as e:
+            logger.warning("Scrape cache store failed: %s", e)
+
+    def stats(self):
+        # Revalidated entries count as hits: they skip both the body download and the parse
+        hits = self.memory_hits + self.db_hits + self.revalidated
+        lookups = hits + self.misses
+        return {
+            "memory": self.memory.stats(),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+scrape_cache = ScrapeCache()
@@ -0,0 +1,176 @@
+import logging
+import re
+
+from sqlalchemy import inspect, literal, null, select, text, or_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+import storage
+
+logger = logging.getLogger(__name__)
+
+# Full-text index over quizzes, kept in its own table next to quizzes:
+# - SQLite: FTS5 virtual table (rowid = quiz id), ranked with bm25
+# - Postgres: tsvector column with a GIN index, ranked with ts_rank_cd
+# Other backends (or SQLite built without FTS5) fall back to a LIKE scan.
+SEARCH_TABLE = "quiz_search"
+
+# Relative weight of each column in the ranking: title, summary, entities, questions
+_SQLITE_WEIGHTS = "10.0, 4.0, 4.0, 1.0"
+_BACKFILL_BATCH = 500
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+backend = None  # "fts5", "tsvector" or None; set by ensure_index or use_index at startup
+
+def _entities_text(key_entities) -> str:
+    if isinstance(key_entities, dict):
+        return " ".join(str(name) for names in key_entities.values() for name in (names or []))
+    return ""
+
+def document(quiz_id: int, title: str, quiz_data: dict) -> dict:
+    """Search row for a quiz being inserted; quiz_data has the generator's shape."""
+    return {
+        "id": quiz_id,
+        "title": title or "",
+        "summary": quiz_data.get("summary") or "",
+        "entities": _entities_text(quiz_data.get("key_entities")),
+        "questions": " ".join(q["question"] for q in quiz_data.get("quiz", [])),
+    }
+
+_INSERT = {
+    "fts5": text(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, summary, entities, questions) "
+        "VALUES (:id, :title, :summary, :entities, :questions)"
+    ),
+    "tsvector": text(
+        f"INSERT INTO {SEARCH_TABLE} (quiz_id, document) VALUES (:id, "
+        "setweight(to_tsvector('english', :title), 'A') || "
+        "setweight(to_tsvector('english', :summary), 'B') || "
+        "setweight(to_tsvector('english', :entities), 'B') || "
+        "setweight(to_tsvector('english', :questions), 'C')) "
+        "ON CONFLICT (quiz_id) DO NOTHING"
+    ),
+}
+
+async def index_quizzes(db: AsyncSession, rows):
+    """Add search rows in the caller's transaction, so the index never lags the quizzes."""
+    if backend is not None and rows:
+        await db.execute(_INSERT[backend], rows)
+
+# Schema (sync; runs inside engine.begin() at startup)
+
+DDL = {
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        "USING fts5(title, summary, entities, questions, tokenize='porter unicode61')",
+    ],
+    "postgresql": [
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+        "quiz_id INTEGER PRIMARY KEY REFERENCES quizzes(id) ON DELETE CASCADE, "
+        "document tsvector NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)",
+    ],
+}
+_BACKENDS = {"sqlite": "fts5", "postgresql": "tsvector"}
+
+def ensure_index(conn):
+    """Create the index for this backend and add any quizzes it is missing."""
+    global backend
+    dialect = conn.dialect.name
+    if dialect not in DDL:
+        backend = None
+        return
+    try:
+        for statement in DDL[dialect]:
+            conn.execute(text(statement))
+    except OperationalError as e:
+        if dialect != "sqlite":
+            raise
+        logger.warning("SQLite FTS5 unavailable, search falls back to a table scan: %s", e)
+        backend = None
+        return
+    backend = _BACKENDS[dialect]
+    _backfill(conn)
+
+def use_index(conn):
+    """Pick the backend for an index that already exists, without DDL or backfill."""
+    global backend
+    has_index = conn.dialect.name in DDL and inspect(conn).has_table(SEARCH_TABLE)
+    backend = _BACKENDS[conn.dialect.name] if has_index else None
+
+def _backfill(conn):
+    # Quizzes saved before the index existed
+    key = "rowid" if backend == "fts5" else "quiz_id"
+    Quiz, Question = models.Quiz, models.Question
+    missing = text(f"NOT EXISTS (SELECT 1 FROM {SEARCH_TABLE} s WHERE s.{key} = quizzes.id)")
+    total = 0
+    while True:
+        quizzes = conn.execute(
+            select(Quiz.id, Quiz.title, Quiz.summary, Quiz.key_entities, Quiz.questions_blob)
+            .where(missing).order_by(Quiz.id).limit(_BACKFILL_BATCH)
+        ).all()
+        if not quizzes:
+            break
+        questions = {q.id: storage.decode_questions(q.questions_blob) for q in quizzes if q.questions_blob is not None}
+        for quiz_id, question_text in conn.execute(
+            select(Question.quiz_id, Question.question_text).where(Question.quiz_id.in_([q.id for q in quizzes]))
+        ):
+            questions.setdefault(quiz_id, []).append({"question": question_text or ""})
+        rows = [
+            document(q.id, q.title, {"summary": q.summary, "key_entities": q.key_entities, "quiz": questions.get(q.id, [])})
+            for q in quizzes
+        ]
+        conn.execute(_INSERT[backend], rows)
+        total += len(rows)
+    if total:
+        logger.info("Search index backfilled with %d quizzes", total)
+
+# Queries
+
+def _fts5_query(query: str):
+    # Quote every word so user input can't use FTS5 syntax; the last word matches as a prefix
+    words = _WORD.findall(query)
+    if not words:
+        return None
+    return " ".join(f'"{w}"' for w in words) + "*"
+
+async def search(db: AsyncSession, query: str, limit: int, offset: int = 0):
+    """Ranked matches as [{"id", "rank", "snippet"}], best first."""
+    if backend == "fts5":
+        match = _fts5_query(query)
+        if match is None:
+            return []
+        result = await db.execute(
+            text(
+                f"SELECT rowid AS id, -bm25({SEARCH_TABLE}, {_SQLITE_WEIGHTS}) AS rank, "
+                f"snippet({SEARCH_TABLE}, -1, '', '', '…', 12) AS snippet "
+                f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match "
+                "ORDER BY rank DESC, rowid DESC LIMIT :limit OFFSET :offset"
+            ),
+            {"match": match, "limit": limit, "offset": offset},
+        )
+    elif backend == "tsvector":
+        result = await db.execute(
+            text(
+                f"SELECT quiz_id AS id, ts_rank_cd(document, q) AS rank, NULL AS snippet "
+                f"FROM {SEARCH_TABLE}, websearch_to_tsquery('english', :query) q "
+                "WHERE document @@ q ORDER BY rank DESC, quiz_id DESC LIMIT :limit OFFSET :offset"
+            ),
+            {"query": query, "limit": limit, "offset": offset},
+        )
+    else:
+        # The query's own % and _ are literal characters, not wildcards
+        escaped = query.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        result = await db.execute(
+            select(models.Quiz.id, literal(0.0).label("rank"), null().label("snippet"))
+            .where(or_(
+                models.Quiz.title.ilike(pattern, escape="\\"),
+                models.Quiz.summary.ilike(pattern, escape="\\"),
+            ))
+            .order_by(models.Quiz.id.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+    return [{"id": row.id, "rank": float(row.rank or 0.0), "snippet": row.snippet} for row in result]
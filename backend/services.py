@@ -1,17 +1,197 @@
-import requests
-from bs4 import BeautifulSoup
-import google.generativeai as genai
+import asyncio
+import logging
+import httpx
 import os
 import json
-import re
-from dotenv import load_dotenv
+import database
+import entity_index
+import extractors
+import outbound
+from text_index import DocumentIndex
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Initialize Gemini API
-api_key = os.getenv("GEMINI_API_KEY")
-if api_key:
-    genai.configure(api_key=api_key)
+_genai = None
+
+def gemini():
+    """
+    google.generativeai, configured with GEMINI_API_KEY. Imported on first use:
+    it takes most of a second to import and instant generation never calls it.
+    """
+    global _genai
+    if _genai is None:
+        database.load_env()
+        import google.generativeai as genai
+        api_key = os.getenv("GEMINI_API_KEY")
+        if api_key:
+            genai.configure(api_key=api_key)
+        _genai = genai
+    return _genai
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+def _validate_url(url: str):
+    # Validate URL
+    if not url.startswith(('http://', 'https://')):
+        raise ValueError("Invalid URL format. Must start with http:// or https://")
+
+    if 'wikipedia.org' not in url.lower():
+        logger.warning("URL does not appear to be a Wikipedia article: %s", url)
+
+def fetch_wikipedia(url: str, etag: str = None, last_modified: str = None):
+    """
+    Fetch the raw HTML of a Wikipedia article.
+    When validators from a previous fetch are given, a conditional request is sent
+    and a 304 comes back with status 304 and no content.
+    """
+    _validate_url(url)
+    headers = dict(HEADERS)
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    import requests  # Only the synchronous path uses it; imported on demand to keep startup fast
+
+    logger.debug("Fetching URL: %s", url)
+    response = requests.get(url, headers=headers, timeout=5)  # 5 second timeout - fail fast!
+    if response.status_code == 304:
+        return {"status": 304, "content": None, "etag": etag, "last_modified": last_modified}
+    response.raise_for_status()
+    return {
+        "status": response.status_code,
+        "content": response.content,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+def parse_wikipedia(html, engine: str = None):
+    """
+    Extract title, headings, and paragraph content from Wikipedia article HTML.
+    The extraction engine comes from extractors.get_extractor (lxml when available).
+    """
+    parsed = extractors.get_extractor(engine).extract(html)
+    title = parsed["title"]
+    text_content = parsed["text"]
+
+    # Use FULL content - no truncation for comprehensive quiz generation
+    # The smart generator can handle longer text efficiently
+    logger.debug("Extracted %d characters of content", len(text_content))
+
+    if not text_content:
+        raise ValueError("No text content extracted from article")
+
+    return {
+        "title": title,
+        "text": text_content
+    }
+
+# Shared async HTTP client: keep-alive pool reused across requests
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+
+_http_client = None
+_TITLE_PEEK_BYTES = 512 * 1024  # firstHeading is near the top; stop looking after this
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=_http2_available(),
+            headers=HEADERS,
+            timeout=httpx.Timeout(5.0),  # Same fail-fast budget as the sync path
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=30.0,
+            ),
+        )
+    return _http_client
+
+def set_http_client(client: httpx.AsyncClient):
+    """Swap the shared client, e.g. for one pointed at a local stand-in server."""
+    global _http_client
+    _http_client = client
+    outbound.reset()
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    outbound.reset()
+
+async def fetch_wikipedia_async(url: str, etag: str = None, last_modified: str = None, on_title=None):
+    """
+    Async counterpart of fetch_wikipedia using the shared connection pool.
+    Returns the same dict shape, including status 304 for conditional hits.
+    on_title(title) is called as soon as firstHeading has arrived, before the
+    rest of the body has downloaded.
+    """
+    _validate_url(url)
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    logger.debug("Fetching URL: %s", url)
+    client = get_http_client()
+    content = None
+
+    async def send():
+        nonlocal content
+        if on_title is None:
+            response = await client.get(url, headers=headers)
+            content = response.content
+            return response
+        async with client.stream("GET", url, headers=headers) as response:
+            chunks = []
+            head = b""
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                if head is not None and response.status_code == 200:
+                    head += chunk
+                    title = extractors.peek_title(head)
+                    if title:
+                        on_title(title)
+                    if title or len(head) > _TITLE_PEEK_BYTES:
+                        head = None
+            content = b"".join(chunks)
+        return response
+
+    # Rate limited, concurrency limited and retried per host (see outbound.py)
+    response = await outbound.scheduler_for(url).call(send)
+    if response.status_code == 304:
+        return {"status": 304, "content": None, "etag": etag, "last_modified": last_modified}
+    response.raise_for_status()
+    return {
+        "status": response.status_code,
+        "content": content,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+async def scrape_wikipedia_async(url: str):
+    """
+    Scrape a Wikipedia article without tying up an executor thread on the network.
+    Only the CPU-bound HTML parse is handed to the thread pool.
+    """
+    try:
+        fetched = await fetch_wikipedia_async(url)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, parse_wikipedia, fetched["content"])
+    except Exception as e:
+        logger.warning("Error scraping Wikipedia: %s", e)
+        raise e
 
 def scrape_wikipedia(url: str):
     """
@@ -19,61 +199,10 @@ def scrape_wikipedia(url: str):
     Extracts title, headings, and paragraph content.
     """
     try:
-        # Validate URL
-        if not url.startswith(('http://', 'https://')):
-            raise ValueError("Invalid URL format. Must start with http:// or https://")
-        
-        if 'wikipedia.org' not in url.lower():
-            print(f"Warning: URL does not appear to be a Wikipedia article: {url}")
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        print(f"Fetching URL: {url}")
-        response = requests.get(url, headers=headers, timeout=5)  # 5 second timeout - fail fast!
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Extract title
-        title_elem = soup.find('h1', {'id': 'firstHeading'})
-        if not title_elem:
-            raise ValueError("Could not find article title")
-        title = title_elem.text.strip()
-        
-        # Extract content (paragraphs)
-        content_div = soup.find('div', {'id': 'mw-content-text'})
-        if not content_div:
-            raise ValueError("Could not find article content")
-        
-        # Extract ALL paragraphs - get complete article content
-        paragraphs = content_div.find_all('p')
-        # Filter out reference sections but keep all meaningful content
-        filtered_paragraphs = [
-            p.text.strip() for p in paragraphs 
-            if p.text.strip() and len(p.text.strip()) > 30  # Keep paragraphs with some content
-            and not p.find_parent('div', class_=lambda x: x and ('reference' in x.lower() or 'navbox' in x.lower() or 'infobox' in x.lower()))
-        ]
-        text_content = "\n".join(filtered_paragraphs)
-        
-        # Also extract section headings for better context
-        headings = content_div.find_all(['h2', 'h3'])
-        if headings:
-            heading_text = "\n".join([h.text.strip() for h in headings if h.text.strip()])
-            text_content = heading_text + "\n\n" + text_content
-        
-        # Use FULL content - no truncation for comprehensive quiz generation
-        # The smart generator can handle longer text efficiently
-        print(f"  - Extracted {len(text_content)} characters of content")
-        
-        if not text_content:
-            raise ValueError("No text content extracted from article")
-        
-        return {
-            "title": title,
-            "text": text_content
-        }
+        fetched = fetch_wikipedia(url)
+        return parse_wikipedia(fetched["content"])
     except Exception as e:
-        print(f"Error scraping Wikipedia: {e}")
+        logger.warning("Error scraping Wikipedia: %s", e)
         raise e
 
 def generate_quiz_content(text: str):
@@ -82,221 +211,300 @@ def generate_quiz_content(text: str):
     No LLM calls - instant response! Returns questions based on article content.
     """
     # ALWAYS use fast smart generator - it's instant and creates real questions from content!
-    print("  - Using instant smart quiz generator (no API delay)...")
+    logger.debug("Using instant smart quiz generator (no API delay)")
     return _generate_smart_quiz(text)
 
-def _generate_smart_quiz(text: str):
-    """
-    INSTANT quiz generator using pattern matching on scraped content.
-    Creates real questions from FULL article content - no API delays!
-    Uses entire article text for comprehensive question generation.
-    """
-    import re
-    
-    # Use FULL text - extract key information from entire article
-    sentences = re.split(r'[.!?]+', text)
-    sentences = [s.strip() for s in sentences if len(s.strip()) > 20]
-    
-    print(f"  - Processing {len(sentences)} sentences from full article content")
-    
-    if not sentences:
-        return _generate_mock_quiz()
-    
+def iter_quiz_content(text: str):
+    """generate_quiz_content for streaming: yields the parts of iter_smart_quiz."""
+    return iter_smart_quiz(text)
+
+def _short_phrase(sentence: str, max_words: int, max_chars: int) -> str:
+    # Extract short phrase, not full sentence
+    phrase = " ".join(sentence.split()[:max_words])
+    if len(phrase) > max_chars:
+        phrase = phrase[:max_chars - 3] + "..."
+    return phrase
+
+def _build_summary(doc: DocumentIndex, text: str) -> str:
     # Generate comprehensive summary from full article
     # Use first few sentences + key sentences from middle
-    if len(sentences) > 5:
-        summary = ". ".join(sentences[:3]) + ". " + ". ".join(sentences[len(sentences)//2:len(sentences)//2+2])
+    n = len(doc)
+    if n > 5:
+        summary = ". ".join(doc.sentences(0, 3)) + ". " + ". ".join(doc.sentences(n//2, n//2+2))
         summary = summary[:500]  # Limit summary length
     else:
-        summary = ". ".join(sentences[:3])[:400]
-    
+        summary = ". ".join(doc.sentences(0, 3))[:400]
+
     if len(summary) < 50:
         summary = text[:400] + "..."
-    
-    # Extract entities from FULL text
-    people = list(set(re.findall(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b', text)))[:8]
-    # Extract locations from entire article
-    locations = list(set(re.findall(r'\b(?:the |a )?[A-Z][a-z]+(?: [A-Z][a-z]+)*\b', text)))[:15]
+    return summary
+
+def _first_unique(items, limit: int):
+    # Distinct items in first-occurrence order; stops reading once limit is reached
+    seen = {}
+    for item in items:
+        if item not in seen:
+            seen[item] = None
+            if len(seen) == limit:
+                break
+    return list(seen)
+
+def _extract_people(doc: DocumentIndex):
+    # Two-word capitalized names; the best known across stored quizzes first, then first occurrence order
+    return entity_index.current.rank(_first_unique(doc.name_pairs(), 8), "people")
+
+def _extract_locations(doc: DocumentIndex):
+    locations = _first_unique(doc.phrases_with_article(), 15)
     locations = [l for l in locations if l.lower() not in ['the', 'a', 'an', 'this', 'that', 'these', 'those', 'and', 'or', 'but']][:8]
-    
-    # Generate questions from actual content
-    quiz = []
-    
+    return entity_index.current.rank(locations, "locations")
+
+def _question_main_subject(doc: DocumentIndex):
     # Question 1: Easy - What/Who is the main subject?
-    if len(sentences) > 0:
-        first_sent = sentences[0]
-        # Find the main subject (usually capitalized word in first sentence)
-        main_subjects = re.findall(r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\b', first_sent[:150])
-        if main_subjects:
-            subject = main_subjects[0]
-            # Extract a short description (first 60 chars or key phrase)
-            # Try to find a short descriptive phrase
-            words = first_sent.split()
-            short_desc = " ".join(words[:12])  # First 12 words max
-            if len(short_desc) > 80:
-                short_desc = short_desc[:77] + "..."
-            
-            # Create question with shorter options
-            quiz.append({
-                "question": f"Who or what is {subject}?",
-                "options": [
-                    short_desc if short_desc else "The main subject of this article",
-                    "A fictional character",
-                    "A place or location",
-                    "An unrelated topic"
-                ],
-                "answer": short_desc if short_desc else "The main subject of this article",
-                "difficulty": "easy",
-                "explanation": f"This is explained in the introduction of the article."
-            })
-    
+    # Find the main subject (usually capitalized word in first sentence)
+    spans = doc.phrase_spans_in_sentence(0, max_offset=150)
+    if not spans:
+        return None
+    # Up to two capitalized words, which may be split across lines
+    start, end = spans[0]
+    words = doc.text[start:end].split(" ")
+    if len(words) > 1:
+        subject = " ".join(words[:2])
+    elif len(spans) > 1 and doc.text[end:spans[1][0]].isspace():
+        subject = doc.text[start:spans[1][0]] + doc.text[slice(*spans[1])].split(" ")[0]
+    else:
+        subject = words[0]
+    # Try to find a short descriptive phrase
+    short_desc = _short_phrase(doc.sentence(0), 12, 80)  # First 12 words max
+
+    # Create question with shorter options
+    return {
+        "question": f"Who or what is {subject}?",
+        "options": [
+            short_desc if short_desc else "The main subject of this article",
+            "A fictional character",
+            "A place or location",
+            "An unrelated topic"
+        ],
+        "answer": short_desc if short_desc else "The main subject of this article",
+        "difficulty": "easy",
+        "explanation": f"This is explained in the introduction of the article."
+    }
+
+def _question_year(doc: DocumentIndex):
     # Question 2: Medium - When question (dates)
-    dates = re.findall(r'\b(19\d{2}|20\d{2})\b', text)
-    if dates:
-        year = dates[0]
-        quiz.append({
-            "question": "When did an important event related to this topic occur?",
-            "options": [
-                f"In {year}",
-                f"In {int(year) + 20}",
-                f"In {int(year) - 20}",
-                "The date is not mentioned"
-            ],
-            "answer": f"In {year}",
-            "difficulty": "medium",
-            "explanation": f"The year {year} is mentioned in the article as significant."
-        })
-    
+    year = doc.first_year()
+    if not year:
+        return None
+    return {
+        "question": "When did an important event related to this topic occur?",
+        "options": [
+            f"In {year}",
+            f"In {int(year) + 20}",
+            f"In {int(year) - 20}",
+            "The date is not mentioned"
+        ],
+        "answer": f"In {year}",
+        "difficulty": "medium",
+        "explanation": f"The year {year} is mentioned in the article as significant."
+    }
+
+def _question_person(doc: DocumentIndex, person: str):
     # Question 3: Medium - Who question (people)
-    if people and len(people) > 0:
-        person = people[0]
-        # Find short context about this person (max 60 chars)
-        person_context = ""
-        for sent in sentences[:10]:
-            if person in sent:
-                # Extract key phrase, not full sentence
-                words = sent.split()
-                # Find words around the person's name
-                try:
-                    idx = words.index(person.split()[0])
-                    start = max(0, idx - 3)
-                    end = min(len(words), idx + 8)
-                    person_context = " ".join(words[start:end])
-                    if len(person_context) > 70:
-                        person_context = person_context[:67] + "..."
-                except:
-                    person_context = " ".join(words[:10])
-                    if len(person_context) > 70:
-                        person_context = person_context[:67] + "..."
-                break
-        
-        quiz.append({
-            "question": f"Who is {person}?",
-            "options": [
-                person_context if person_context else "A person mentioned in the article",
-                "A fictional character",
-                "A place name",
-                "An organization"
-            ],
-            "answer": person_context if person_context else "A person mentioned in the article",
-            "difficulty": "medium",
-            "explanation": f"{person} is discussed in the article."
-        })
-    
+    # Find short context about this person (max 70 chars) in the first 10 sentences
+    person_context = ""
+    first_name = person.split()[0]
+    for i in doc.sentences_with(first_name, limit=10):
+        sent = doc.sentence(i)
+        if person not in sent:
+            continue
+        # Find words around the person's name
+        words = sent.split()
+        try:
+            idx = words.index(first_name)
+            person_context = " ".join(words[max(0, idx - 3):min(len(words), idx + 8)])
+        except ValueError:
+            person_context = " ".join(words[:10])
+        if len(person_context) > 70:
+            person_context = person_context[:67] + "..."
+        break
+
+    return {
+        "question": f"Who is {person}?",
+        "options": [
+            person_context if person_context else "A person mentioned in the article",
+            "A fictional character",
+            "A place name",
+            "An organization"
+        ],
+        "answer": person_context if person_context else "A person mentioned in the article",
+        "difficulty": "medium",
+        "explanation": f"{person} is discussed in the article."
+    }
+
+def _question_key_concept(doc: DocumentIndex):
     # Question 4: Hard - Key concept or detail from middle/end of article
-    if len(sentences) > 5:
-        # Use sentences from different parts of the article for comprehensive coverage
-        mid_start = len(sentences) // 3
-        mid_end = (len(sentences) * 2) // 3
-        important_sentences = [s for s in sentences[mid_start:mid_end] if len(s) > 50]
-        if important_sentences:
-            concept_sent = important_sentences[0]
-            # Extract short phrase (max 70 chars)
-            words = concept_sent.split()
-            short_concept = " ".join(words[:10])
-            if len(short_concept) > 70:
-                short_concept = short_concept[:67] + "..."
-            
-            quiz.append({
-                "question": "What is a key detail or concept discussed in this article?",
-                "options": [
-                    short_concept if short_concept else "A key concept from the article",
-                    "A minor detail not mentioned",
-                    "An unrelated concept",
-                    "Information not in the article"
-                ],
-                "answer": short_concept if short_concept else "A key concept from the article",
-                "difficulty": "hard",
-                "explanation": "This concept is discussed in detail in the article."
-            })
-    
+    n = len(doc)
+    if n <= 5:
+        return None
+    # Use sentences from different parts of the article for comprehensive coverage
+    important_sentences = (s for s in doc.sentences(n // 3, (n * 2) // 3) if len(s) > 50)
+    concept_sent = next(important_sentences, None)
+    if concept_sent is None:
+        return None
+    short_concept = _short_phrase(concept_sent, 10, 70)
+    return {
+        "question": "What is a key detail or concept discussed in this article?",
+        "options": [
+            short_concept if short_concept else "A key concept from the article",
+            "A minor detail not mentioned",
+            "An unrelated concept",
+            "Information not in the article"
+        ],
+        "answer": short_concept if short_concept else "A key concept from the article",
+        "difficulty": "hard",
+        "explanation": "This concept is discussed in detail in the article."
+    }
+
+def _question_later_info(doc: DocumentIndex):
     # Question 5: Medium - Extract from later in article
-    if len(sentences) > 8:
-        later_sentences = sentences[len(sentences)//2:]
-        if later_sentences:
-            later_sent = later_sentences[0]
-            # Extract short phrase (max 70 chars)
-            words = later_sent.split()
-            short_info = " ".join(words[:10])
-            if len(short_info) > 70:
-                short_info = short_info[:67] + "..."
-            
-            quiz.append({
-                "question": "What additional information is provided in this article?",
-                "options": [
-                    short_info if short_info else "Additional information from the article",
-                    "Information not mentioned",
-                    "Unrelated facts",
-                    "Speculative content"
-                ],
-                "answer": short_info if short_info else "Additional information from the article",
-                "difficulty": "medium",
-                "explanation": "This information is provided in the article."
-            })
-    
+    n = len(doc)
+    if n <= 8:
+        return None
+    short_info = _short_phrase(doc.sentence(n // 2), 10, 70)
+    return {
+        "question": "What additional information is provided in this article?",
+        "options": [
+            short_info if short_info else "Additional information from the article",
+            "Information not mentioned",
+            "Unrelated facts",
+            "Speculative content"
+        ],
+        "answer": short_info if short_info else "Additional information from the article",
+        "difficulty": "medium",
+        "explanation": "This information is provided in the article."
+    }
+
+def _question_main_topic(summary: str):
     # Question 5: Easy - Main topic
+    # Create short summary phrase (max 70 chars)
+    short_summary = _short_phrase(summary, 10, 70)
+    return {
+        "question": "What is the main topic of this Wikipedia article?",
+        "options": [
+            short_summary if short_summary else "The main topic described in the article",
+            "An unrelated scientific topic",
+            "A fictional story",
+            "A different historical event"
+        ],
+        "answer": short_summary if short_summary else "The main topic described in the article",
+        "difficulty": "easy",
+        "explanation": "This is the main topic discussed in the article."
+    }
+
+def _question_entity(doc: DocumentIndex, entity_type: str, names, noun: str, skip=()):
+    # Extra question: which entity appears here; distractors are well-known
+    # entities of the same type from other quizzes that the article never mentions
+    answer = next((name for name in names if name not in skip and entity_index.is_name(name)), None)
+    if answer is None:
+        return None
+    distractors = entity_index.current.distractors(entity_type, exclude=doc.text, seed=answer)
+    if len(distractors) < 3:
+        return None
+    return {
+        "question": f"Which of these {noun} is mentioned in this article?",
+        "options": [answer] + distractors,
+        "answer": answer,
+        "difficulty": "medium",
+        "explanation": f"{answer} is mentioned in the article."
+    }
+
+_FILLER_QUESTION = {
+    "question": "What information can you learn from this article?",
+    "options": [
+        "Information about the topic described",
+        "Information about unrelated topics",
+        "Fictional stories",
+        "Scientific theories not mentioned"
+    ],
+    "answer": "Information about the topic described",
+    "difficulty": "easy",
+    "explanation": "The article provides information about its main topic."
+}
+
+def _generate_smart_quiz(text: str):
+    """
+    INSTANT quiz generator using pattern matching on scraped content.
+    Creates real questions from FULL article content - no API delays!
+    The article is scanned once into a DocumentIndex; every builder below queries it.
+    """
+    quiz = None
+    for _, quiz in iter_smart_quiz(text):
+        pass  # The last part is the complete quiz
+    return quiz
+
+def iter_smart_quiz(text: str):
+    """
+    _generate_smart_quiz one part at a time, for streaming responses. Yields
+    ("summary", str), ("key_entities", dict), then ("question", dict) as each
+    question is built, and finally ("quiz", the complete quiz dict).
+    """
+    doc = DocumentIndex(text)
+
+    logger.debug("Processing %d sentences from full article content", len(doc))
+
+    if not len(doc):
+        mock = _generate_mock_quiz()
+        yield "summary", mock["summary"]
+        yield "key_entities", mock["key_entities"]
+        for question in mock["quiz"]:
+            yield "question", question
+        yield "quiz", mock
+        return
+
+    summary = _build_summary(doc, text)
+    yield "summary", summary
+
+    # Extract entities from FULL text
+    people = _extract_people(doc)
+    locations = _extract_locations(doc)
+    key_entities = {
+        "people": people[:5] if people else [],  # More entities from full article
+        "organizations": [],
+        "locations": locations[:5] if locations else []  # More locations from full article
+    }
+    yield "key_entities", key_entities
+
+    # Generate questions from actual content
+    builders = (
+        lambda: _question_main_subject(doc),
+        lambda: _question_year(doc),
+        lambda: _question_person(doc, people[0]) if people else None,
+        lambda: _question_key_concept(doc),
+        lambda: _question_later_info(doc),
+    )
+    quiz = []
+    for build in builders:
+        question = build()
+        if question:
+            quiz.append(question)
+            yield "question", question
     if len(quiz) < 5:
-        # Create short summary phrase (max 70 chars)
-        summary_words = summary.split()
-        short_summary = " ".join(summary_words[:10])
-        if len(short_summary) > 70:
-            short_summary = short_summary[:67] + "..."
-        
-        quiz.append({
-            "question": "What is the main topic of this Wikipedia article?",
-            "options": [
-                short_summary if short_summary else "The main topic described in the article",
-                "An unrelated scientific topic",
-                "A fictional story",
-                "A different historical event"
-            ],
-            "answer": short_summary if short_summary else "The main topic described in the article",
-            "difficulty": "easy",
-            "explanation": "This is the main topic discussed in the article."
-        })
-    
+        quiz.append(_question_main_topic(summary))
+        yield "question", quiz[-1]
+    for entity_type, names, noun, skip in (("people", people, "people", ()), ("locations", locations, "places", people)):
+        question = _question_entity(doc, entity_type, names, noun, skip) if len(quiz) < 7 else None
+        if question:
+            quiz.append(question)
+            yield "question", question
+
     # Ensure minimum 3 questions
     while len(quiz) < 3:
-        quiz.append({
-            "question": "What information can you learn from this article?",
-            "options": [
-                "Information about the topic described",
-                "Information about unrelated topics",
-                "Fictional stories",
-                "Scientific theories not mentioned"
-            ],
-            "answer": "Information about the topic described",
-            "difficulty": "easy",
-            "explanation": "The article provides information about its main topic."
-        })
-    
-    return {
+        quiz.append(dict(_FILLER_QUESTION))
+        yield "question", quiz[-1]
+
+    yield "quiz", {
         "summary": summary,
-        "key_entities": {
-            "people": people[:5] if people else [],  # More entities from full article
-            "organizations": [],
-            "locations": locations[:5] if locations else []  # More locations from full article
-        },
+        "key_entities": key_entities,
         "sections": [],
         "quiz": quiz[:7],  # Up to 7 questions from full article content
         "related_topics": []
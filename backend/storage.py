@@ -0,0 +1,151 @@
+"""
+Compact storage for article bodies and quiz questions.
+
+Every blob starts with one byte naming its codec, so blobs written with any
+codec stay readable after STORAGE_CODEC changes:
+
+    0 none, 1 zlib (preset dictionary), 2 lzma, 3 zstd, 4 brotli
+
+Questions are stored per quiz as one blob instead of one row each. Strings the
+generator repeats in every quiz (distractors such as "A fictional character",
+question stems, difficulties) are written as indexes into SHARED_STRINGS.
+"""
+import json
+import lzma
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # Optional codec
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # Optional codec
+    brotli = None
+
+STORAGE_CODEC = os.getenv("STORAGE_CODEC", "zlib").lower()
+# blob: one compressed blob per quiz (default); rows: one questions row per question
+QUIZ_QUESTION_STORAGE = os.getenv("QUIZ_QUESTION_STORAGE", "blob").lower()
+
+# Append only: stored question blobs refer to these by position
+SHARED_STRINGS = (
+    "easy", "medium", "hard",
+    # Distractors
+    "A fictional character", "A place or location", "An unrelated topic", "A place name",
+    "An organization", "A minor detail not mentioned", "An unrelated concept",
+    "Information not in the article", "Information not mentioned", "Unrelated facts",
+    "Speculative content", "An unrelated scientific topic", "A fictional story",
+    "A different historical event", "The date is not mentioned",
+    # Stems, fallback answers and explanations
+    "When did an important event related to this topic occur?",
+    "What is a key detail or concept discussed in this article?",
+    "What additional information is provided in this article?",
+    "What is the main topic of this Wikipedia article?",
+    "What information can you learn from this article?",
+    "The main subject of this article", "A person mentioned in the article",
+    "A key concept from the article", "Additional information from the article",
+    "The main topic described in the article",
+    "Information about the topic described", "Information about unrelated topics",
+    "Fictional stories", "Scientific theories not mentioned",
+    "This is explained in the introduction of the article.",
+    "This concept is discussed in detail in the article.",
+    "This information is provided in the article.",
+    "This is the main topic discussed in the article.",
+    "The article provides information about its main topic.",
+)
+_SHARED_INDEX = {s: i for i, s in enumerate(SHARED_STRINGS)}
+
+# zlib preset dictionary: lets even a 1 KB blob back-reference common text.
+# Never edit - blobs written with codec 1 can only be inflated with these exact bytes.
+_ZDICT = (
+    "What is the main topic of this Wikipedia article? Who or what is Who is "
+    "is discussed in the article. The year is mentioned in the article as significant. "
+    "In 19 In 20 the of and in to a was is for on as by with from that at which "
+    "questionoptionsanswerdifficultyexplanation"
+).encode("utf-8")
+
+def _zlib_compress(data: bytes) -> bytes:
+    compressor = zlib.compressobj(level=6, zdict=_ZDICT)
+    return compressor.compress(data) + compressor.flush()
+
+def _zlib_decompress(data: bytes) -> bytes:
+    decompressor = zlib.decompressobj(zdict=_ZDICT)
+    return decompressor.decompress(data) + decompressor.flush()
+
+_CODECS = {
+    "none": (0, lambda data: data, lambda data: data),
+    "zlib": (1, _zlib_compress, _zlib_decompress),
+    "lzma": (2, lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+if zstandard is not None:
+    _CODECS["zstd"] = (3, lambda data: zstandard.ZstdCompressor(level=6).compress(data),
+                       lambda data: zstandard.ZstdDecompressor().decompress(data))
+if brotli is not None:
+    _CODECS["brotli"] = (4, lambda data: brotli.compress(data, quality=6), brotli.decompress)
+_DECOMPRESS = {codec_id: decompress for codec_id, _, decompress in _CODECS.values()}
+
+def available_codecs():
+    return list(_CODECS)
+
+def compress(data: bytes, codec: str = None) -> bytes:
+    codec = codec or STORAGE_CODEC
+    if codec not in _CODECS:
+        raise ValueError(f"Unknown STORAGE_CODEC '{codec}'. Available: {', '.join(_CODECS)}")
+    codec_id, fn, _ = _CODECS[codec]
+    return bytes((codec_id,)) + fn(data)
+
+def decompress(blob: bytes) -> bytes:
+    decompress = _DECOMPRESS.get(blob[0])
+    if decompress is None:
+        raise ValueError(f"Blob uses codec {blob[0]}, which is not installed")
+    return decompress(bytes(blob[1:]))
+
+def compress_text(text: str, codec: str = None) -> bytes:
+    return compress(text.encode("utf-8"), codec)
+
+def decompress_text(blob: bytes) -> str:
+    return decompress(blob).decode("utf-8")
+
+# Questions
+
+def encode_questions(questions, codec: str = None) -> bytes:
+    """
+    Questions in the generator's shape -> blob. Each string is stored as an int:
+    i >= 0 is SHARED_STRINGS[i], i < 0 is the blob's own strings[-1 - i].
+    """
+    local = {}
+
+    def ref(value):
+        value = value or ""
+        shared = _SHARED_INDEX.get(value)
+        if shared is not None:
+            return shared
+        if value not in local:
+            local[value] = len(local)
+        return -1 - local[value]
+
+    rows = [
+        [ref(q["question"]), [ref(o) for o in q["options"]], ref(q["answer"]),
+         ref(q.get("difficulty", "medium")), ref(q.get("explanation", ""))]
+        for q in questions
+    ]
+    payload = {"v": 1, "s": list(local), "q": rows}
+    return compress(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), codec)
+
+def decode_questions(blob: bytes) -> list:
+    payload = json.loads(decompress(blob))
+    # One lookup for both kinds of reference: text[-1 - k] is strings[k] once they are appended reversed
+    text = SHARED_STRINGS + tuple(reversed(payload["s"]))
+
+    return [
+        {
+            "question": text[question],
+            "options": [text[o] for o in options],
+            "answer": text[answer],
+            "difficulty": text[difficulty],
+            "explanation": text[explanation],
+        }
+        for question, options, answer, difficulty, explanation in payload["q"]
+    ]
@@ -0,0 +1,62 @@
+"""
+The app's modules read their settings and create the database engine on
+import, so the environment points at a temporary directory before any of them
+is loaded. Every test starts with an empty database; `run` executes a
+coroutine on a new event loop against it.
+
+    python -m pytest tests
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DIRECTORY = tempfile.mkdtemp(prefix="quiz_tests_")
+_DATABASE = os.path.join(_DIRECTORY, "test.db")
+os.environ.update({
+    "DATABASE_URL": f"sqlite+aiosqlite:///{_DATABASE}",
+    "ENTITY_INDEX_PATH": os.path.join(_DIRECTORY, "entity_index.bin"),
+    "QUIZ_GENERATOR": "instant",
+    "JOB_WORKERS": "0",  # Tests that need workers start their own JobQueue
+    "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+})
+sys.path.insert(0, BACKEND_DIR)
+
+import database  # noqa: E402
+import entity_index  # noqa: E402
+import generators  # noqa: E402
+import schema  # noqa: E402
+import services  # noqa: E402
+from scrape_cache import scrape_cache  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    for path in (_DATABASE, _DATABASE + "-wal", _DATABASE + "-shm", entity_index.ENTITY_INDEX_PATH):
+        if os.path.exists(path):
+            os.remove(path)
+    entity_index.current = entity_index.EntityIndex()
+    generators.results.clear()
+    generators.set_generator(None)
+    scrape_cache.memory.clear()
+    yield
+
+@pytest.fixture
+def run():
+    def runner(coro):
+        async def body():
+            try:
+                async with database.engine.begin() as conn:
+                    await conn.run_sync(schema.prepare)
+                return await coro
+            finally:
+                await services.close_http_client()
+                await database.engine.dispose()
+        return asyncio.run(body())
+    return runner
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_DIRECTORY, ignore_errors=True)
@@ -0,0 +1,12 @@
+import httpx
+
+import main
+
+def test_batch_rejects_zero_concurrency(run):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await client.post("/api/generate/batch", json={"urls": ["https://en.wikipedia.org/wiki/A"], "concurrency": 0})
+
+    response = run(scenario())
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Concurrency must be at least 1."
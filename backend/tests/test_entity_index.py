@@ -0,0 +1,103 @@
+import httpx
+import pytest
+from sqlalchemy import insert
+
+import database
+import entity_index
+import main
+import models
+import persistence
+
+QUIZ = {
+    "summary": "",
+    "key_entities": {"people": ["Ada Lovelace"], "organizations": [], "locations": ["London"]},
+    "quiz": [],
+}
+
+def test_counted_only_after_commit(run):
+    async def scenario():
+        async with database.AsyncSessionLocal() as db:
+            await persistence.insert_quizzes(db, [("https://en.wikipedia.org/wiki/A", "A", QUIZ)])
+            before_commit = entity_index.current.frequency("Ada Lovelace", "people")
+            await db.commit()
+        return before_commit, entity_index.current.frequency("Ada Lovelace", "people")
+
+    assert run(scenario()) == (0, 1)
+
+def test_rolled_back_quizzes_are_not_counted(run):
+    async def scenario():
+        async with database.AsyncSessionLocal() as db:
+            await persistence.insert_quizzes(db, [("https://en.wikipedia.org/wiki/A", "A", QUIZ)])
+            await db.rollback()
+        async with database.AsyncSessionLocal() as db:
+            await persistence.insert_quizzes(db, [("https://en.wikipedia.org/wiki/B", "B", QUIZ)])
+            # Closed without committing
+        with pytest.raises(RuntimeError):
+            async with database.AsyncSessionLocal() as db:
+                await persistence.insert_quizzes(db, [("https://en.wikipedia.org/wiki/C", "C", QUIZ)])
+                raise RuntimeError("the commit never happens")
+        # A later commit in the same session counts only its own rows
+        async with database.AsyncSessionLocal() as db:
+            await persistence.insert_quizzes(db, [("https://en.wikipedia.org/wiki/D", "D", QUIZ)])
+            await db.rollback()
+            await persistence.insert_quizzes(db, [("https://en.wikipedia.org/wiki/E", "E", QUIZ)])
+            await db.commit()
+        return entity_index.current.frequency("Ada Lovelace", "people"), entity_index.current.frequency("London", "locations")
+
+    assert run(scenario()) == (1, 1)
+
+async def _save(url: str, quiz=QUIZ):
+    async with database.AsyncSessionLocal() as db:
+        await persistence.insert_quizzes(db, [(url, url.rsplit("/", 1)[-1], quiz)])
+        await db.commit()
+
+async def _shutdown_snapshot():
+    async with database.engine.begin() as conn:
+        await conn.run_sync(entity_index.save_snapshot)
+
+async def _startup_index():
+    async with database.engine.begin() as conn:
+        await conn.run_sync(entity_index.ensure_index)
+    return entity_index.current.frequency("Ada Lovelace", "people")
+
+def test_workers_snapshot_each_others_mentions(run):
+    async def scenario():
+        await _startup_index()
+        # Two workers share the database; each counts only its own saves in memory
+        await _save("https://en.wikipedia.org/wiki/A")
+        first_worker = entity_index.current
+        entity_index.current = entity_index.EntityIndex()
+        await _save("https://en.wikipedia.org/wiki/B")
+        await _save("https://en.wikipedia.org/wiki/C")
+        await _shutdown_snapshot()
+        entity_index.current = first_worker
+        await _shutdown_snapshot()  # The last writer
+        return await _startup_index()
+
+    assert run(scenario()) == 3
+
+def test_mentions_committed_below_the_watermark_are_counted(run):
+    async def scenario():
+        await _save("https://en.wikipedia.org/wiki/A")
+        await _save("https://en.wikipedia.org/wiki/B")
+        await _startup_index()
+        # A transaction that got a lower quiz id commits after the snapshot was written
+        async with database.engine.begin() as conn:
+            await conn.execute(insert(models.EntityMention), [{"entity": "Ada Lovelace", "type": "people", "quiz_id": 1}])
+        return await _startup_index()
+
+    assert run(scenario()) == 3
+
+def test_entity_lookup(run):
+    async def scenario():
+        await _save("https://en.wikipedia.org/wiki/A")
+        await _save("https://en.wikipedia.org/wiki/B", dict(QUIZ, key_entities={"people": ["Ada Lovelace"]}))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return (await client.get("/api/entities/Ada Lovelace")).json(), \
+                   (await client.get("/api/entities/London", params={"limit": 1})).json(), \
+                   (await client.get("/api/entities/Nobody")).status_code
+
+    ada, london, missing = run(scenario())
+    assert ada == {"name": "Ada Lovelace", "type": "people", "frequency": 2, "quiz_ids": [2, 1]}
+    assert london == {"name": "London", "type": "locations", "frequency": 1, "quiz_ids": [1]}
+    assert missing == 404
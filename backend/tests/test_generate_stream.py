@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+import database
+import main
+import models
+import services
+from benchmarks.corpus import synthetic_page
+from benchmarks.standin import StandinServer
+
+def _count_generations(monkeypatch):
+    calls = []
+    stream, generate = services.iter_quiz_content, services.generate_quiz_content
+
+    def counted(fn):
+        def wrapper(text):
+            calls.append(fn.__name__)
+            return fn(text)
+        return wrapper
+
+    monkeypatch.setattr(services, "iter_quiz_content", counted(stream))
+    monkeypatch.setattr(services, "generate_quiz_content", counted(generate))
+    return calls
+
+async def _stream(client, url: str):
+    response = await client.post("/api/generate/stream", json={"url": url})
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+async def _with_app(scenario):
+    await main.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await scenario(client)
+    finally:
+        await main.shutdown()
+
+async def _saved_quizzes():
+    async with database.AsyncSessionLocal() as db:
+        return (await db.execute(select(models.Quiz.id, models.Quiz.revision))).all()
+
+def test_concurrent_streams_share_one_generation(run, monkeypatch):
+    calls = _count_generations(monkeypatch)
+    # Latency keeps both requests in flight at the same time
+    with StandinServer({"/wiki/Shared": synthetic_page("Shared", 40, 1)}, latency=0.2) as server:
+        url = server.url("/wiki/Shared")
+
+        async def scenario(client):
+            first, second = await asyncio.gather(_stream(client, url), _stream(client, url))
+            third = await _stream(client, url)
+            return first, second, third, await _saved_quizzes()
+
+        first, second, third, saved = run(_with_app(scenario))
+
+    assert calls == ["iter_quiz_content"]
+    for events in (first, second):
+        assert [e["event"] for e in events][:3] == ["title", "summary", "key_entities"]
+        assert events[-1]["event"] == "done" and not events[-1]["reused"]
+        assert len([e for e in events if e["event"] == "question"]) > 0
+    assert first[-1]["id"] == second[-1]["id"]
+    assert first[1:] == second[1:]
+
+    # The saved quiz has its revision, so the next request reuses it without generating
+    assert len(saved) == 1 and saved[0].revision
+    assert third[-1]["reused"] and third[-1]["id"] == first[-1]["id"]
+    assert [e["question"] for e in third if e["event"] == "question"] == \
+           [e["question"] for e in first if e["event"] == "question"]
+
+def test_stream_joining_generate_gets_the_saved_quiz(run, monkeypatch):
+    calls = _count_generations(monkeypatch)
+    with StandinServer({"/wiki/Joined": synthetic_page("Joined", 40, 2)}, latency=0.2) as server:
+        url = server.url("/wiki/Joined")
+
+        async def scenario(client):
+            generated = asyncio.ensure_future(client.post("/api/generate", json={"url": url}))
+            await asyncio.sleep(0.05)  # /api/generate starts the flight
+            events = await _stream(client, url)
+            return (await generated).json(), events
+
+        payload, events = run(_with_app(scenario))
+
+    assert calls == ["generate_quiz_content"]
+    done = events[-1]
+    assert done["event"] == "done" and done["id"] == payload["id"]
+    assert done["quiz"] == payload["quiz"] and done["summary"] == payload["summary"]
+
+def test_disconnected_stream_leaves_the_flight(run):
+    with StandinServer({"/wiki/Left": synthetic_page("Left", 40, 3)}, latency=0.2) as server:
+        async def scenario():
+            await main.startup()
+            try:
+                events = main._quiz_events(server.url("/wiki/Left"), "ndjson")
+                step = asyncio.ensure_future(events.__anext__())
+                await asyncio.sleep(0)  # The stream joins the flight and schedules its wait
+                step.cancel()  # The client disconnects before that wait has started
+                with pytest.raises(asyncio.CancelledError):
+                    await step
+                return main.generation_flights.waiters(), main.generation_flights.in_flight()
+            finally:
+                await main.shutdown()
+
+        assert run(scenario()) == (0, 0)
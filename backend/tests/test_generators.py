@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+import entity_index
+import generators
+import revisions
+from benchmarks.fake_llm import FakeLLM
+from generation_pool import GenerationExecutor
+
+ARTICLE = " ".join(
+    f"Ada Lovelace worked with Charles Babbage on the Analytical Engine in London during year {year}. "
+    f"The notes she published in {year} describe an algorithm for computing Bernoulli numbers."
+    for year in range(1840, 1846)
+)
+executor = GenerationExecutor(mode="inline")
+
+def _article(n: int) -> str:
+    return f"Article {n}. " + ARTICLE
+
+def _llm(**fake) -> generators.LLMGenerator:
+    return generators.LLMGenerator(client=FakeLLM(**dict({"latency": 0.0, "jitter": 0.0}, **fake)), timeout=0.2)
+
+@pytest.mark.parametrize("fake", [{"latency": 1.0}, {"garbage_rate": 1.0}])
+def test_llm_failure_falls_back_to_the_instant_quiz(run, fake):
+    llm = _llm(**fake)
+    text_hash = revisions.content_hash(ARTICLE)
+    quiz = run(llm.generate(ARTICLE, text_hash, executor))
+
+    assert quiz["generator"] == generators.InstantGenerator.version and quiz["quiz"]
+    assert llm.failures == 1
+    # Only the instant quiz is cached, so the next request asks the model again
+    assert generators.results.peek((text_hash, llm.version)) is None
+    assert generators.results.peek(llm.fallback.key(text_hash)) == quiz
+
+def test_llm_results_are_cached_per_text_and_version(run):
+    llm = _llm()
+    first, second = revisions.content_hash(_article(1)), revisions.content_hash(_article(2))
+
+    async def scenario():
+        quizzes = [await llm.generate(_article(1), first, executor) for _ in range(2)]
+        await llm.generate(_article(2), second, executor)
+        return quizzes
+
+    quiz, again = run(scenario())
+    assert quiz["generator"] == llm.version and again is quiz
+    assert llm.client.calls == 2  # Once per text
+    assert generators.results.peek((first, llm.version)) is quiz
+    assert generators.results.peek(llm.fallback.key(first)) is None
+
+def test_parse_quiz_drops_malformed_questions():
+    good = {"question": "Who wrote the notes?", "options": ["Ada", "Charles"], "answer": "Ada", "difficulty": "hard"}
+    raw = json.dumps({
+        "summary": " About Ada. ",
+        "key_entities": {"people": ["Ada Lovelace", 7, " "]},
+        "quiz": [
+            good,
+            "not a question",
+            {"question": "Answer missing from the options?", "options": ["A", "B"], "answer": "C"},
+            {"question": "Too few options?", "options": ["A"], "answer": "A"},
+            {"options": ["A", "B"], "answer": "A"},
+            dict(good, question="Odd difficulty?", difficulty="trivial"),
+        ],
+    })
+    quiz = generators.parse_quiz(f"```json\n{raw}\n```")
+
+    assert [q["question"] for q in quiz["quiz"]] == ["Who wrote the notes?", "Odd difficulty?"]
+    assert quiz["quiz"][1]["difficulty"] == "medium"
+    assert quiz["summary"] == "About Ada."
+    assert quiz["key_entities"] == {"people": ["Ada Lovelace"], "organizations": [], "locations": []}
+    with pytest.raises(ValueError):
+        generators.parse_quiz(json.dumps({"quiz": [{"question": "Only broken ones", "options": []}]}))
+    with pytest.raises(ValueError):
+        generators.parse_quiz("Sure! Here is a quiz about the article:")
+
+def test_tiered_answers_instantly_then_upgrades(run):
+    tiered = generators.TieredGenerator(llm=_llm(latency=0.05))
+    generators.set_generator(tiered)
+    text_hash = revisions.content_hash(ARTICLE)
+
+    async def scenario():
+        quiz = await generators.generate(ARTICLE, executor, text_hash)
+        before = generators.upgrade_for(text_hash, quiz["generator"], ARTICLE)
+        await tiered.drain()
+        return quiz, before, generators.upgrade_for(text_hash, quiz["generator"], ARTICLE)
+
+    quiz, before, upgraded = run(scenario())
+    assert quiz["generator"] == generators.InstantGenerator.version
+    assert before is None
+    assert upgraded["generator"] == tiered.version and tiered.upgraded == 1
+    # A quiz stored by the LLM needs no upgrade
+    assert generators.upgrade_for(text_hash, tiered.version, ARTICLE) is None
+
+def test_tiered_drops_upgrades_beyond_max_pending(run):
+    tiered = generators.TieredGenerator(llm=_llm(latency=0.05), max_pending=2)
+
+    async def scenario():
+        for n in range(5):
+            await tiered.generate(_article(n), revisions.content_hash(_article(n)), executor)
+        pending = len(tiered._upgrades)
+        await tiered.drain()
+        return pending
+
+    assert run(scenario()) == 2
+    assert tiered.dropped == 3 and tiered.upgraded == 2
+    assert tiered.llm.client.max_in_flight <= 2
+
+def test_instant_results_follow_the_entity_index(run):
+    instant = generators.InstantGenerator()
+    text_hash = revisions.content_hash(ARTICLE)
+
+    async def scenario():
+        first = await instant.generate(ARTICLE, text_hash, executor)
+        cached = await instant.generate(ARTICLE, text_hash, executor)
+        entity_index.current.add("Charles Babbage", "people")
+        return first, cached, await instant.generate(ARTICLE, text_hash, executor)
+
+    first, cached, after_count = run(scenario())
+    assert cached is first
+    assert after_count is not first  # Built against the updated index
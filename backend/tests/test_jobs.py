@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from sqlalchemy import select, update
+
+import database
+import jobs
+import models
+
+async def _add_job(url: str, status: str, locked_until=None) -> int:
+    async with database.AsyncSessionLocal() as db:
+        job = models.Job(url=url, status=status, priority=0, attempts=1, max_attempts=3,
+                         run_after=0.0, locked_until=locked_until)
+        db.add(job)
+        await db.commit()
+        return job.id
+
+async def _statuses() -> dict:
+    async with database.AsyncSessionLocal() as db:
+        return dict((await db.execute(select(models.Job.url, models.Job.status))).all())
+
+async def _wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not await predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+def test_start_requeues_only_expired_leases(run):
+    handled = []
+
+    async def handler(url):
+        handled.append(url)
+
+    async def scenario():
+        await _add_job("live", jobs.RUNNING, locked_until=time.time() + 60)
+        await _add_job("expired", jobs.RUNNING, locked_until=time.time() - 1)
+        await _add_job("no-lease", jobs.RUNNING)
+
+        # A process without workers must not touch running jobs
+        await jobs.JobQueue(handler, workers=0).start()
+        assert set((await _statuses()).values()) == {jobs.RUNNING}
+
+        queue = jobs.JobQueue(handler, workers=1, poll_interval=0.05)
+        await queue.start()
+        try:
+            async def recovered():
+                statuses = await _statuses()
+                return statuses["expired"] == statuses["no-lease"] == jobs.SUCCEEDED
+            await _wait_until(recovered)
+        finally:
+            await queue.stop()
+        return await _statuses()
+
+    statuses = run(scenario())
+    assert statuses["live"] == jobs.RUNNING
+    assert sorted(handled) == ["expired", "no-lease"]
+
+def test_running_job_keeps_its_lease(run):
+    calls = []
+
+    async def slow_handler(url):
+        calls.append(url)
+        await asyncio.sleep(1.0)  # Several lease periods
+
+    async def scenario():
+        owner = jobs.JobQueue(slow_handler, workers=1, poll_interval=0.05, lease=0.3)
+        sibling = jobs.JobQueue(slow_handler, workers=1, poll_interval=0.05, lease=0.3)
+        await owner.start()
+        async with database.AsyncSessionLocal() as db:
+            job = await owner.enqueue(db, "https://en.wikipedia.org/wiki/Lease")
+        await _wait_until(lambda: asyncio.sleep(0, bool(calls)))
+        await sibling.start()  # Recovers expired leases on start and while idle
+        try:
+            async def finished():
+                return (await _statuses())[job.url] == jobs.SUCCEEDED
+            await _wait_until(finished)
+        finally:
+            await owner.stop()
+            await sibling.stop()
+
+    run(scenario())
+    assert calls == ["https://en.wikipedia.org/wiki/Lease"]
+
+def test_outcome_of_a_reclaimed_job_is_dropped(run):
+    async def handler(url):
+        return None
+
+    async def scenario():
+        # The lease ran out while the first attempt was still running and attempt 2 claimed the job
+        job_id = await _add_job("reclaimed", jobs.RUNNING, locked_until=time.time() + 60)
+        async with database.AsyncSessionLocal() as db:
+            await db.execute(update(models.Job).values(attempts=2))
+            await db.commit()
+        await jobs.JobQueue(handler, workers=1)._run(job_id, "reclaimed", 1, 3)
+        return (await _statuses())["reclaimed"]
+
+    assert run(scenario()) == jobs.RUNNING
+
+def test_worker_survives_a_failed_outcome_write(run, monkeypatch):
+    def broken_session():
+        raise RuntimeError("database is gone")
+
+    async def handler(url):
+        monkeypatch.setattr(database, "AsyncSessionLocal", broken_session)
+
+    async def scenario():
+        job_id = await _add_job("job", jobs.RUNNING, locked_until=time.time() + 60)
+        queue = jobs.JobQueue(handler, workers=1)
+        await queue._run(job_id, "job", 1, 3)  # Logs instead of raising into the worker loop
+        monkeypatch.undo()
+        return (await _statuses())["job"]
+
+    assert run(scenario()) == jobs.RUNNING  # Requeued once its lease expires
+
+def test_wait_for_change_forgets_jobs_nobody_waits_for(run):
+    queue = jobs.JobQueue(None, workers=0)
+
+    async def scenario():
+        await asyncio.gather(queue.wait_for_change(1, 0.01), queue.wait_for_change(1, 0.05))
+        return queue._changes, queue._waiting
+
+    assert run(scenario()) == ({}, {})
@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+import outbound
+from benchmarks.corpus import synthetic_page
+from benchmarks.standin import StandinServer
+
+PAGE = synthetic_page("Throttled", 20, 3)
+
+async def _call(scheduler, client, url: str, retries: int = None):
+    return await scheduler.call(lambda: client.get(url), retries=retries)
+
+def test_retry_after_is_honoured(run):
+    # One request per second: the second one is answered 429, Retry-After: 1
+    with StandinServer({"/wiki/A": PAGE}, rate_limit=1, burst=1, retry_after=1) as server:
+        url = server.url("/wiki/A")
+        scheduler = outbound.Scheduler(rate=100, burst=100, retry_base=0.01)
+
+        async def scenario():
+            async with httpx.AsyncClient() as client:
+                assert (await _call(scheduler, client, url)).status_code == 200
+                started = time.monotonic()
+                response = await _call(scheduler, client, url)
+                return response, time.monotonic() - started
+
+        response, elapsed = run(scenario())
+    assert response.status_code == 200
+    assert elapsed >= 0.9  # Waited for Retry-After instead of the 10 ms backoff
+    assert scheduler.throttled == 1 and scheduler.retried == 1
+    assert server.throttled == 1
+
+def test_limit_halves_on_throttling_and_recovers(run):
+    with StandinServer({"/wiki/A": PAGE}, rate_limit=1, burst=1, retry_after=1) as throttling, \
+            StandinServer({"/wiki/A": PAGE}) as healthy:
+        scheduler = outbound.Scheduler(rate=1000, burst=1000, max_concurrency=8, target_latency=1.0)
+
+        async def scenario():
+            async with httpx.AsyncClient() as client:
+                await _call(scheduler, client, throttling.url("/wiki/A"))
+                with pytest.raises(outbound.Throttled):
+                    await _call(scheduler, client, throttling.url("/wiki/A"), retries=0)
+                after_throttling = scheduler.limit.limit
+                scheduler.paused_until = 0.0  # The healthy stand-in is another host in real life
+                for _ in range(40):
+                    assert (await _call(scheduler, client, healthy.url("/wiki/A"))).status_code == 200
+                return after_throttling, scheduler.limit.limit
+
+        after_throttling, recovered = run(scenario())
+    assert after_throttling == 4  # 8 halved
+    assert recovered == 8  # Additive increase back to the maximum
+
+def test_retries_stop_at_the_deadline(run):
+    # Always throttled, with no Retry-After delay: only the deadline ends the retries
+    with StandinServer({"/wiki/A": PAGE}, rate_limit=0.001, burst=1, retry_after=0) as server:
+        url = server.url("/wiki/A")
+        scheduler = outbound.Scheduler(rate=1000, burst=1000, max_retries=1000, retry_base=0.05)
+
+        async def scenario():
+            async with httpx.AsyncClient() as client:
+                await _call(scheduler, client, url)  # Uses the only token
+                started = time.monotonic()
+                with outbound.deadline(0.5):
+                    with pytest.raises(outbound.Throttled):
+                        await _call(scheduler, client, url)
+                return time.monotonic() - started
+
+        elapsed = run(scenario())
+    assert elapsed < 0.5
+    assert 0 < scheduler.retried < 1000
+
+def test_throttled_scrape_answers_503(run):
+    # Retry-After beyond the 6 s scrape budget: no attempt fits, so the API fails at once
+    with StandinServer({"/wiki/A": PAGE}, rate_limit=0.001, burst=1, retry_after=30) as server:
+        url = server.url("/wiki/A")
+
+        async def scenario():
+            await main.startup()
+            try:
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+                    started = time.monotonic()
+                    response = await client.post("/api/generate", json={"url": url})
+                    return response, time.monotonic() - started
+            finally:
+                await main.shutdown()
+
+        response, elapsed = run(scenario())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+    assert elapsed < 3
+
+def test_cancelled_request_shrinks_the_limit(run):
+    scheduler = outbound.Scheduler(rate=1000, burst=1000, max_concurrency=8)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.call(hang), 0.05)
+        return scheduler.limit.limit, scheduler.limit.in_flight
+
+    assert run(scenario()) == (4, 0)
@@ -0,0 +1,38 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import main
+import persistence
+
+QUIZ = {"summary": "About A.", "key_entities": {}, "quiz": []}
+
+def test_write_behind_ids_are_readable_when_returned(run, monkeypatch):
+    queue = persistence.WriteBehindQueue(max_batch=8, max_delay=0.05)
+    commit = AsyncSession.commit
+
+    async def slow_commit(self):
+        await asyncio.sleep(0.1)  # Room for a reader between the insert and the commit
+        await commit(self)
+
+    monkeypatch.setattr(AsyncSession, "commit", slow_commit)
+
+    async def scenario():
+        queue.start()
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+                async def save_and_read(i):
+                    quiz_id = await queue.submit(f"https://en.wikipedia.org/wiki/{i}", str(i), QUIZ)
+                    return (await client.get(f"/api/history/{quiz_id}")).status_code
+                return await asyncio.gather(*[save_and_read(i) for i in range(5)])
+        finally:
+            await queue.stop()
+
+    assert run(scenario()) == [200] * 5
+    assert queue.batches == 1 and queue.written == 5
+
+def test_write_behind_submit_needs_start(run):
+    with pytest.raises(RuntimeError):
+        run(persistence.WriteBehindQueue().submit("https://en.wikipedia.org/wiki/A", "A", QUIZ))
@@ -0,0 +1,19 @@
+import pytest
+
+import responses
+
+ETAG = '"abc"'
+
+@pytest.mark.parametrize("header, matches", [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ('"xyz",W/"abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+    ('"abcd"', False),
+    ("", False),
+    (None, False),
+])
+def test_etag_matches(header, matches):
+    assert responses.etag_matches(header, ETAG) is matches
@@ -0,0 +1,19 @@
+import database
+import persistence
+import search
+
+def _quiz(summary: str) -> dict:
+    return {"summary": summary, "key_entities": {}, "quiz": []}
+
+def test_like_fallback_treats_wildcards_literally(run, monkeypatch):
+    async def scenario():
+        async with database.AsyncSessionLocal() as db:
+            await persistence.save_quizzes(db, [
+                ("https://en.wikipedia.org/wiki/Wool", "Wool", _quiz("Merino is 100% wool.")),
+                ("https://en.wikipedia.org/wiki/Snake_case", "Snake_case", _quiz("Words joined by underscores.")),
+                ("https://en.wikipedia.org/wiki/Cotton", "Cotton", _quiz("A soft fibre.")),
+            ])
+            monkeypatch.setattr(search, "backend", None)  # The LIKE scan, as without FTS5 or Postgres
+            return [[hit["id"] for hit in await search.search(db, query, 10)] for query in ("%", "_", "e_c", "100%")]
+
+    assert run(scenario()) == [[1], [2], [2], [1]]
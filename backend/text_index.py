@@ -0,0 +1,157 @@
+import re
+from collections import Counter
+
+# One scan finds everything the quiz generator needs. The alternatives start with
+# disjoint character classes (uppercase letter / digit / punctuation), so the
+# combined pattern matches exactly what the separate regexes used to match. The
+# leading lookahead lets the regex engine skip straight to candidate characters.
+_TOKENS = re.compile(
+    r"(?=[A-Z12.!?])(?:"
+    r"(?P<cap>\b[A-Z][a-z]+(?: [A-Z][a-z]+)*\b)"  # Capitalized phrase, e.g. "Alan Turing"
+    r"|(?P<year>\b(?:19|20)\d{2}\b)"            # Year 1900-2099
+    r"|(?P<stop>[.!?]+)"                         # Sentence boundary
+    r")"
+)
+_WORD_CHAR = re.compile(r"\w")
+MIN_SENTENCE_LENGTH = 20
+
+class DocumentIndex:
+    """
+    Reusable index over an article's text, built in a single regex pass.
+
+    - sentence_spans: (start, end) of stripped sentences longer than 20 chars
+    - phrase_spans: (start, end) of capitalized phrases, in document order
+    - years: (offset, "1912") in document order
+    Phrase counts and the token -> sentence inverted index are derived from the
+    spans on first use, without looking at the text again.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.sentence_spans = []
+        self.phrase_spans = []
+        self.years = []
+        self._phrase_counts = None
+        self._token_sentences = None
+        self._build()
+
+    def _build(self):
+        text = self.text
+        phrases = self.phrase_spans.append
+        years = self.years.append
+        stops = []
+        for match in _TOKENS.finditer(text):
+            kind = match.lastgroup
+            if kind == "cap":
+                phrases(match.span())
+            elif kind == "stop":
+                stops.append(match.span())
+            else:
+                years((match.start(), match.group()))
+
+        # Keep the sentences the generator used to keep: stripped and > 20 chars
+        sentences = self.sentence_spans.append
+        previous = 0
+        stops.append((len(text), len(text)))
+        for start, end in stops:
+            segment = text[previous:start]
+            stripped = segment.strip()
+            if len(stripped) > MIN_SENTENCE_LENGTH:
+                offset = previous + len(segment) - len(segment.lstrip())
+                sentences((offset, offset + len(stripped)))
+            previous = end
+
+    # Sentences
+
+    def __len__(self):
+        return len(self.sentence_spans)
+
+    def sentence(self, i: int) -> str:
+        start, end = self.sentence_spans[i]
+        return self.text[start:end]
+
+    def sentences(self, start: int = 0, stop: int = None):
+        return [self.text[s:e] for s, e in self.sentence_spans[start:stop]]
+
+    def sentences_with(self, token: str, limit: int = None):
+        """Ids of sentences containing the capitalized token, optionally below limit."""
+        if self._token_sentences is None:
+            if limit is not None:
+                # Only the head of the document matters; don't index all of it yet
+                return self._build_token_index(limit).get(token, [])
+            self._token_sentences = self._build_token_index()
+        ids = self._token_sentences.get(token, [])
+        if limit is not None:
+            return [i for i in ids if i < limit]
+        return list(ids)
+
+    def _build_token_index(self, limit: int = None):
+        # Phrases and sentences are both sorted by offset: walk them together
+        index = {}
+        spans = self.sentence_spans[:limit]
+        i = 0
+        for start, end in self.phrase_spans:
+            while i < len(spans) and spans[i][1] <= start:
+                i += 1
+            if i == len(spans):
+                break
+            if spans[i][0] > start:
+                continue  # Phrase sits in a fragment too short to be a sentence
+            for token in self.text[start:end].split(" "):
+                ids = index.setdefault(token, [])
+                if not ids or ids[-1] != i:
+                    ids.append(i)
+        return index
+
+    # Capitalized phrases
+
+    def phrases(self):
+        """Phrase strings in document order."""
+        text = self.text
+        return (text[s:e] for s, e in self.phrase_spans)
+
+    @property
+    def phrase_counts(self) -> Counter:
+        if self._phrase_counts is None:
+            self._phrase_counts = Counter(self.phrases())
+        return self._phrase_counts
+
+    def phrase_spans_in_sentence(self, i: int, max_offset: int = None):
+        """(start, end) of phrases in sentence i starting within max_offset chars of it."""
+        start, end = self.sentence_spans[i]
+        stop = min(start + max_offset, end) if max_offset is not None else end
+        spans = []
+        for s, e in self.phrase_spans:
+            if s >= stop:
+                break  # Spans are in document order
+            if s >= start:
+                spans.append((s, e))
+        return spans
+
+    def name_pairs(self):
+        """
+        Two-word capitalized names ("Alan Turing") in document order, as a
+        non-overlapping left-to-right scan of each phrase would find them.
+        """
+        for phrase in self.phrases():
+            if " " not in phrase:
+                continue
+            words = phrase.split(" ")
+            for i in range(0, len(words) - 1, 2):
+                yield words[i] + " " + words[i + 1]
+
+    def phrases_with_article(self):
+        """Phrases including a directly preceding lowercase "the " / "a "."""
+        text = self.text
+        for start, end in self.phrase_spans:
+            for article in ("the ", "a "):
+                begin = start - len(article)
+                if begin >= 0 and text.startswith(article, begin) and (begin == 0 or not _WORD_CHAR.match(text[begin - 1])):
+                    start = begin
+                    break
+            yield text[start:end]
+
+    # Years
+
+    def first_year(self):
+        return self.years[0][1] if self.years else None
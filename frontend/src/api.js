@@ -4,4 +4,32 @@ const api = axios.create({
   baseURL: "https://deepklairty-assignment-quiz-generator.onrender.com/api",
 });
 
+// POST /generate/stream: calls onEvent with each NDJSON event as it arrives
+// (title, summary, key_entities, question..., then done or error).
+// axios buffers whole responses in the browser, so this uses fetch.
+export const streamGenerate = async (url, onEvent) => {
+  const response = await fetch(`${api.defaults.baseURL}/generate/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ url }),
+  });
+  if (!response.ok) {
+    const body = await response.json().catch(() => ({}));
+    throw new Error(body.detail || `Request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffered.split("\n");
+    buffered = lines.pop();
+    lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+    if (done) break;
+  }
+  if (buffered.trim()) onEvent(JSON.parse(buffered));
+};
+
 export default api;
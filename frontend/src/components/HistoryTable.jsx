@@ -6,11 +6,31 @@ const HistoryTable = () => {
   const [quizzes, setQuizzes] = useState([]);
   const [loading, setLoading] = useState(true);
   const [selectedQuiz, setSelectedQuiz] = useState(null);
+  const [query, setQuery] = useState('');
+  const [results, setResults] = useState(null);
 
   useEffect(() => {
     fetchHistory();
   }, []);
 
+  // Search on the server once the user stops typing
+  useEffect(() => {
+    const q = query.trim();
+    if (!q) {
+      setResults(null);
+      return;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const response = await api.get('/search', { params: { q, limit: 50 } });
+        setResults(response.data);
+      } catch (err) {
+        console.error('Search failed:', err);
+      }
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [query]);
+
   const fetchHistory = async () => {
     try {
       const response = await api.get('/history');
@@ -34,12 +54,22 @@ const HistoryTable = () => {
 
   if (loading) return <p className="loading">Loading history...</p>;
 
+  const rows = results ?? quizzes;
+
   return (
     <div className="card history-card">
       <h2 className="history-title">Past Quizzes</h2>
 
-      {quizzes.length === 0 ? (
-        <p>No quizzes generated yet.</p>
+      <input
+        type="search"
+        className="history-search"
+        placeholder="Search quizzes..."
+        value={query}
+        onChange={(e) => setQuery(e.target.value)}
+      />
+
+      {rows.length === 0 ? (
+        <p>{results ? 'No quizzes match your search.' : 'No quizzes generated yet.'}</p>
       ) : (
         <div className="table-wrapper">
           <table className="history-table">
@@ -54,7 +84,7 @@ const HistoryTable = () => {
             </thead>
 
             <tbody>
-              {quizzes.map((quiz) => (
+              {rows.map((quiz) => (
                 <tr key={quiz.id}>
                   <td>{quiz.id}</td>
 
@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import api from '../api';
+import { streamGenerate } from '../api';
 
 const QuizGenerator = () => {
   const [url, setUrl] = useState('');
@@ -40,20 +40,50 @@ const QuizGenerator = () => {
     setLoadingStep('Scraping article content...');
 
     try {
-      const progressTimer = setTimeout(() => {
-        setLoadingStep('Generating quiz with AI...');
-      }, 2000);
-
-      const response = await api.post('/generate', { url });
-
-
-      clearTimeout(progressTimer);
+      // The quiz fills in as the server streams it: title, summary, then each question
+      let failure = null;
+      await streamGenerate(url, (event) => {
+        switch (event.event) {
+          case 'title':
+            setResult({ title: event.title, url: event.url, summary: '', quiz: [] });
+            setLoadingStep('Summarizing article...');
+            break;
+          case 'summary':
+            setResult((prev) => ({ ...prev, summary: event.summary }));
+            setLoadingStep('Generating questions...');
+            break;
+          case 'key_entities':
+            setResult((prev) => ({ ...prev, key_entities: event.key_entities }));
+            break;
+          case 'question':
+            setResult((prev) => ({ ...prev, quiz: [...prev.quiz, event.question] }));
+            break;
+          case 'done':
+            // done carries the whole quiz when it differs from what was streamed
+            // (e.g. this request joined a generation started by another client)
+            setResult((prev) => ({
+              ...prev,
+              ...(event.quiz && { summary: event.summary, key_entities: event.key_entities, quiz: event.quiz }),
+              id: event.id,
+              related_topics: event.related_topics,
+            }));
+            break;
+          case 'error':
+            failure = event.detail;
+            break;
+          default:
+            break;
+        }
+      });
       setLoadingStep('');
-      setResult(response.data);
+      if (failure) {
+        setResult(null);
+        setError(failure);
+      }
     } catch (err) {
       setLoadingStep('');
       setError(
-        err.response?.data?.detail ||
+        err.message ||
           'Failed to generate quiz. Please check the URL.'
       );
     } finally {
@@ -133,6 +163,7 @@ const QuizGenerator = () => {
               <button
                 className="submit-btn"
                 onClick={handleSubmit}
+                disabled={loading}
               >
                 Submit Quiz
               </button>